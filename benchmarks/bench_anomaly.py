@@ -0,0 +1,57 @@
+"""
+Measure streaming anomaly detection throughput and memory per device.
+
+Weekly capacity points for many devices arrive interleaved, as they would
+from a watch folder; memory is measured with tracemalloc after all devices
+have state. Run from the project root:
+
+    python benchmarks/bench_anomaly.py [devices] [periods]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from anomaly import AnomalyMonitor
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    periods = int(sys.argv[2]) if len(sys.argv) > 2 else 52
+
+    rng = np.random.default_rng(0)
+    design = 50000
+    wear = rng.uniform(5, 40, devices)
+    full_charge = (design - np.outer(wear, np.arange(periods)) + rng.normal(0, 60, (devices, periods))).astype(int)
+    # One device in a hundred loses 6% of its capacity at some point
+    for device in range(0, devices, 100):
+        full_charge[device, rng.integers(periods // 2, periods):] -= 3000
+    labels = [f"2023-W{week:03d}" for week in range(periods)]
+
+    monitor = AnomalyMonitor()
+    start = time.perf_counter()
+    for week in range(periods):
+        label = labels[week]
+        column = full_charge[:, week].tolist()
+        for device in range(devices):
+            monitor.update_capacity(device, label, column[device], design)
+    elapsed = time.perf_counter() - start
+
+    # State is allocated with a device's first points and does not grow after
+    # that, so a separate short pass measures it without slowing the timing
+    tracemalloc.start()
+    sizing = AnomalyMonitor()
+    for week in range(2):
+        for device in range(devices):
+            sizing.update_capacity(device, labels[week], int(full_charge[device, week]), design)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{devices} devices x {periods} periods: {monitor.points / elapsed:,.0f} points/s, "
+          f"{memory / devices:,.0f} bytes of state per device, "
+          f"{monitor.alerts} alerts ({devices // 100} injected drops)")
+
+if __name__ == "__main__":
+    main()
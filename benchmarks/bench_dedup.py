@@ -0,0 +1,63 @@
+"""
+Measure the fleet summary on a messy collection with and without deduplication.
+
+The collection has several overlapping weekly reports per device, and every
+report is also dropped again under other names. Run from the project root:
+
+    python benchmarks/bench_dedup.py [devices] [reports_per_device] [copies]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from aggregation import aggregate_files
+from dedup import DedupIndex
+from synthetic_report import write_battery_report
+
+def build_collection(folder, devices, reports_per_device, copies):
+    paths = []
+    for device in range(devices):
+        for report in range(reports_per_device):
+            path = os.path.join(folder, f"pc{device:04d}-week{report}.html")
+            write_battery_report(path, computer_name=f"PC-{device:04d}", serial_number=f"SN-{device:04d}",
+                                 full_charge_capacity=40000 + device % 8000 - report * 200,
+                                 periods=52, usage_rows=300, start_date=date(2022, 1, 1) + timedelta(weeks=report),
+                                 seed=device)
+            paths.append(path)
+            for copy in range(copies):
+                duplicate = os.path.join(folder, f"upload-{copy}-{device:04d}-{report}.html")
+                shutil.copy(path, duplicate)
+                paths.append(duplicate)
+    return paths
+
+def main():
+    devices, reports_per_device, copies = (list(map(int, sys.argv[1:4])) + [20, 3, 2][len(sys.argv[1:4]):])[:3]
+    folder = tempfile.mkdtemp()
+    try:
+        paths = build_collection(folder, devices, reports_per_device, copies)
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"{len(paths)} files ({size / 1e6:.1f} MB), {devices} devices")
+
+        start = time.perf_counter()
+        naive = aggregate_files(paths)
+        naive_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = DedupIndex().add_paths(paths)
+        index_time = time.perf_counter() - start
+        deduplicated = aggregate_files(index.latest_per_device())
+        dedup_time = time.perf_counter() - start
+
+        print(f"all files       {naive_time:8.2f} s  {len(paths) / naive_time:8.1f} files/s  "
+              f"{naive.reports} reports counted")
+        print(f"deduplicated    {dedup_time:8.2f} s  {len(paths) / dedup_time:8.1f} files/s  "
+              f"{deduplicated.reports} devices counted (index {index_time:.2f} s, {index.stats()})")
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    main()
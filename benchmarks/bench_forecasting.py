@@ -0,0 +1,45 @@
+"""
+Measure batched degradation fitting throughput in devices fitted per second.
+
+Synthetic devices have 20-150 weekly capacity points with linear degradation
+plus noise; fitting includes the threshold crossing with confidence bounds.
+
+    python benchmarks/bench_forecasting.py [devices ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from forecasting import fit_degradation
+
+def synthetic_devices(count, seed=0):
+    rng = np.random.default_rng(seed)
+    x_series, health_series = [], []
+    for _ in range(count):
+        points = rng.integers(20, 150)
+        days = np.arange(points) * 7.0
+        slope = -rng.uniform(0.002, 0.03)
+        health = 100 + slope * days + rng.normal(0, 0.5, points)
+        x_series.append(days)
+        health_series.append(health)
+    return x_series, health_series
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for count in counts:
+        x_series, health_series = synthetic_devices(count)
+
+        start = time.perf_counter()
+        forecast = fit_degradation(x_series, health_series)
+        fitted = time.perf_counter() - start
+        forecast.threshold_crossing(70.0)
+        total = time.perf_counter() - start
+
+        print(f"{count:>7} devices: fit {fitted * 1000:8.1f} ms ({count / fitted:>10,.0f} devices/s), "
+              f"with 70% crossing {total * 1000:8.1f} ms ({count / total:>10,.0f} devices/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure health gauge rendering in gauges per second.
+
+Compares building a new figure per gauge (create_battery_health_gauge +
+savefig) with HealthGaugeRenderer, cold (every gauge a cache miss) and on a
+fleet whose health values repeat. Run from the project root:
+
+    python benchmarks/bench_gauge.py [devices]
+"""
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from visualization import HealthGaugeRenderer, create_battery_health_gauge
+
+def figure_png(full_charge, design):
+    buffer = io.BytesIO()
+    create_battery_health_gauge(full_charge, design).savefig(buffer, format="png")
+    return buffer.getvalue()
+
+def report(label, count, seconds, extra=""):
+    print(f"{label:32} {count:6} gauges  {seconds:7.2f} s  {count / seconds:8.1f} gauges/s{extra}")
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(0)
+    design = 50000
+    full_charge = (design * np.clip(rng.normal(0.82, 0.1, devices), 0.2, 1.0)).astype(int)
+
+    count = min(devices, 100)
+    start = time.perf_counter()
+    for value in full_charge[:count]:
+        figure_png(int(value), design)
+    report("figure per gauge", count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    renderer = HealthGaugeRenderer(max_entries=0)
+    setup = time.perf_counter() - start
+    start = time.perf_counter()
+    for value in full_charge[:count]:
+        renderer.render_report_png(int(value), design)
+    report("cached background, no LRU", count, time.perf_counter() - start, f"  (setup {setup:.2f} s)")
+
+    renderer = HealthGaugeRenderer()
+    start = time.perf_counter()
+    for value in full_charge:
+        renderer.render_report_png(int(value), design)
+    report("cached background + LRU", devices, time.perf_counter() - start,
+           f"  ({renderer.hits} hits, {renderer.misses} misses)")
+
+if __name__ == "__main__":
+    main()
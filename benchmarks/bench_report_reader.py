@@ -0,0 +1,54 @@
+"""
+Compare the memory-mapped section reader with a full parse of a large report.
+
+A synthetic report with many usage rows (about 20 MB by default) is written to
+a temporary file; the key metrics are then read with parse_battery_report and
+with report_reader.read_key_metrics. Run from the project root:
+
+    python benchmarks/bench_report_reader.py [usage_rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from battery_repport import parse_battery_report
+from report_reader import MappedReport, read_capacity_history, read_key_metrics
+from synthetic_report import write_battery_report
+
+def timed(func, *args, runs=1):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / runs
+
+def main():
+    usage_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 32000
+    handle, path = tempfile.mkstemp(suffix=".html")
+    os.close(handle)
+    try:
+        write_battery_report(path, periods=260, usage_rows=usage_rows)
+        size = os.path.getsize(path)
+        print(f"Report: {size / 1e6:.1f} MB, {usage_rows} usage rows")
+
+        full, full_time = timed(parse_battery_report, path)
+        metrics, metrics_time = timed(read_key_metrics, path, runs=50)
+        history, history_time = timed(read_capacity_history, path, runs=5)
+        assert metrics == full[0] and history == full[3]
+
+        with MappedReport(path) as report:
+            report.section_bytes("installed_batteries")
+            metrics_bytes = report.bytes_scanned
+        with MappedReport(path) as report:
+            report.section_bytes("capacity_history")
+            history_bytes = report.bytes_scanned
+
+        print(f"parse_battery_report   {full_time * 1000:10.1f} ms  {size:>12,} bytes decoded")
+        print(f"read_key_metrics       {metrics_time * 1000:10.1f} ms  {metrics_bytes:>12,} bytes scanned")
+        print(f"read_capacity_history  {history_time * 1000:10.1f} ms  {history_bytes:>12,} bytes scanned")
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
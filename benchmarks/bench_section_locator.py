@@ -0,0 +1,71 @@
+"""
+Benchmark the precomputed SectionLocator against the previous heading heuristics.
+
+The legacy approach scanned every h2 once per section lookup and fell back to
+get_text() over whole tables. Run from the project root:
+
+    python benchmarks/bench_section_locator.py [rows]
+"""
+import os
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from section_locator import SectionLocator
+
+def build_report(rows):
+    parts = ["<html><body><h1>Battery report</h1>",
+             "<table><tr><td>COMPUTER NAME</td><td>BENCH-PC</td></tr></table>",
+             "<h2>Installed batteries</h2><table>",
+             "<tr><td>DESIGN CAPACITY</td><td>50,000 mWh</td></tr>",
+             "<tr><td>FULL CHARGE CAPACITY</td><td>42,000 mWh</td></tr>",
+             "<tr><td>CYCLE COUNT</td><td>300</td></tr></table>"]
+    for heading in ("Recent usage", "Battery usage", "Usage history"):
+        parts.append(f"<h2>{heading}</h2><table><tr><th>START TIME</th><th>STATE</th><th>SOURCE</th></tr>")
+        parts.extend(f"<tr><td>2023-01-01 10:{i % 60:02d}</td><td>Active</td><td>Battery</td></tr>"
+                     for i in range(rows))
+        parts.append("</table>")
+    parts.append("<h2>Battery capacity history</h2><table>"
+                 "<tr><th>PERIOD</th><th>FULL CHARGE CAPACITY</th><th>DESIGN CAPACITY</th></tr>")
+    parts.extend(f"<tr><td>Week {i}</td><td>42,000 mWh</td><td>50,000 mWh</td></tr>" for i in range(rows))
+    parts.append("</table><h2>Battery life estimates</h2><table><tr><td>-</td></tr></table></body></html>")
+    return "".join(parts)
+
+def legacy_lookup(soup, heading, table_keys):
+    # Linear h2 scan, then whole-table text search, as the parser did before
+    for h2 in soup.find_all(["h2", "h3"]):
+        if heading in h2.get_text():
+            return h2.find_next("table")
+    for table in soup.find_all("table"):
+        text = table.get_text().upper()
+        if any(key in text for key in table_keys):
+            return table
+    return None
+
+def legacy_lookups(soup):
+    return [
+        legacy_lookup(soup, "Installed batteries", ["DESIGN CAPACITY"]),
+        legacy_lookup(soup, "Battery usage", ["STATE"]),
+        legacy_lookup(soup, "Battery capacity history", ["CAPACITY HISTORY", "FULL CHARGE"]),
+        # A section that is absent falls through to the whole-table search
+        legacy_lookup(soup, "Battery life estimates (localized)", ["AT FULL CHARGE"]),
+    ]
+
+def locator_lookups(soup):
+    locator = SectionLocator(soup)
+    return [locator.table(name) for name in
+            ("installed_batteries", "battery_usage", "capacity_history", "life_estimates_localized")]
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    soup = BeautifulSoup(build_report(rows), "html.parser")
+
+    for name, func in (("legacy multi-scan", legacy_lookups), ("SectionLocator", locator_lookups)):
+        runs = 20
+        seconds = timeit.timeit(lambda: func(soup), number=runs) / runs
+        print(f"{name:<18} {seconds * 1000:8.2f} ms per report ({rows} rows per section)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Query a synthetic fleet history in the partitioned store.
+
+The dataset has one monthly snapshot per device over five years, spread over
+20 models (50k devices, 3M rows by default). Run from the project root:
+
+    python benchmarks/bench_storage.py [devices] [years] [workers]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from storage import FleetStore
+
+MODELS = [f"Laptop {series} G{generation}" for series in ("13", "14", "15", "16", "X1")
+          for generation in range(1, 5)]
+
+def build_store(root, devices, years, seed=0):
+    rng = np.random.default_rng(seed)
+    store = FleetStore(root)
+    months = np.arange(np.datetime64("2020-01"), np.datetime64("2020-01") + 12 * years)
+    device_model = rng.integers(0, len(MODELS), devices)
+
+    for model_index, model in enumerate(MODELS):
+        ids = np.flatnonzero(device_model == model_index)
+        design = rng.choice([45000, 50000, 57000, 72000], len(ids)).astype("<i4")
+        wear = rng.gamma(2.0, 0.2, len(ids))                 # health points lost per month
+        cycles_per_month = rng.uniform(5, 40, len(ids))
+
+        age = np.arange(len(months))[:, None]
+        health = np.clip(100 - wear * age + rng.normal(0, 0.5, (len(months), len(ids))), 20, 105)
+        full_charge = (health / 100 * design).astype("<i4")
+        store.append(model, {
+            "computer_name": np.tile(np.array([f"PC-{i:06d}" for i in ids], dtype=object), len(months)),
+            "serial_number": np.tile(np.array([f"SN-{i:06d}" for i in ids], dtype=object), len(months)),
+            "date": np.repeat(months.astype("datetime64[D]"), len(ids)),
+            "full_charge": full_charge.ravel(),
+            "design": np.tile(design, len(months)),
+            "health": (full_charge / design * 100).astype("<f4").ravel(),
+            "cycle_count": (cycles_per_month * age).astype("<i4").ravel(),
+        })
+    return store
+
+def run(store, label, **query):
+    start = time.perf_counter()
+    data, stats = store.scan(**query)
+    seconds = time.perf_counter() - start
+    print(f"{label:28} {seconds:7.3f} s  {stats['rows']:9,} rows  "
+          f"{stats['partitions_scanned']:3}/{stats['partitions']} partitions  "
+          f"{stats['row_groups'] - stats['row_groups_skipped']:5}/{stats['row_groups']} row groups")
+    return data
+
+def main():
+    devices, years, workers = (list(map(int, sys.argv[1:4])) + [50000, 5, os.cpu_count() or 1][len(sys.argv[1:4]):])[:3]
+    folder = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        store = build_store(os.path.join(folder, "store"), devices, years)
+        size = sum(os.path.getsize(os.path.join(path, name))
+                   for path, _, names in os.walk(store.root) for name in names)
+        print(f"{devices} devices x {12 * years} months written in {time.perf_counter() - start:.1f} s "
+              f"({size / 1e6:.1f} MB)")
+
+        health = ["serial_number", "date", "health"]
+        run(store, "full scan, serial", columns=health, max_workers=1)
+        run(store, f"full scan, {workers} workers", columns=health, max_workers=workers)
+        run(store, "one model, one year", columns=health, models=[MODELS[0]],
+            start="2022-01-01", end="2022-12-31", max_workers=workers)
+        run(store, "health <= 70, serial", columns=health, filters={"health": (None, 70)}, max_workers=1)
+        run(store, "health <= 70", columns=health, filters={"health": (None, 70)}, max_workers=workers)
+        data = run(store, "health <= 60, cycles >= 800", columns=health,
+                   filters={"health": (None, 60), "cycle_count": (800, None)}, max_workers=workers)
+        print(f"{len(set(data['serial_number']))} devices at or below 60% health after 800 cycles")
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare shipping the wire format against shipping the raw report HTML.
+
+For synthetic reports of several sizes this prints the payload size and the
+encode/decode times of the wire format, next to the HTML size (raw and zlib
+compressed) and the time the collector would spend parsing the HTML.
+
+    python benchmarks/bench_wire_format.py
+"""
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from battery_repport import parse_battery_report
+from synthetic_report import write_battery_report
+from wire_format import decode_report, encode_report, zstandard
+
+SIZES = [(52, 100), (260, 1000), (520, 5000)]  # (capacity periods, usage rows)
+
+def best_of(func, runs=5):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    codecs = ["none", "zlib"] + (["zstd"] if zstandard else [])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for periods, usage_rows in SIZES:
+            path = write_battery_report(os.path.join(tmp_dir, "report.html"), periods=periods, usage_rows=usage_rows)
+            with open(path, "rb") as f:
+                html = f.read()
+
+            parse_time, parsed = best_of(lambda: parse_battery_report(path), runs=2)
+            print(f"Report with {periods} periods, {usage_rows} usage rows:")
+            print(f"  html        {len(html):>10,} bytes   collector parse {parse_time * 1000:9.2f} ms")
+            print(f"  html+zlib   {len(zlib.compress(html, 6)):>10,} bytes")
+
+            for codec in codecs:
+                encode_time, data = best_of(lambda: encode_report(parsed, compression=codec))
+                decode_time, _ = best_of(lambda: decode_report(data).full_charge_capacities.sum())
+                print(f"  wire/{codec:<6} {len(data):>10,} bytes   encode {encode_time * 1000:7.3f} ms   "
+                      f"decode {decode_time * 1000:7.3f} ms")
+
+if __name__ == "__main__":
+    main()
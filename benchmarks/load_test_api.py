@@ -0,0 +1,98 @@
+"""
+Load-test the battery HTTP API and report p50/p99 latency per endpoint.
+
+By default an in-process server is started on a free localhost port and a few
+synthetic reports are uploaded; pass --url to target a running server instead.
+
+    python benchmarks/load_test_api.py --requests 2000 --concurrency 32
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from api_server import BatteryApiServer
+from synthetic_report import render_battery_report
+
+ENDPOINTS = ("metrics", "details", "usage", "capacity", "gauge.png", "capacity.png")
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=None, help="Base URL of a running server")
+    parser.add_argument("--reports", type=int, default=4, help="Synthetic reports to upload")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes of the in-process server")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        server = BatteryApiServer(max_workers=args.workers)
+        host, port = "127.0.0.1", server.start_in_thread()
+
+    # Upload the reports
+    report_ids = []
+    connection = http.client.HTTPConnection(host, port, timeout=120)
+    for seed in range(args.reports):
+        html = render_battery_report(periods=104, usage_rows=300, seed=seed,
+                                     full_charge_capacity=random.Random(seed).randint(30000, 50000))
+        connection.request("POST", "/reports", body=html.encode("utf-8"), headers={"Content-Type": "text/html"})
+        report_ids.append(json.loads(connection.getresponse().read())["id"])
+    connection.close()
+
+    latencies = defaultdict(list)
+    lock = threading.Lock()
+    per_thread = args.requests // args.concurrency
+
+    def worker(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection(host, port, timeout=120)
+        for _ in range(per_thread):
+            endpoint = rng.choice(ENDPOINTS)
+            start = time.perf_counter()
+            connection.request("GET", f"/reports/{rng.choice(report_ids)}/{endpoint}")
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[endpoint].append(elapsed)
+                latencies["all"].append(elapsed)
+        connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = len(latencies["all"])
+    print(f"{total} requests, concurrency {args.concurrency}: {elapsed:.2f} s, {total / elapsed:.0f} requests/s")
+    for endpoint in ENDPOINTS + ("all",):
+        values = latencies[endpoint]
+        if values:
+            print(f"  {endpoint:<13} n={len(values):<6} p50 {percentile(values, 0.5) * 1000:7.2f} ms   "
+                  f"p99 {percentile(values, 0.99) * 1000:7.2f} ms")
+
+    if server is not None:
+        server.stop_thread()
+        shutil.rmtree(server.storage_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Load-test the generate -> parse -> render pipeline with the fake powercfg.
+
+Each request generates a report with tools/fake_powercfg.py (through
+PowercfgDataSource, exactly as on Windows), parses it and renders the gauge
+and capacity chart to PNG. Requests run concurrently in worker processes.
+
+    python benchmarks/load_test_pipeline.py --requests 40 --concurrency 8 --periods 200 --latency 0.5
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from battery_repport import generate_battery_report, parse_battery_report
+from data_sources import PowercfgDataSource
+from visualization import create_battery_health_gauge, plot_capacity_history
+
+FAKE_POWERCFG = [sys.executable, os.path.join(ROOT, "tools", "fake_powercfg.py")]
+
+def run_request(output_path):
+    timings = {}
+
+    start = time.perf_counter()
+    generate_battery_report(output_path, data_source=PowercfgDataSource(FAKE_POWERCFG))
+    timings["generate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    metrics, _, _, capacity_data, _ = parse_battery_report(output_path)
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for fig in (create_battery_health_gauge(metrics.get("Full Charge Capacity", "0"),
+                                            metrics.get("Design Capacity", "0")),
+                plot_capacity_history(*capacity_data)):
+        fig.savefig(io.BytesIO(), format="png")
+    timings["render"] = time.perf_counter() - start
+
+    timings["total"] = sum(timings.values())
+    return timings
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--periods", type=int, default=52, help="Capacity history periods per report")
+    parser.add_argument("--usage-rows", type=int, default=200, help="Rows per usage table")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated powercfg latency in seconds")
+    args = parser.parse_args()
+
+    # Inherited by the fake powercfg processes
+    os.environ["FAKE_POWERCFG_PERIODS"] = str(args.periods)
+    os.environ["FAKE_POWERCFG_USAGE_ROWS"] = str(args.usage_rows)
+    os.environ["FAKE_POWERCFG_LATENCY"] = str(args.latency)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [os.path.join(tmp_dir, f"battery-report-{i}.html") for i in range(args.requests)]
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(run_request, paths))
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}: "
+          f"{elapsed:.2f} s, {args.requests / elapsed:.1f} requests/s")
+    for stage in ("generate", "parse", "render", "total"):
+        values = [r[stage] for r in results]
+        print(f"  {stage:<9} p50 {percentile(values, 0.5) * 1000:8.1f} ms   "
+              f"p99 {percentile(values, 0.99) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
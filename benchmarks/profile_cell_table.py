@@ -0,0 +1,48 @@
+"""
+Profile parse_battery_report and count get_text calls against table cells.
+
+With the shared CellTable the text of every <td>/<th> is collected in one walk
+per table, so no cell is read more than once and the only get_text calls left
+are the SectionLocator's, one per h2/h3 heading. Run from the project root:
+
+    python benchmarks/profile_cell_table.py [usage_rows]
+"""
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from battery_repport import parse_battery_report
+from synthetic_report import write_battery_report
+
+def get_text_calls(stats):
+    return sum(calls for (_, _, name), (_, calls, *_rest) in stats.stats.items() if name == "get_text")
+
+def main():
+    usage_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    handle, path = tempfile.mkstemp(suffix=".html")
+    os.close(handle)
+    try:
+        write_battery_report(path, periods=104, usage_rows=usage_rows)
+        with open(path, encoding="utf-8") as f:
+            soup = BeautifulSoup(f.read(), "html.parser")
+        cells = len(soup.find_all(["td", "th"]))
+        headings = len(soup.find_all(["h2", "h3"]))
+
+        profiler = cProfile.Profile()
+        profiler.runcall(parse_battery_report, path)
+        stats = pstats.Stats(profiler)
+
+        calls = get_text_calls(stats)
+        print(f"{cells} cells, {headings} headings, {calls} get_text calls "
+              f"({max(calls - headings, 0) / cells:.2f} per cell)")
+        stats.sort_stats("cumulative").print_stats(12)
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,8 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "battery_health_monitor=src.main:main"
+            "battery_health_monitor=src.main:main",
+            "battery_fleet_summary=src.aggregation:main"
         ]
     },
     author="Achref",
@@ -0,0 +1,399 @@
+import heapq
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from battery_repport import IncompleteReportError, parse_battery_report, parse_number
+from dedup import DedupIndex
+from section_locator import COMPUTER_NAME_LABELS, METRIC_LABELS, PRODUCT_NAME_LABELS, labeled_value
+
+# Histogram ranges; values outside are counted as underflow/overflow
+DEGRADATION_RANGE = (0, 20)    # % health lost per 100 cycles
+CYCLE_RANGE = (0, 2000)
+
+class RunningMoments:
+    """
+    Count, mean, variance, min and max of a stream, in constant memory.
+
+    Two instances built on different workers can be combined with merge().
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+class FixedBinHistogram:
+    """
+    Histogram with fixed, equal-width bins over [low, high).
+
+    Values outside the range are counted in underflow/overflow. Histograms
+    with the same bins merge by adding counts, and quantiles are estimated by
+    interpolating inside the bin, so their error is at most one bin width.
+    """
+
+    def __init__(self, low, high, bins):
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.width = (high - low) / bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @property
+    def total(self):
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+    def add(self, value):
+        if value < self.low:
+            self.underflow += 1
+        elif value >= self.high:
+            self.overflow += 1
+        else:
+            self.counts[int((value - self.low) / self.width)] += 1
+
+    def merge(self, other):
+        if (self.low, self.high, self.bins) != (other.low, other.high, other.bins):
+            raise ValueError("Cannot merge histograms with different bins")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def quantile(self, q):
+        """
+        Estimate the q-th quantile (0 <= q <= 1).
+
+        Returns:
+            float or None: The estimate, or None if the histogram is empty
+        """
+        total = self.total
+        if total == 0:
+            return None
+        rank = q * total
+        if rank <= self.underflow:
+            return float(self.low)
+        cumulative = np.cumsum(self.counts) + self.underflow
+        index = int(np.searchsorted(cumulative, rank))
+        if index >= self.bins:
+            return float(self.high)
+        before = cumulative[index - 1] if index > 0 else self.underflow
+        fraction = (rank - before) / self.counts[index] if self.counts[index] else 0.0
+        return self.low + (index + fraction) * self.width
+
+    def rows(self):
+        """
+        Returns:
+            list: (bin start, bin end, count) for every non-empty bin
+        """
+        return [(self.low + i * self.width, self.low + (i + 1) * self.width, int(count))
+                for i, count in enumerate(self.counts) if count]
+
+class _ModelStats:
+    def __init__(self):
+        self.health = RunningMoments()
+        self.cycles = RunningMoments()
+        self.degradation = FixedBinHistogram(*DEGRADATION_RANGE, 200)
+
+    def merge(self, other):
+        self.health.merge(other.health)
+        self.cycles.merge(other.cycles)
+        self.degradation.merge(other.degradation)
+        return self
+
+class FleetAggregator:
+    """
+    Streaming fleet statistics over parsed battery reports.
+
+    Memory does not grow with the number of reports: distributions are kept
+    in fixed-bin histograms and running moments, outliers in bounded heaps.
+    Degradation rate is the health lost per 100 charge cycles.
+    """
+
+    def __init__(self, max_outliers=10):
+        self.max_outliers = max_outliers
+        self.reports = 0
+        self.skipped = 0
+        self.health = RunningMoments()
+        self.health_histogram = FixedBinHistogram(0, 120, 240)
+        self.cycle_histogram = FixedBinHistogram(*CYCLE_RANGE, 80)
+        self.models = {}
+        # Heaps hold (key, device) so the worst entries are evicted last
+        self._lowest_health = []
+        self._fastest_degradation = []
+
+    def add(self, metrics, details=None, source=None):
+        """
+        Add one report's parsed metrics.
+
+        Parameters:
+            metrics (dict): Metrics returned by parse_battery_report
+            details (dict): Details returned by parse_battery_report
+            source (str): Name used in outlier lists when the report has no computer name
+
+        Returns:
+            bool: False if the report had no usable capacity values
+        """
+        details = details or {}
+        design = parse_number(labeled_value(metrics, METRIC_LABELS["Design Capacity"]))
+        full_charge = parse_number(labeled_value(metrics, METRIC_LABELS["Full Charge Capacity"]))
+        if not design or full_charge is None:
+            self.skipped += 1
+            return False
+
+        self.reports += 1
+        health = full_charge / design * 100
+        cycles = parse_number(labeled_value(metrics, METRIC_LABELS["Cycle Count"]))
+        # The plain "Name" row is the battery's name, not the machine model
+        model = labeled_value(details, PRODUCT_NAME_LABELS) or "Unknown"
+        device = labeled_value(details, COMPUTER_NAME_LABELS) or source or f"report {self.reports}"
+
+        stats = self.models.get(model)
+        if stats is None:
+            stats = self.models[model] = _ModelStats()
+
+        self.health.add(health)
+        self.health_histogram.add(health)
+        stats.health.add(health)
+        self._push(self._lowest_health, -health, device)
+
+        if cycles:
+            rate = max(0.0, 100 - health) / cycles * 100
+            self.cycle_histogram.add(cycles)
+            stats.cycles.add(cycles)
+            stats.degradation.add(rate)
+            self._push(self._fastest_degradation, rate, device)
+
+        return True
+
+    def add_report(self, parsed, source=None):
+        """
+        Add the tuple returned by parse_battery_report.
+        """
+        metrics, details = parsed[0], parsed[1]
+        return self.add(metrics, details, source)
+
+    def _push(self, heap, key, device):
+        if len(heap) < self.max_outliers:
+            heapq.heappush(heap, (key, device))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, device))
+
+    def merge(self, other):
+        """
+        Combine the partial results of another aggregator into this one.
+        """
+        self.reports += other.reports
+        self.skipped += other.skipped
+        self.health.merge(other.health)
+        self.health_histogram.merge(other.health_histogram)
+        self.cycle_histogram.merge(other.cycle_histogram)
+        for model, stats in other.models.items():
+            if model in self.models:
+                self.models[model].merge(stats)
+            else:
+                self.models[model] = stats
+        for key, device in other._lowest_health:
+            self._push(self._lowest_health, key, device)
+        for key, device in other._fastest_degradation:
+            self._push(self._fastest_degradation, key, device)
+        return self
+
+    def summary(self):
+        """
+        Returns:
+            dict: Fleet summary with health percentiles, cycle histogram,
+            per-model degradation percentiles and outlier lists
+        """
+        percentiles = (0.05, 0.25, 0.5, 0.75, 0.95)
+        return {
+            "reports": self.reports,
+            "skipped": self.skipped,
+            "health": {
+                "mean": self.health.mean,
+                "std": self.health.std,
+                "min": self.health.min if self.health.count else None,
+                "max": self.health.max if self.health.count else None,
+                "percentiles": {q: self.health_histogram.quantile(q) for q in percentiles}
+            },
+            "cycle_histogram": self.cycle_histogram.rows(),
+            "cycle_overflow": self.cycle_histogram.overflow,
+            "models": {
+                model: {
+                    "reports": stats.health.count,
+                    "mean_health": stats.health.mean,
+                    "mean_cycles": stats.cycles.mean if stats.cycles.count else None,
+                    "degradation_percentiles": {q: stats.degradation.quantile(q) for q in (0.5, 0.9, 0.99)},
+                    # Rates outside the histogram range; percentiles among them are clamped to its edges
+                    "degradation_underflow": stats.degradation.underflow,
+                    "degradation_overflow": stats.degradation.overflow
+                }
+                for model, stats in sorted(self.models.items())
+            },
+            "lowest_health": [(device, -key) for key, device in sorted(self._lowest_health, reverse=True)],
+            "fastest_degradation": [(device, key) for key, device in sorted(self._fastest_degradation, reverse=True)]
+        }
+
+def format_summary(summary):
+    """
+    Format a fleet summary for the terminal.
+
+    Parameters:
+        summary (dict): Result of FleetAggregator.summary()
+
+    Returns:
+        str: Human-readable summary
+    """
+    def fmt(value, suffix=""):
+        return "N/A" if value is None else f"{value:.1f}{suffix}"
+
+    lines = [f"Fleet summary: {summary['reports']} reports ({summary['skipped']} skipped)", ""]
+
+    health = summary["health"]
+    lines.append("Battery health:")
+    lines.append(f"  mean {fmt(health['mean'], '%')}, std {fmt(health['std'])}, "
+                 f"min {fmt(health['min'], '%')}, max {fmt(health['max'], '%')}")
+    lines.append("  " + ", ".join(f"p{int(q * 100)} {fmt(v, '%')}" for q, v in health["percentiles"].items()))
+    lines.append("")
+
+    lines.append("Cycle count histogram:")
+    for start, end, count in summary["cycle_histogram"]:
+        lines.append(f"  {int(start):>5}-{int(end) - 1:<5} {count}")
+    if summary["cycle_overflow"]:
+        lines.append(f"  {'>=' + str(CYCLE_RANGE[1]):<11} {summary['cycle_overflow']}")
+    lines.append("")
+
+    lines.append("Degradation rate per model (% health lost per 100 cycles):")
+    for model, stats in summary["models"].items():
+        rates = stats["degradation_percentiles"]
+        line = (f"  {model}: {stats['reports']} reports, mean health {fmt(stats['mean_health'], '%')}, "
+                f"p50 {fmt(rates[0.5])}, p90 {fmt(rates[0.9])}, p99 {fmt(rates[0.99])}")
+        if stats["degradation_overflow"]:
+            line += f" ({stats['degradation_overflow']} above {DEGRADATION_RANGE[1]}, not resolved)"
+        lines.append(line)
+    lines.append("")
+
+    lines.append("Lowest health:")
+    for device, value in summary["lowest_health"]:
+        lines.append(f"  {device}: {value:.1f}%")
+    lines.append("Fastest degradation:")
+    for device, value in summary["fastest_degradation"]:
+        lines.append(f"  {device}: {value:.2f}% per 100 cycles")
+    return "\n".join(lines)
+
+def aggregate_files(file_paths):
+    """
+    Parse reports one at a time into a FleetAggregator.
+
+    Parameters:
+        file_paths (list): Paths of battery report HTML files
+
+    Returns:
+        FleetAggregator: Partial result for these files
+    """
+    aggregator = FleetAggregator()
+    for path in file_paths:
+        try:
+            # Strict parsing keeps dummy values out of the fleet statistics
+            try:
+                parsed = parse_battery_report(path, strict=True)
+            except IncompleteReportError as e:
+                parsed = e.partial
+            aggregator.add_report(parsed, source=os.path.basename(path))
+        except Exception as e:
+            print(f"Error parsing battery report {path}: {e}")
+            aggregator.skipped += 1
+    return aggregator
+
+def find_reports(paths):
+    """
+    Expand directories into the HTML reports they contain.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(".html"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print a fleet-wide summary of battery reports.")
+    parser.add_argument("paths", nargs="+", help="Battery report files or folders containing them")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of parser processes")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Skip duplicate files and count only the newest report of each device")
+    args = parser.parse_args()
+
+    file_paths = list(find_reports(args.paths))
+    if not file_paths:
+        print("No battery reports found.")
+        return
+
+    if args.dedup:
+        index = DedupIndex().add_paths(file_paths)
+        file_paths = index.latest_per_device()
+        stats = index.stats()
+        print(f"Deduplicated {stats['files']} files: {stats['duplicates']} duplicates, "
+              f"{stats['distinct']} distinct reports from {stats['devices']} devices\n")
+
+    # Each worker aggregates a contiguous chunk; partial results are merged here
+    workers = max(1, min(args.workers, len(file_paths)))
+    chunk_size = math.ceil(len(file_paths) / workers)
+    chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+
+    aggregator = FleetAggregator()
+    if len(chunks) == 1:
+        aggregator.merge(aggregate_files(chunks[0]))
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            for partial in executor.map(aggregate_files, chunks):
+                aggregator.merge(partial)
+
+    print(format_summary(aggregator.summary()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+import math
+import os
+import re
+import sys
+from collections import namedtuple
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from battery_repport import parse_number
+from comparison import load_capacity_series
+from dedup import DeviceKey, read_device_key
+from report_reader import read_battery_usage
+from section_locator import COMPUTER_NAME_LABELS, labeled_value
+
+# One alert: which device and series, where in the series (period or start
+# time), the value that triggered it, the detectors that fired and the
+# largest score among them
+Anomaly = namedtuple("Anomaly", ["device", "series", "position", "value", "detectors", "score"])
+
+# What the monitor needs from one report, read in a worker process by
+# load_monitored_report: the capacity series, the device and every usage row
+MonitoredReport = namedtuple("MonitoredReport", ["series", "device", "usage"])
+
+_DATE = re.compile(r'\s*(\d{4}-\d{2}-\d{2})\s*')
+
+class EwmaDetector:
+    """
+    Deviation from an exponentially weighted moving mean and variance.
+
+    update() returns how many standard deviations a value lies from the
+    average of the values before it (None while warming up).
+    """
+    __slots__ = ("alpha", "warmup", "min_std", "count", "mean", "var")
+
+    def __init__(self, alpha=0.3, warmup=4, min_std=0.25):
+        self.alpha = alpha
+        self.warmup = warmup
+        self.min_std = min_std
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+
+    def update(self, value):
+        score = None
+        if self.count >= self.warmup:
+            score = (value - self.mean) / max(math.sqrt(self.var), self.min_std)
+
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.count += 1
+        return score
+
+class CusumDetector:
+    """
+    One-sided CUSUM of standardized values, for small but persistent shifts.
+
+    Values are standardized against a slow EWMA reference. direction=-1
+    accumulates drops, direction=1 rises. update() returns the cumulative sum,
+    which restarts from zero after it crosses `threshold`.
+    """
+    __slots__ = ("direction", "drift", "threshold", "reference", "total")
+
+    def __init__(self, direction=-1, drift=0.5, threshold=5.0, alpha=0.1, warmup=4, min_std=0.25):
+        self.direction = direction
+        self.drift = drift
+        self.threshold = threshold
+        self.reference = EwmaDetector(alpha, warmup, min_std)
+        self.total = 0.0
+
+    def update(self, value):
+        z = self.reference.update(value)
+        if z is None:
+            return None
+        self.total = max(0.0, self.total + self.direction * z - self.drift)
+        score = self.total
+        if score >= self.threshold:
+            self.total = 0.0
+        return score
+
+class WindowZScoreDetector:
+    """
+    Z-score of a value against the last `window` values.
+
+    The window is a fixed-size ring buffer with running sums, so each update
+    is O(1) and the state does not grow with the length of the series.
+    """
+    __slots__ = ("values", "index", "count", "total", "total_sq", "min_std")
+
+    def __init__(self, window=16, min_std=0.25):
+        self.values = [0.0] * window
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min_std = min_std
+
+    def update(self, value):
+        window = len(self.values)
+        score = None
+        if self.count >= min(window, 4):
+            n = min(self.count, window)
+            mean = self.total / n
+            var = max(0.0, self.total_sq / n - mean * mean)
+            score = (value - mean) / max(math.sqrt(var), self.min_std)
+
+        old = self.values[self.index]
+        if self.count >= window:
+            self.total -= old
+            self.total_sq -= old * old
+        self.values[self.index] = value
+        self.total += value
+        self.total_sq += value * value
+        self.index = (self.index + 1) % window
+        self.count += 1
+        return score
+
+class _SeriesState:
+    # Detectors for one series of one device, plus the last position seen
+    __slots__ = ("direction", "ewma", "cusum", "window", "last_position", "last_value", "last_date")
+
+    def __init__(self, direction, window, alpha, drift, cusum_threshold, min_std):
+        self.direction = direction
+        self.ewma = EwmaDetector(alpha, min_std=min_std)
+        self.cusum = CusumDetector(direction, drift, cusum_threshold, min_std=min_std)
+        self.window = WindowZScoreDetector(window, min_std)
+        self.last_position = None
+        self.last_value = None
+        self.last_date = None
+
+def _hours(duration):
+    # "1:23:45" or "0:38:00" -> hours
+    match = re.match(r'\s*(\d+):(\d{2})(?::(\d{2}))?', duration or "")
+    if not match:
+        return None
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours + minutes / 60 + seconds / 3600
+
+def usage_drain_rate(row, min_hours=5 / 60):
+    """
+    Drain rate of a battery usage row in percent of full charge per hour.
+
+    Parameters:
+        row (dict): Usage row keyed by header (see read_battery_usage)
+        min_hours (float): Shorter rows are ignored, their rates are mostly rounding noise
+
+    Returns:
+        float or None: The rate, or None if the row has no drain or is too short
+    """
+    duration = drained = None
+    for key, value in row.items():
+        label = key.lower()
+        if duration is None and ("duration" in label or "dauer" in label or "durée" in label or "duración" in label):
+            duration = _hours(value)
+        elif drained is None and "%" in label:
+            drained = parse_number(value)
+    if not duration or duration < min_hours or drained is None:
+        return None
+    return drained / duration
+
+class AnomalyMonitor:
+    """
+    Online anomaly detection on capacity and usage series of many devices.
+
+    Each point is fed through an EWMA, a CUSUM and a windowed z-score
+    detector. Capacity is tracked as the change in health (percent of design
+    capacity) from one period to the next, so normal slow wear is not
+    flagged but sudden drops are; usage is tracked as (log) drain rate,
+    where spikes are flagged. State per device is a fixed number of floats, and
+    points at or before the last position seen are skipped, so overlapping
+    reports of the same device can be fed again.
+
+    An instance is a report sink (see comparison.load_reports and
+    watcher.ReportWatcher): call it as monitor(path, result).
+    """
+
+    def __init__(self, alert_sinks=(), window=16, alpha=0.3, threshold=4.0,
+                 cusum_drift=0.5, cusum_threshold=5.0):
+        """
+        Parameters:
+            alert_sinks (iterable): Callables invoked as sink(anomaly) for every alert
+            window (int): Length of the z-score window
+            alpha (float): EWMA smoothing factor
+            threshold (float): Standard deviations for the EWMA and z-score detectors
+            cusum_drift (float): Allowed drift per point before CUSUM accumulates
+            cusum_threshold (float): CUSUM alarm level
+        """
+        self.alert_sinks = list(alert_sinks)
+        self.window = window
+        self.alpha = alpha
+        self.threshold = threshold
+        self.cusum_drift = cusum_drift
+        self.cusum_threshold = cusum_threshold
+        self.devices = {}
+        self.points = 0
+        self.alerts = 0
+
+    def _series(self, device, series):
+        states = self.devices.get(device)
+        if states is None:
+            states = self.devices[device] = {}
+        state = states.get(series)
+        if state is None:
+            # Capacity alerts on drops in health (percentage points), usage
+            # on rises in log drain rate, which tames its long right tail
+            direction, min_std = (-1, 0.25) if series == "capacity" else (1, 0.1)
+            state = states[series] = _SeriesState(direction, self.window, self.alpha,
+                                                  self.cusum_drift, self.cusum_threshold, min_std)
+        return state
+
+    def _update(self, device, series, position, value, signal=None):
+        state = self._series(device, series)
+        if position is not None:
+            if state.last_position is not None and position <= state.last_position:
+                return None
+            state.last_position = position
+        self.points += 1
+
+        fired = []
+        for name, detector, limit in (("ewma", state.ewma, self.threshold),
+                                      ("window", state.window, self.threshold),
+                                      ("cusum", state.cusum, self.cusum_threshold)):
+            score = detector.update(value if signal is None else signal)
+            if score is None:
+                continue
+            if name != "cusum":
+                score *= state.direction
+            if score >= limit:
+                fired.append((name, score))
+        if not fired:
+            return None
+
+        anomaly = Anomaly(device, series, position, value,
+                          tuple(name for name, _ in fired), max(score for _, score in fired))
+        self.alerts += 1
+        for sink in self.alert_sinks:
+            try:
+                sink(anomaly)
+            except Exception as e:
+                print(f"Error in anomaly sink for {device}: {e}")
+        return anomaly
+
+    def update_capacity(self, device, period, full_charge, design):
+        """
+        Feed one capacity history period.
+
+        Parameters:
+            device (hashable): Device identifier (e.g. dedup.DeviceKey)
+            period (str): Period label; ISO dated labels order the points
+            full_charge (int): Full charge capacity in mWh
+            design (int): Design capacity in mWh
+
+        Returns:
+            Anomaly or None: The alert raised by this point
+        """
+        if not design:
+            return None
+        state = self._series(device, "capacity")
+        # A period already seen (e.g. from an older report fed late) must not
+        # replace the value the next new period is compared with
+        if period is not None and state.last_position is not None and period <= state.last_position:
+            return None
+        health = full_charge / design * 100
+        previous, state.last_value = state.last_value, health
+        if previous is None:
+            state.last_position = period
+            return None
+        return self._update(device, "capacity", period, health - previous)
+
+    def update_usage(self, device, row):
+        """
+        Feed one battery usage row.
+
+        Parameters:
+            device (hashable): Device identifier
+            row (dict): Usage row keyed by header; its first value (the start time) orders the rows
+
+        Returns:
+            Anomaly or None: The alert raised by this row
+        """
+        # Reports print the date only on the first row of each day; later
+        # rows of the day carry the time alone
+        state = self._series(device, "usage")
+        position = next(iter(row.values()), None)
+        date = _DATE.match(position or "")
+        if date:
+            state.last_date = date.group(1)
+            position = f"{date.group(1)} {position[date.end():]}"
+        elif position and state.last_date:
+            position = f"{state.last_date} {position.strip()}"
+
+        rate = usage_drain_rate(row)
+        if rate is None:
+            return None
+        return self._update(device, "usage", position, rate, math.log1p(rate))
+
+    def consume_capacity_history(self, device, capacity_data):
+        """
+        Feed the periods returned by extract_capacity_history.
+
+        Returns:
+            list: Alerts raised
+        """
+        periods, full_charges, design_capacities = capacity_data
+        alerts = []
+        for period, full_charge, design in zip(periods, full_charges, design_capacities):
+            anomaly = self.update_capacity(device, period, int(full_charge), int(design))
+            if anomaly:
+                alerts.append(anomaly)
+        return alerts
+
+    def consume_usage_history(self, device, rows):
+        """
+        Feed battery usage rows (see report_reader.read_battery_usage).
+
+        Returns:
+            list: Alerts raised
+        """
+        alerts = []
+        for row in rows:
+            anomaly = self.update_usage(device, row)
+            if anomaly:
+                alerts.append(anomaly)
+        return alerts
+
+    def __call__(self, path, result):
+        """
+        Report sink: feed a MonitoredReport, a CapacitySeries or a
+        parse_battery_report tuple.
+
+        Only the result is used; the report is not read again, as sinks run
+        on the caller's callback thread. The device is the one in a
+        MonitoredReport, the computer name of a parse tuple, or else the
+        report's file name. A CapacitySeries carries no usage rows, and a
+        parse tuple only the first ones; use load_monitored_report as the
+        parse function to monitor the whole "Battery usage" table.
+        """
+        device = None
+        usage = ()
+        if isinstance(result, MonitoredReport):
+            device, usage = result.device, result.usage
+            result = result.series
+        if isinstance(result, tuple) and not hasattr(result, "_fields"):
+            _, details, usage, capacity_data, _ = result
+            computer_name = labeled_value(details, COMPUTER_NAME_LABELS)
+            device = DeviceKey(computer_name, None) if computer_name else None
+        else:
+            capacity_data = (result.periods, result.full_charge, result.design)
+        device = device or os.path.basename(path)
+
+        alerts = self.consume_capacity_history(device, capacity_data)
+        alerts += self.consume_usage_history(device, usage)
+        return alerts
+
+def load_monitored_report(file_path):
+    """
+    Parse function for AnomalyMonitor (see watcher.ReportWatcher and
+    comparison.load_reports).
+
+    Runs in the worker process, so the device key and the whole "Battery
+    usage" table are read there rather than in the sink.
+
+    Parameters:
+        file_path (str): Path to the battery report HTML
+
+    Returns:
+        MonitoredReport: The capacity series, the DeviceKey (None if the
+        report names neither computer nor battery) and the usage rows
+    """
+    series = load_capacity_series(file_path)
+    device, _ = read_device_key(file_path)
+    return MonitoredReport(series, device, read_battery_usage(file_path))
+
+def print_anomaly(anomaly):
+    """Alert sink that prints one line per anomaly."""
+    what = "health drop" if anomaly.series == "capacity" else "drain spike"
+    unit = "points" if anomaly.series == "capacity" else "%/h"
+    print(f"ALERT {anomaly.device}: {what} at {anomaly.position} ({anomaly.value:+.2f} {unit}, "
+          f"{', '.join(anomaly.detectors)}, score {anomaly.score:.1f})")
@@ -0,0 +1,446 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from battery_repport import IncompleteReportError, parse_battery_report
+from visualization import HealthGaugeRenderer, plot_capacity_history
+
+STATUS_TEXT = {
+    200: "OK", 201: "Created", 304: "Not Modified", 400: "Bad Request", 403: "Forbidden",
+    404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+    422: "Unprocessable Entity", 500: "Internal Server Error"
+}
+JSON_RESOURCES = ("metrics", "details", "usage", "capacity")
+PNG_RESOURCES = ("gauge.png", "capacity.png")
+
+# Gauge renderer of this worker process, created on first use
+_gauge_renderer = None
+
+def parse_report_data(file_path):
+    """
+    Parse a report into JSON-ready data. Runs in the worker pool.
+
+    Parameters:
+        file_path (str): Path to the battery report HTML
+
+    Returns:
+        dict: metrics, details, usage, capacity and the names of missing sections
+    """
+    missing = []
+    try:
+        parsed = parse_battery_report(file_path, strict=True)
+    except IncompleteReportError as e:
+        parsed, missing = e.partial, e.missing
+    metrics, details, usage_history, (periods, full_charges, design_capacities), _ = parsed
+    return {
+        "metrics": metrics,
+        "details": details,
+        "usage": usage_history,
+        "capacity": {
+            "periods": periods,
+            "full_charge_capacities": full_charges,
+            "design_capacities": design_capacities
+        },
+        "missing": missing
+    }
+
+def render_png(kind, data):
+    """
+    Render the gauge or the capacity chart of parsed report data. Runs in the worker pool.
+
+    Parameters:
+        kind (str): "gauge.png" or "capacity.png"
+        data (dict): Result of parse_report_data
+
+    Returns:
+        bytes: PNG image
+    """
+    global _gauge_renderer
+    if kind == "gauge.png":
+        if _gauge_renderer is None:
+            _gauge_renderer = HealthGaugeRenderer()
+        metrics = data["metrics"]
+        return _gauge_renderer.render_report_png(metrics.get("Full Charge Capacity", "0 mWh"),
+                                                 metrics.get("Design Capacity", "0 mWh"))
+
+    capacity = data["capacity"]
+    fig = plot_capacity_history(capacity["periods"], capacity["full_charge_capacities"],
+                                capacity["design_capacities"])
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+class ResponseCache:
+    """
+    LRU cache of response bodies keyed by ETag, bounded by total size.
+
+    Report ids are content hashes, so an ETag never has to be invalidated;
+    entries only leave the cache when it is full.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, etag):
+        entry = self._entries.get(etag)
+        if entry is not None:
+            self._entries.move_to_end(etag)
+        return entry
+
+    def put(self, etag, content_type, body):
+        if etag in self._entries:
+            self.size -= len(self._entries.pop(etag)[1])
+        self._entries[etag] = (content_type, body)
+        self.size += len(body)
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            _, (_, old_body) = self._entries.popitem(last=False)
+            self.size -= len(old_body)
+
+class BatteryApiServer:
+    """
+    Local HTTP/JSON API for battery reports.
+
+    Endpoints:
+        POST /reports                   upload report HTML, or JSON {"path": ...} inside an allowed directory
+        GET  /reports                   list report ids
+        GET  /reports/<id>/metrics      key metrics (also details, usage, capacity)
+        GET  /reports/<id>/gauge.png    rendered health gauge (also capacity.png)
+        GET  /health                    liveness check
+
+    Parsing and rendering run in a process pool; concurrent requests for the
+    same resource share one computation, and results are served from an
+    ETag-keyed cache (If-None-Match returns 304).
+    """
+
+    def __init__(self, storage_dir=None, allowed_dirs=(), max_workers=None,
+                 cache_bytes=64 * 1024 * 1024, max_upload=64 * 1024 * 1024):
+        self.storage_dir = storage_dir or tempfile.mkdtemp(prefix="battery-api-")
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self.allowed_dirs = [os.path.realpath(d) for d in allowed_dirs]
+        self.max_workers = max_workers
+        self.max_upload = max_upload
+        self.cache = ResponseCache(cache_bytes)
+        self.executor = None
+        self.server = None
+        self.port = None
+        self._loop = None
+        self._thread = None
+        self._parsed = OrderedDict()
+        self._inflight = {}
+
+        # Reports uploaded before a restart are still served
+        self.reports = {}
+        for name in os.listdir(self.storage_dir):
+            if name.endswith(".html"):
+                self.reports[name[:-5]] = os.path.join(self.storage_dir, name)
+
+    # Report storage
+
+    def _store(self, content):
+        # Returns the report id and whether the report is new
+        report_id = hashlib.sha256(content).hexdigest()[:20]
+        if report_id in self.reports:
+            return report_id, False
+        path = os.path.join(self.storage_dir, f"{report_id}.html")
+        with open(path, "wb") as f:
+            f.write(content)
+        self.reports[report_id] = path
+        return report_id, True
+
+    def _discard(self, report_id):
+        path = self.reports.pop(report_id, None)
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _path_allowed(self, path):
+        real_path = os.path.realpath(path)
+        return any(os.path.commonpath([real_path, allowed]) == allowed for allowed in self.allowed_dirs)
+
+    # Cached computations
+
+    async def _once(self, key, factory):
+        # Share one computation between concurrent requests for the same key
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await task
+
+    async def _parsed_data(self, report_id):
+        data = self._parsed.get(report_id)
+        if data is not None:
+            self._parsed.move_to_end(report_id)
+            return data
+
+        async def parse():
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, parse_report_data, self.reports[report_id])
+            self._parsed[report_id] = result
+            while len(self._parsed) > 256:
+                self._parsed.popitem(last=False)
+            return result
+
+        return await self._once(("parse", report_id), parse)
+
+    async def _resource(self, report_id, resource):
+        etag = f'"{report_id}-{resource}"'
+        cached = self.cache.get(etag)
+        if cached is not None:
+            return etag, cached
+
+        async def build():
+            data = await self._parsed_data(report_id)
+            if resource in JSON_RESOURCES:
+                content_type = "application/json"
+                body = json.dumps(data[resource]).encode("utf-8")
+            else:
+                loop = asyncio.get_running_loop()
+                content_type = "image/png"
+                body = await loop.run_in_executor(self.executor, render_png, resource, data)
+            self.cache.put(etag, content_type, body)
+            return content_type, body
+
+        return etag, await self._once(("resource", etag), build)
+
+    # HTTP handling
+
+    @staticmethod
+    def _json(status, payload):
+        return status, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8")
+
+    async def handle(self, method, path, headers, body):
+        """
+        Route one request.
+
+        Returns:
+            tuple: (status, headers dict, body bytes)
+        """
+        parts = [part for part in urlsplit(path).path.split("/") if part]
+
+        if parts == ["health"]:
+            return self._json(200, {"status": "ok"})
+
+        if parts == ["reports"]:
+            if method == "GET":
+                return self._json(200, {"reports": sorted(self.reports)})
+            if method != "POST":
+                return self._json(405, {"error": "Use GET or POST"})
+            return await self._create_report(headers, body)
+
+        if len(parts) == 3 and parts[0] == "reports":
+            report_id, resource = parts[1], parts[2]
+            if method != "GET":
+                return self._json(405, {"error": "Use GET"})
+            if report_id not in self.reports:
+                return self._json(404, {"error": f"Unknown report {report_id}"})
+            if resource not in JSON_RESOURCES + PNG_RESOURCES:
+                return self._json(404, {"error": f"Unknown resource {resource}"})
+
+            etag, (content_type, payload) = await self._resource(report_id, resource)
+            response_headers = {"ETag": etag, "Cache-Control": "max-age=31536000, immutable"}
+            if headers.get("if-none-match") == etag:
+                return 304, response_headers, b""
+            response_headers["Content-Type"] = content_type
+            return 200, response_headers, payload
+
+        return self._json(404, {"error": "Not found"})
+
+    async def _create_report(self, headers, body):
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("application/json"):
+            try:
+                path = json.loads(body.decode("utf-8"))["path"]
+            except (ValueError, KeyError, TypeError):
+                return self._json(400, {"error": 'Expected {"path": "..."}'})
+            if not self._path_allowed(path):
+                return self._json(403, {"error": "Path is outside the allowed directories"})
+            try:
+                with open(path, "rb") as f:
+                    body = f.read()
+            except OSError as e:
+                return self._json(404, {"error": str(e)})
+
+        if not body:
+            return self._json(400, {"error": "Empty report"})
+
+        report_id, created = self._store(body)
+        try:
+            data = await self._parsed_data(report_id)
+        except Exception as e:
+            # An upload that cannot be parsed is not kept, so its id is never listed or served
+            if created:
+                self._discard(report_id)
+            return self._json(422, {"error": f"Could not parse report: {e}"})
+
+        links = {name: f"/reports/{report_id}/{name}" for name in JSON_RESOURCES + PNG_RESOURCES}
+        return self._json(201, {"id": report_id, "missing": data["missing"], "links": links})
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                request = request_line.decode("latin-1").split()
+                if len(request) != 3 or not request[2].startswith("HTTP/"):
+                    await self._write_response(writer, *self._json(400, {"error": "Malformed request line"}), False)
+                    break
+                method, target, version = request
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, response_headers, payload = self._json(400, {"error": "Invalid Content-Length"})
+                    keep_alive = False
+                elif length > self.max_upload:
+                    status, response_headers, payload = self._json(413, {"error": "Report too large"})
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, response_headers, payload = await self.handle(method, target, headers, body)
+                    except Exception as e:
+                        status, response_headers, payload = self._json(500, {"error": str(e)})
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                await self._write_response(writer, status, response_headers, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_response(writer, status, response_headers, payload, keep_alive):
+        head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+        response_headers["Content-Length"] = str(len(payload))
+        response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+        head.extend(f"{name}: {value}" for name, value in response_headers.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    # Lifecycle
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Start listening; port 0 picks a free port (see self.port)."""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def start_in_thread(self, host="127.0.0.1", port=0):
+        """
+        Run the server on its own event loop in a background thread.
+
+        Returns:
+            int: The port the server listens on
+
+        Raises:
+            OSError: If the server cannot listen (e.g. the port is in use);
+                errors from the thread are raised here
+        """
+        started = threading.Event()
+        errors = []
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.start(host, port))
+            except Exception as e:
+                errors.append(e)
+                self._loop.run_until_complete(self.close())
+                return
+            finally:
+                started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run)
+        self._thread.daemon = True
+        self._thread.start()
+        started.wait()
+        if errors:
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            raise errors[0]
+        return self.port
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve parsed battery report data over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--storage", default=None, help="Directory for uploaded reports (default: temporary)")
+    parser.add_argument("--allow-dir", action="append", default=[],
+                        help="Directory whose reports may be referenced by path (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parse/render processes")
+    args = parser.parse_args()
+
+    server = BatteryApiServer(storage_dir=args.storage, allowed_dirs=args.allow_dir, max_workers=args.workers)
+
+    async def serve():
+        await server.start(args.host, args.port)
+        print(f"Serving battery API on http://{args.host}:{server.port}")
+        try:
+            await server.server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.storage is None:
+            shutil.rmtree(server.storage_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -2,80 +2,134 @@ import subprocess
 from bs4 import BeautifulSoup
 import os
 import re
+import sys
 
-def generate_battery_report(output_path="battery-report.html"):
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from data_sources import PowercfgDataSource
+from section_locator import SectionLocator, header_labels, match_metric_label
+
+class IncompleteReportError(ValueError):
+    """
+    Raised in strict mode when a report lacks data the parser would otherwise invent.
+    
+    Attributes:
+        missing (list): Names of the sections without data
+        partial (tuple): The parse result with the missing parts left empty
     """
-    Generate a battery report using the Windows 'powercfg' command.
+    def __init__(self, file_path, missing, partial):
+        super().__init__(f"Missing sections in {file_path}: {', '.join(missing)}")
+        self.missing = missing
+        self.partial = partial
+
+def generate_battery_report(output_path="battery-report.html", data_source=None):
+    """
+    Generate a battery report, by default using the Windows 'powercfg' command.
     
     Parameters:
         output_path (str): The file path where the battery report will be saved.
+        data_source (BatteryDataSource): Source that produces the report
+            (default: powercfg, see data_sources.py for sysfs and saved reports)
     
     Returns:
         str: Path to the generated report
     """
+    if data_source is None:
+        data_source = PowercfgDataSource()
+    
     try:
-        # Get absolute path to ensure proper access
-        abs_output_path = os.path.abspath(output_path)
-        
-        # Construct and run the command to generate the report.
-        command = f'powercfg /batteryreport /output "{abs_output_path}"'
-        subprocess.run(command, shell=True, check=True)
+        abs_output_path = data_source.fetch_report(output_path)
         print(f"Battery report generated successfully at {abs_output_path}")
         return abs_output_path
     except subprocess.CalledProcessError as e:
         print(f"Error generating battery report: {e}")
         raise
 
-def extract_capacity_history(soup):
+def parse_number(text):
+    """
+    Extract a number from a report value such as "56,999 mWh", "56.999 mWh" or "12.5 %".
+    
+    A "." or "," followed by exactly three digits is a thousands separator,
+    as in localized reports; followed by any other number of digits it is a
+    decimal point.
+    
+    Parameters:
+        text (str): The value as shown in the report
+    
+    Returns:
+        int, float or None: The number (a float only if it has a decimal part), or None
+    """
+    if text is None:
+        return None
+    match = re.search(r'\d[\d,.\u00a0\u202f ]*\d|\d', str(text))
+    if not match:
+        return None
+    number = match.group(0)
+    decimal = re.search(r'[.,](\d+)$', number)
+    if decimal and len(decimal.group(1)) != 3:
+        whole = re.sub(r'\D', '', number[:decimal.start()]) or "0"
+        return float(f"{whole}.{decimal.group(1)}")
+    return int(re.sub(r'\D', '', number))
+
+def _is_capacity_header(row):
+    # Header cells are <th> in some reports and <td> in others
+    labels = row.headers or row.cells
+    return (len(labels) >= 3 and match_metric_label(labels[1]) == "Full Charge Capacity"
+            and match_metric_label(labels[2]) == "Design Capacity")
+
+def extract_capacity_history(soup, locator=None, strict=False):
     """
     Extract capacity history data from the battery report.
     
     Parameters:
         soup (BeautifulSoup): The parsed HTML
+        locator (SectionLocator): Section map of the report (built if not given)
+        strict (bool): Return empty lists instead of dummy data when nothing is found
     
     Returns:
-        tuple: Lists of periods, full charge capacities, and design capacities
+        tuple: Lists of periods, full charge capacities, and design capacities,
+        index-aligned (periods whose capacities cannot be read are skipped)
     """
     periods = []
     full_charge_capacities = []
     design_capacities = []
     
-    # Find the Battery Capacity History section - try different approaches
-    capacity_history_section = None
+    if locator is None:
+        locator = SectionLocator(soup)
+    cell_table = locator.cells
     
-    # Method 1: Look for h2 with "Battery capacity history"
-    for h2 in soup.find_all('h2'):
-        if 'Battery capacity history' in h2.get_text():
-            capacity_history_section = h2.find_next('table')
-            break
+    # Method 1: The "Battery capacity history" section (or a localized heading)
+    capacity_history_section = locator.table("capacity_history")
     
-    # Method 2: Look for any section that might contain capacity history data
+    # Method 2: Any table whose header row reads Period / Full Charge Capacity /
+    # Design Capacity. Matching on text alone would pick the metrics table,
+    # which also mentions "full charge".
     if not capacity_history_section:
-        for table in soup.find_all('table'):
-            if 'CAPACITY HISTORY' in table.get_text().upper() or 'FULL CHARGE' in table.get_text().upper():
+        for table, rows in cell_table.tables():
+            if rows and _is_capacity_header(rows[0]):
                 capacity_history_section = table
                 break
     
     if capacity_history_section:
         # Skip the header row
-        rows = capacity_history_section.find_all('tr')[1:]
-        for row in rows:
-            cells = row.find_all('td')
+        for row in cell_table.table_rows(capacity_history_section)[1:]:
+            cells = row.cells
             if len(cells) >= 3:
-                periods.append(cells[0].get_text(strip=True))
-                
-                # Extract numeric values using regex
-                full_charge_text = cells[1].get_text(strip=True)
-                full_charge_match = re.search(r'(\d+)', full_charge_text)
-                if full_charge_match:
-                    full_charge_capacities.append(int(full_charge_match.group(1)))
+                # Extract numeric values, ignoring thousands separators
+                full_charge = parse_number(cells[1])
+                design = parse_number(cells[2])
                 
-                design_text = cells[2].get_text(strip=True)
-                design_match = re.search(r'(\d+)', design_text)
-                if design_match:
-                    design_capacities.append(int(design_match.group(1)))
+                # A period without both capacities (e.g. "-") is left out,
+                # so the three lists stay aligned
+                if full_charge is None or design is None:
+                    continue
+                periods.append(cells[0])
+                full_charge_capacities.append(full_charge)
+                design_capacities.append(design)
     
     # If we couldn't find capacity history, create dummy data for testing
+    if not periods and strict:
+        return [], [], []
     if not periods:
         # This is just for visualization testing when real data isn't available
         print("WARNING: Could not find capacity history data. Using dummy data for testing.")
@@ -83,25 +137,17 @@ def extract_capacity_history(soup):
         
         # Try to get design capacity from metrics
         design_capacity = None
-        for table in soup.find_all('table'):
-            for row in table.find_all('tr'):
-                cells = row.find_all('td')
-                if len(cells) == 2 and "Design Capacity" in cells[0].get_text():
-                    design_match = re.search(r'(\d+)', cells[1].get_text())
-                    if design_match:
-                        design_capacity = int(design_match.group(1))
+        for row in cell_table.rows:
+            if len(row.cells) == 2 and match_metric_label(row.label_lower) == "Design Capacity":
+                design_capacity = parse_number(row.cells[1]) or design_capacity
         
         if not design_capacity:
             design_capacity = 50000  # Default value
             
         full_charge_capacity = None
-        for table in soup.find_all('table'):
-            for row in table.find_all('tr'):
-                cells = row.find_all('td')
-                if len(cells) == 2 and "Full Charge Capacity" in cells[0].get_text():
-                    full_match = re.search(r'(\d+)', cells[1].get_text())
-                    if full_match:
-                        full_charge_capacity = int(full_match.group(1))
+        for row in cell_table.rows:
+            if len(row.cells) == 2 and match_metric_label(row.label_lower) == "Full Charge Capacity":
+                full_charge_capacity = parse_number(row.cells[1]) or full_charge_capacity
         
         if not full_charge_capacity:
             full_charge_capacity = design_capacity * 0.8  # 80% health as default
@@ -112,29 +158,43 @@ def extract_capacity_history(soup):
     
     return periods, full_charge_capacities, design_capacities
 
-def find_battery_info(soup):
+def find_battery_info(soup, locator=None, strict=False):
     """
     Extract battery information from various table formats
     
     Parameters:
         soup (BeautifulSoup): Parsed HTML content
+        locator (SectionLocator): Section map of the report (built if not given)
+        strict (bool): Return an empty dict instead of default values when nothing is found
         
     Returns:
         dict: Dictionary with battery metrics
     """
     metrics = {}
     
+    if locator is None:
+        locator = SectionLocator(soup)
+    cell_table = locator.cells
+    
     # Try multiple approaches to find battery information
     
+    # Method 0: The "Installed batteries" section (or a localized heading).
+    # With several batteries the first battery's column is used.
+    installed_batteries = locator.table("installed_batteries")
+    if installed_batteries:
+        for row in cell_table.table_rows(installed_batteries):
+            if len(row.cells) >= 2:
+                key = match_metric_label(row.label_lower)
+                if key and key not in metrics:
+                    metrics[key] = row.cells[1]
+    
     # Method 1: Look for specific tables with battery information
-    for table in soup.find_all("table"):
-        table_text = table.get_text().lower()
+    for table, rows in ([] if metrics else cell_table.tables()):
+        table_text = cell_table.table_text(table)
         if any(key in table_text for key in ["design capacity", "full charge capacity", "cycle count"]):
-            for row in table.find_all("tr"):
-                cells = row.find_all("td")
-                if len(cells) == 2:
-                    label = cells[0].get_text(strip=True)
-                    value = cells[1].get_text(strip=True)
+            for row in rows:
+                if len(row.cells) == 2:
+                    label, value = row.cells
                     
                     # Check for key metrics
                     if any(key in label for key in ["Design Capacity", "Full Charge Capacity", "Cycle Count"]):
@@ -142,25 +202,25 @@ def find_battery_info(soup):
     
     # Method 2: Look for sections that might be labeled differently
     if not metrics:
-        for table in soup.find_all("table"):
-            for row in table.find_all("tr"):
-                cells = row.find_all("td")
-                if len(cells) == 2:
-                    label = cells[0].get_text(strip=True)
-                    value = cells[1].get_text(strip=True)
-                    
-                    # Use regex to look for capacity values
-                    if "capacity" in label.lower() and "mwh" in value.lower():
-                        if "design" in label.lower():
-                            metrics["Design Capacity"] = value
-                        elif "full" in label.lower():
-                            metrics["Full Charge Capacity"] = value
-                    
-                    # Look for cycle count
-                    if "cycle" in label.lower() and re.search(r'\d+', value):
-                        metrics["Cycle Count"] = value
+        for row in cell_table.rows:
+            if len(row.cells) == 2:
+                label = row.label_lower
+                value = row.cells[1]
+                
+                # Use regex to look for capacity values
+                if "capacity" in label and "mwh" in value.lower():
+                    if "design" in label:
+                        metrics["Design Capacity"] = value
+                    elif "full" in label:
+                        metrics["Full Charge Capacity"] = value
+                
+                # Look for cycle count
+                if "cycle" in label and re.search(r'\d+', value):
+                    metrics["Cycle Count"] = value
     
     # If still no metrics, add default values for testing
+    if not metrics and strict:
+        return {}
     if not metrics:
         print("WARNING: Could not find battery metrics. Using default values for testing.")
         metrics = {
@@ -171,12 +231,39 @@ def find_battery_info(soup):
     
     return metrics
 
-def parse_battery_report(file_path="battery-report.html"):
+def add_battery_health(metrics):
+    """
+    Add the "Battery Health" percentage (full charge / design capacity) to metrics.
+    
+    Parameters:
+        metrics (dict): Metrics from find_battery_info, updated in place
+    
+    Returns:
+        dict: The same metrics dictionary
+    """
+    try:
+        design_capacity_str = metrics.get("Design Capacity", "0 mWh")
+        full_charge_str = metrics.get("Full Charge Capacity", "0 mWh")
+        
+        design_capacity = parse_number(design_capacity_str)
+        full_charge = parse_number(full_charge_str)
+        
+        if design_capacity is not None and full_charge is not None:
+            if design_capacity > 0:
+                health_pct = (full_charge / design_capacity) * 100
+                metrics["Battery Health"] = f"{health_pct:.1f}%"
+    except Exception as e:
+        print(f"Error calculating battery health: {e}")
+    return metrics
+
+def parse_battery_report(file_path="battery-report.html", strict=False):
     """
     Parse the battery report HTML and extract key metrics.
     
     Parameters:
         file_path (str): The file path to the battery report HTML.
+        strict (bool): Never substitute dummy data. If the battery metrics or the
+            capacity history are missing, raise IncompleteReportError instead.
     
     Returns:
         tuple: A tuple containing metrics, details, usage history, and visualization data
@@ -191,66 +278,60 @@ def parse_battery_report(file_path="battery-report.html"):
             
         soup = BeautifulSoup(html_content, "html.parser")
         
+        # Map the report sections and extract the cell texts once for all extractors
+        locator = SectionLocator(soup)
+        cell_table = locator.cells
+        
         # Extract battery metrics using enhanced method
-        metrics = find_battery_info(soup)
+        metrics = find_battery_info(soup, locator, strict)
         
         # Extract general battery information
-        for table in soup.find_all("table"):
-            for row in table.find_all("tr"):
-                cells = row.find_all("td")
-                if len(cells) == 2:
-                    label = cells[0].get_text(strip=True)
-                    value = cells[1].get_text(strip=True)
-                    
-                    # Add to details if not already in metrics
-                    if label not in metrics and not any(ignore in label.lower() for ignore in ["battery", ":", "time"]):
-                        details[label] = value
+        for row in cell_table.rows:
+            if len(row.cells) == 2:
+                label, value = row.cells
+                
+                # Add to details if not already in metrics (the blank
+                # corner cell of a header row is not a label)
+                if label and label not in metrics and not any(ignore in row.label_lower for ignore in ["battery", ":", "time"]):
+                    details[label] = value
         
         # Extract usage history
-        usage_table = None
-        for h2 in soup.find_all(['h2', 'h3']):
-            if 'Battery usage' in h2.get_text():
-                usage_table = h2.find_next('table')
-                break
+        usage_table = locator.table("battery_usage")
                 
-        if usage_table:
-            header_row = usage_table.find('tr')
-            if header_row:
-                headers = [h.get_text(strip=True) for h in header_row.find_all('th')]
-                
-                for row in header_row.find_next_siblings("tr", limit=7):
-                    cells = row.find_all("td")
-                    if len(cells) >= 3:  # At least date and some values
-                        usage_data = {}
-                        for i, cell in enumerate(cells):
-                            if i < len(headers):
-                                usage_data[headers[i]] = cell.get_text(strip=True)
-                        if usage_data:
-                            usage_history.append(usage_data)
+        usage_rows = cell_table.table_rows(usage_table)
+        if usage_rows:
+            sample = usage_rows[1].cells if len(usage_rows) > 1 else ()
+            headers = header_labels(usage_table, sample)
+            
+            # The seven rows after the header row. Real reports put the header
+            # row in a <thead>, where the former walk over its siblings found none.
+            for row in usage_rows[1:8]:
+                if len(row.cells) >= 3:  # At least date and some values
+                    usage_data = dict(zip(headers, row.cells))
+                    if usage_data:
+                        usage_history.append(usage_data)
         
         # Extract capacity history for visualization
-        periods, full_charge_capacities, design_capacities = extract_capacity_history(soup)
+        periods, full_charge_capacities, design_capacities = extract_capacity_history(soup, locator, strict)
         
         # Calculate battery health percentage
-        try:
-            design_capacity_str = metrics.get("Design Capacity", "0 mWh")
-            full_charge_str = metrics.get("Full Charge Capacity", "0 mWh")
-            
-            design_capacity_match = re.search(r'(\d+)', design_capacity_str)
-            full_charge_match = re.search(r'(\d+)', full_charge_str)
-            
-            if design_capacity_match and full_charge_match:
-                design_capacity = int(design_capacity_match.group(1))
-                full_charge = int(full_charge_match.group(1))
-                
-                if design_capacity > 0:
-                    health_pct = (full_charge / design_capacity) * 100
-                    metrics["Battery Health"] = f"{health_pct:.1f}%"
-        except Exception as e:
-            print(f"Error calculating battery health: {e}")
+        add_battery_health(metrics)
+        
+        result = (metrics, details, usage_history, (periods, full_charge_capacities, design_capacities), html_content)
         
-        return metrics, details, usage_history, (periods, full_charge_capacities, design_capacities), html_content
+        if strict:
+            missing = []
+            if not metrics:
+                missing.append("installed batteries")
+            if not periods:
+                missing.append("battery capacity history")
+            if missing:
+                raise IncompleteReportError(file_path, missing, result)
         
+        return result
+        
+    except IncompleteReportError:
+        raise
     except Exception as e:
         print(f"Error parsing battery report: {e}")
         raise
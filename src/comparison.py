@@ -0,0 +1,162 @@
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from battery_repport import IncompleteReportError, parse_battery_report
+
+# Capacity series of one report, stored as typed arrays so many reports can be
+# kept in memory and overlaid without re-parsing the HTML.
+CapacitySeries = namedtuple(
+    "CapacitySeries",
+    ["path", "label", "periods", "dates", "full_charge", "design", "metrics"]
+)
+
+def period_dates(periods):
+    """
+    Convert capacity history periods to start dates.
+
+    Parameters:
+        periods (list): Period strings such as "2023-01-01 - 2023-01-08"
+
+    Returns:
+        numpy.ndarray or None: datetime64[D] array, or None if any period has no date
+    """
+    dates = []
+    for period in periods:
+        match = re.search(r'(\d{4}-\d{2}-\d{2})', period)
+        if not match:
+            return None
+        dates.append(match.group(1))
+    return np.array(dates, dtype="datetime64[D]")
+
+def load_capacity_series(file_path):
+    """
+    Parse a battery report and keep only the data needed for comparison.
+
+    This runs inside worker processes, so it returns the compact series
+    instead of the full parse result (which includes the raw HTML). Reports
+    without a capacity history raise IncompleteReportError rather than being
+    compared against dummy data.
+
+    Parameters:
+        file_path (str): Path to the battery report HTML
+
+    Returns:
+        CapacitySeries: The parsed capacity series
+    """
+    try:
+        parsed = parse_battery_report(file_path, strict=True)
+    except IncompleteReportError as e:
+        if "battery capacity history" in e.missing:
+            raise
+        parsed = e.partial
+    metrics, _, _, capacity_data, _ = parsed
+    periods, full_charges, design_capacities = capacity_data
+
+    return CapacitySeries(
+        path=os.path.abspath(file_path),
+        label=os.path.splitext(os.path.basename(file_path))[0],
+        periods=list(periods),
+        dates=period_dates(periods),
+        full_charge=np.asarray(full_charges, dtype=np.int64),
+        design=np.asarray(design_capacities, dtype=np.int64),
+        metrics=metrics
+    )
+
+class CapacitySeriesCache:
+    """
+    LRU cache of parsed capacity series.
+
+    Entries are keyed by the report's absolute path, size and modification
+    time, so a report that changes on disk is parsed again. Access is locked,
+    as watcher.ReportWatcher fills the cache from a background thread.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(file_path):
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+    def get(self, file_path):
+        try:
+            key = self.key_for(file_path)
+        except OSError:
+            return None
+        with self._lock:
+            series = self._entries.get(key)
+            if series is not None:
+                self._entries.move_to_end(key)
+        return series
+
+    def put(self, file_path, series):
+        try:
+            key = self.key_for(file_path)
+        except OSError:
+            return
+        with self._lock:
+            self._entries[key] = series
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+def load_reports(file_paths, cache=None, max_workers=None, sinks=()):
+    """
+    Load several battery reports concurrently in worker processes.
+
+    Parameters:
+        file_paths (list): Paths of the reports to load
+        cache (CapacitySeriesCache): Optional cache consulted before parsing
+        max_workers (int): Number of worker processes (default: CPU count)
+        sinks (iterable): Callables invoked as sink(path, series) for every loaded report
+
+    Returns:
+        tuple: List of CapacitySeries in input order, and a dict of path -> error
+    """
+    results = {}
+    errors = {}
+    pending = []
+
+    for path in file_paths:
+        series = cache.get(path) if cache is not None else None
+        if series is not None:
+            results[path] = series
+        else:
+            pending.append(path)
+
+    if pending:
+        workers = min(max_workers or os.cpu_count() or 1, len(pending))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(load_capacity_series, path): path for path in pending}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    series = future.result()
+                except Exception as e:
+                    print(f"Error loading battery report {path}: {e}")
+                    errors[path] = e
+                    continue
+                results[path] = series
+                if cache is not None:
+                    cache.put(path, series)
+
+    for path in file_paths:
+        if path in results:
+            for sink in sinks:
+                sink(path, results[path])
+
+    return [results[path] for path in file_paths if path in results], errors
@@ -0,0 +1,201 @@
+import glob
+import os
+import shutil
+import subprocess
+import sys
+from datetime import date, datetime, timedelta
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from synthetic_report import write_battery_report
+
+class BatteryDataSource:
+    """
+    Base class for anything that can produce a battery report HTML file.
+
+    Subclasses implement fetch_report(); the result is always a report in the
+    powercfg format so it can go through parse_battery_report unchanged.
+    """
+
+    name = "base"
+
+    def is_available(self):
+        """
+        Returns:
+            bool: True if the source can produce reports on this machine
+        """
+        return False
+
+    def fetch_report(self, output_path="battery-report.html"):
+        """
+        Produce a battery report.
+
+        Parameters:
+            output_path (str): Where to write the report (sources that read
+                existing reports may return a different path)
+
+        Returns:
+            str: Absolute path of the report
+        """
+        raise NotImplementedError
+
+class PowercfgDataSource(BatteryDataSource):
+    """
+    Runs `powercfg /batteryreport`.
+
+    The command is passed as an argument list (no shell), so paths with
+    spaces or quotes are safe. `command` can point at a stand-in executable,
+    e.g. [sys.executable, "tools/fake_powercfg.py"], to run the pipeline on Linux.
+    """
+
+    name = "powercfg"
+
+    def __init__(self, command=("powercfg",), timeout=120):
+        self.command = list(command)
+        self.timeout = timeout
+
+    def is_available(self):
+        return shutil.which(self.command[0]) is not None or os.path.exists(self.command[0])
+
+    def fetch_report(self, output_path="battery-report.html"):
+        abs_output_path = os.path.abspath(output_path)
+        argv = self.command + ["/batteryreport", "/output", abs_output_path]
+        subprocess.run(argv, check=True, capture_output=True, timeout=self.timeout)
+        return abs_output_path
+
+class SysfsDataSource(BatteryDataSource):
+    """
+    Reads the battery state from Linux sysfs (/sys/class/power_supply/BAT*).
+
+    sysfs only exposes the current values, so the generated report has a
+    single capacity history period ending today, no usage rows, and only
+    the identification rows sysfs can fill (the system product name comes
+    from DMI).
+    """
+
+    name = "sysfs"
+
+    def __init__(self, root="/sys/class/power_supply", dmi_root="/sys/class/dmi/id"):
+        self.root = root
+        self.dmi_root = dmi_root
+
+    def _batteries(self):
+        return sorted(glob.glob(os.path.join(self.root, "BAT*")))
+
+    def is_available(self):
+        return bool(self._batteries())
+
+    @staticmethod
+    def _read(battery, name):
+        try:
+            with open(os.path.join(battery, name), "r") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _read_int(self, battery, name):
+        value = self._read(battery, name)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _energy_mwh(self, battery, kind):
+        # energy_* is in µWh; batteries that report charge_* (µAh) need the voltage
+        energy = self._read_int(battery, f"energy_{kind}")
+        if energy is not None:
+            return energy // 1000
+        charge = self._read_int(battery, f"charge_{kind}")
+        voltage = self._read_int(battery, "voltage_min_design")
+        if charge is not None and voltage:
+            return charge * voltage // 10 ** 9
+        return None
+
+    def read_values(self):
+        """
+        Returns:
+            dict: Design/full charge capacity (mWh), cycle count and identification
+            of the first battery; values sysfs does not provide are None
+        """
+        batteries = self._batteries()
+        if not batteries:
+            raise FileNotFoundError(f"No battery found under {self.root}")
+        battery = batteries[0]
+
+        cycle_count = self._read_int(battery, "cycle_count")
+        return {
+            "design_capacity": self._energy_mwh(battery, "full_design"),
+            "full_charge_capacity": self._energy_mwh(battery, "full"),
+            "cycle_count": cycle_count if cycle_count else None,
+            "serial_number": self._read(battery, "serial_number") or None,
+            "battery_name": self._read(battery, "model_name") or None,
+            "manufacturer": self._read(battery, "manufacturer") or None,
+            "chemistry": self._read(battery, "technology") or None,
+            "product_name": self._read(self.dmi_root, "product_name") or None,
+        }
+
+    def fetch_report(self, output_path="battery-report.html"):
+        values = self.read_values()
+        return write_battery_report(
+            output_path,
+            computer_name=os.uname().nodename,
+            periods=1,
+            usage_rows=0,
+            start_date=date.today() - timedelta(weeks=1),
+            report_time=datetime.now().replace(microsecond=0),
+            placeholders=False,
+            **values
+        )
+
+class SavedReportDataSource(BatteryDataSource):
+    """
+    Serves reports that were generated earlier and saved in a directory.
+    """
+
+    name = "saved"
+
+    def __init__(self, directory, pattern="battery-report*.html"):
+        self.directory = directory
+        self.pattern = pattern
+
+    def list_reports(self):
+        """
+        Returns:
+            list: Report paths, oldest first
+        """
+        paths = glob.glob(os.path.join(self.directory, self.pattern))
+        return sorted(paths, key=os.path.getmtime)
+
+    def is_available(self):
+        return bool(self.list_reports())
+
+    def fetch_report(self, output_path=None):
+        """
+        Returns the most recent saved report, copied to output_path if given.
+        """
+        reports = self.list_reports()
+        if not reports:
+            raise FileNotFoundError(f"No saved battery reports in {self.directory}")
+        latest = os.path.abspath(reports[-1])
+        if output_path is None:
+            return latest
+        abs_output_path = os.path.abspath(output_path)
+        if abs_output_path != latest:
+            shutil.copyfile(latest, abs_output_path)
+        return abs_output_path
+
+def get_default_data_source():
+    """
+    Pick the data source for this machine: powercfg on Windows, sysfs on Linux.
+
+    Returns:
+        BatteryDataSource: The first available source
+
+    Raises:
+        RuntimeError: If no source can produce a report here
+    """
+    candidates = [PowercfgDataSource()] if sys.platform == "win32" else [SysfsDataSource(), PowercfgDataSource()]
+    for source in candidates:
+        if source.is_available():
+            return source
+    raise RuntimeError("No battery data source available (powercfg or /sys/class/power_supply).")
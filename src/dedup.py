@@ -0,0 +1,271 @@
+import hashlib
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comparison import CapacitySeries, load_reports
+from report_reader import MappedReport
+from section_locator import (COMPUTER_NAME_LABELS, REPORT_TIME_LABELS, SERIAL_NUMBER_LABELS, SectionLocator,
+                             labeled_value)
+
+# A device is a battery in a machine: the same machine with a replaced
+# battery starts a new history
+DeviceKey = namedtuple("DeviceKey", ["computer_name", "serial_number"])
+
+# One distinct report: its content digest and where it came from
+ReportFingerprint = namedtuple("ReportFingerprint", ["path", "size", "digest", "device", "report_time", "mtime"])
+
+def content_digest(file_path, chunk_size=1 << 20):
+    """
+    Hash the bytes of a report.
+
+    Returns:
+        str: Hex BLAKE2b digest of the file content
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_device_key(file_path):
+    """
+    Read the computer name, battery serial number and report time.
+
+    Only the system information table and the "Installed batteries" section
+    are decoded (see report_reader.MappedReport), i.e. the first few kilobytes.
+
+    Returns:
+        tuple: DeviceKey (None if neither name nor serial is present) and the report time string
+    """
+    with MappedReport(file_path) as report:
+        system_info = report.section_soup("system_info")
+        batteries = report.section_soup("installed_batteries")
+
+    rows = []
+    for soup in (system_info, batteries):
+        if soup is not None:
+            rows.extend((row.label, row.cells[1]) for row in SectionLocator(soup).cells.rows if len(row.cells) >= 2)
+
+    computer_name = labeled_value(rows, COMPUTER_NAME_LABELS)
+    serial_number = labeled_value(rows, SERIAL_NUMBER_LABELS)
+    report_time = labeled_value(rows, REPORT_TIME_LABELS)
+    if computer_name is None and serial_number is None:
+        return None, report_time
+    return DeviceKey(computer_name, serial_number), report_time
+
+class DedupIndex:
+    """
+    Index of a report collection that collapses exact duplicates.
+
+    Files are first grouped by size; only files sharing a size with another
+    file are hashed, so a collection without duplicates is indexed from
+    os.stat alone. Each distinct report is then keyed by device. Paths are
+    stored absolute, and a path that is already indexed is not added again.
+
+    Attributes:
+        reports (dict): digest (or path, for unhashed files) -> ReportFingerprint
+        duplicates (dict): path -> path of the identical report that is kept
+        errors (dict): path -> exception for files that could not be read
+    """
+
+    def __init__(self):
+        self.reports = {}
+        self.duplicates = {}
+        self.errors = {}
+        self._sizes = {}
+        self._paths = set()
+
+    def add_paths(self, file_paths):
+        """
+        Add report files to the index.
+
+        Parameters:
+            file_paths (iterable): Paths of battery report HTML files
+
+        Returns:
+            DedupIndex: self
+        """
+        by_size = {}
+        for path in file_paths:
+            path = os.path.abspath(path)
+            if path in self._paths and path not in self.errors:
+                continue
+            # A file that failed to read before is tried again
+            self._paths.add(path)
+            self.errors.pop(path, None)
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                self.errors[path] = e
+                continue
+            by_size.setdefault(stat.st_size, []).append((path, stat.st_mtime))
+
+        for size, entries in by_size.items():
+            known = self._sizes.setdefault(size, [])
+            if len(entries) == 1 and not known:
+                # Unique size so far: no need to read the content
+                self._add_unique(entries[0][0], size, None, entries[0][1])
+                continue
+
+            # A previously unhashed report of this size needs its digest now
+            for key in list(known):
+                if self.reports[key].digest is None:
+                    self._rehash(key)
+            for path, mtime in entries:
+                try:
+                    digest = content_digest(path)
+                except OSError as e:
+                    self.errors[path] = e
+                    continue
+                if digest in self.reports:
+                    self.duplicates[path] = self.reports[digest].path
+                else:
+                    self._add_unique(path, size, digest, mtime)
+        return self
+
+    def _add_unique(self, path, size, digest, mtime):
+        try:
+            device, report_time = read_device_key(path)
+        except (OSError, ValueError) as e:
+            self.errors[path] = e
+            return
+        key = digest or path
+        self.reports[key] = ReportFingerprint(path, size, digest, device, report_time, mtime)
+        self._sizes.setdefault(size, []).append(key)
+
+    def _rehash(self, key):
+        fingerprint = self.reports.pop(key)
+        self._sizes[fingerprint.size].remove(key)
+        try:
+            digest = content_digest(fingerprint.path)
+        except OSError as e:
+            self.errors[fingerprint.path] = e
+            return
+        self.reports[digest] = fingerprint._replace(digest=digest)
+        self._sizes[fingerprint.size].append(digest)
+
+    def unique_paths(self):
+        """
+        Returns:
+            list: One path per distinct report content
+        """
+        return [fingerprint.path for fingerprint in self.reports.values()]
+
+    def devices(self):
+        """
+        Group distinct reports by device, oldest report first.
+
+        Reports without a computer name or serial number form a group of their own.
+
+        Returns:
+            dict: DeviceKey -> list of ReportFingerprint
+        """
+        groups = {}
+        for fingerprint in self.reports.values():
+            key = fingerprint.device or DeviceKey(fingerprint.path, None)
+            groups.setdefault(key, []).append(fingerprint)
+        for fingerprints in groups.values():
+            fingerprints.sort(key=lambda f: (f.report_time or "", f.mtime))
+        return groups
+
+    def latest_per_device(self):
+        """
+        Returns:
+            list: Path of the newest report of every device
+        """
+        return [fingerprints[-1].path for fingerprints in self.devices().values()]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Counts of files, distinct reports, duplicates, devices and errors
+        """
+        return {
+            "files": len(self.reports) + len(self.duplicates) + len(self.errors),
+            "distinct": len(self.reports),
+            "duplicates": len(self.duplicates),
+            "devices": len(self.devices()),
+            "errors": len(self.errors)
+        }
+
+def merge_histories(series_list, label=None):
+    """
+    Merge the capacity histories of several reports from one device.
+
+    Periods are matched by start date; where reports overlap, the value from
+    the later report in `series_list` wins (pass them oldest first).
+
+    Parameters:
+        series_list (list): CapacitySeries of one device
+        label (str): Label of the merged series (default: the newest report's)
+
+    Returns:
+        CapacitySeries: One series covering all periods, sorted by date
+    """
+    dated = [series for series in series_list if series.dates is not None and len(series.dates)]
+    if not dated:
+        return series_list[-1] if series_list else None
+
+    newest = dated[-1]
+    dates = np.concatenate([series.dates for series in dated])
+    full_charge = np.concatenate([series.full_charge for series in dated])
+    design = np.concatenate([series.design for series in dated])
+    periods = np.array([period for series in dated for period in series.periods], dtype=object)
+    rank = np.concatenate([np.full(len(series.dates), i) for i, series in enumerate(dated)])
+
+    # Sort by date, newest report first within a date, and keep the first of each date
+    order = np.lexsort((-rank, dates))
+    dates = dates[order]
+    keep = np.ones(len(dates), dtype=bool)
+    keep[1:] = dates[1:] != dates[:-1]
+    selected = order[keep]
+
+    return CapacitySeries(
+        path=newest.path,
+        label=label or newest.label,
+        periods=list(periods[selected]),
+        dates=dates[keep],
+        full_charge=full_charge[selected],
+        design=design[selected],
+        metrics=newest.metrics
+    )
+
+def load_device_histories(file_paths, max_workers=None, cache=None, index=None):
+    """
+    Deduplicate a report collection and build one capacity history per device.
+
+    Exact duplicates are dropped before parsing; the remaining reports are
+    parsed in worker processes (see comparison.load_reports) and merged per device.
+
+    Parameters:
+        file_paths (list): Paths of battery report HTML files
+        max_workers (int): Number of worker processes
+        cache (CapacitySeriesCache): Optional cache consulted before parsing
+        index (DedupIndex): Existing index to extend (default: a new one)
+
+    Returns:
+        tuple: dict DeviceKey -> CapacitySeries, the DedupIndex, and a dict of path -> error
+    """
+    index = index or DedupIndex()
+    index.add_paths(file_paths)
+    devices = index.devices()
+
+    series_list, errors = load_reports(index.unique_paths(), cache=cache, max_workers=max_workers)
+    by_path = {series.path: series for series in series_list}
+
+    histories = {}
+    for key, fingerprints in devices.items():
+        loaded = [by_path[os.path.abspath(f.path)] for f in fingerprints if os.path.abspath(f.path) in by_path]
+        if not loaded:
+            continue
+        label = None
+        if fingerprints[-1].device is not None:
+            name = key.computer_name or "Unknown"
+            label = f"{name} ({key.serial_number})" if key.serial_number else name
+        histories[key] = merge_histories(loaded, label=label)
+    return histories, index, errors
@@ -0,0 +1,252 @@
+import os
+import sys
+
+import numpy as np
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comparison import period_dates
+
+# Exact two-sided t critical values for 1 to 4 degrees of freedom, where the
+# expansion in _t_critical is too far off (by half at df = 1)
+_T_SMALL_DF = {
+    0.8: (3.0777, 1.8856, 1.6377, 1.5332),
+    0.9: (6.3138, 2.9200, 2.3534, 2.1318),
+    0.95: (12.7062, 4.3027, 3.1824, 2.7764),
+    0.99: (63.6567, 9.9248, 5.8409, 4.6041),
+}
+
+def _t_critical(df, confidence):
+    """
+    Two-sided Student t critical value, vectorized over degrees of freedom.
+
+    Small df come from a table; larger df use the Cornish-Fisher expansion
+    around the normal quantile, which is accurate to about 0.5% for df >= 5
+    and avoids a SciPy dependency.
+    """
+    z = {0.8: 1.2815516, 0.9: 1.6448536, 0.95: 1.9599640, 0.99: 2.5758293}[confidence]
+    df = np.maximum(np.asarray(df, dtype=float), 1.0)
+    expansion = (z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+                 + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+    table = np.asarray(_T_SMALL_DF[confidence])
+    small = np.clip(np.round(df).astype(int), 1, len(table)) - 1
+    return np.where(df < len(table) + 0.5, table[small], expansion)
+
+def _pad(sequences, dtype=float):
+    # Stack variable-length series into (devices, max_points) arrays with a mask
+    length = max((len(seq) for seq in sequences), default=0)
+    values = np.zeros((len(sequences), length), dtype=dtype)
+    mask = np.zeros((len(sequences), length), dtype=bool)
+    for i, seq in enumerate(sequences):
+        values[i, :len(seq)] = seq
+        mask[i, :len(seq)] = True
+    return values, mask
+
+class DegradationForecast:
+    """
+    Linear health degradation fits for many devices at once.
+
+    Health (percent of design capacity) is modelled as intercept + slope * x,
+    where x is the position of an observation, e.g. days since the first
+    capacity period.
+    All attributes are arrays with one entry per device; `last_x` is the
+    position of each device's last observation.
+    """
+
+    def __init__(self, coefficients, inverse_normal, residual_var, points, confidence, last_x=None):
+        self.coefficients = coefficients
+        self.inverse_normal = inverse_normal
+        self.residual_var = residual_var
+        self.points = points
+        self.confidence = confidence
+        self.last_x = np.zeros(len(points)) if last_x is None else last_x
+        self.t_value = _t_critical(points - 2, confidence)
+
+    @property
+    def intercept(self):
+        return self.coefficients[:, 0]
+
+    @property
+    def slope(self):
+        return self.coefficients[:, 1]
+
+    def predict(self, x):
+        """
+        Predict health with a confidence interval for the fitted line.
+
+        Parameters:
+            x (array): Positions, shape (points,) for all devices or (devices, points)
+
+        Returns:
+            tuple: mean, lower and upper bound arrays of shape (devices, points)
+        """
+        x = np.broadcast_to(np.asarray(x, dtype=float), (len(self.points),) + np.shape(x)[-1:])
+        mean = self.intercept[:, None] + self.slope[:, None] * x
+        # Variance of the fitted mean: s^2 * [1 x] (X'X)^-1 [1 x]'
+        inv = self.inverse_normal
+        leverage = inv[:, 0, 0, None] + 2 * inv[:, 0, 1, None] * x + inv[:, 1, 1, None] * x * x
+        half_width = self.t_value[:, None] * np.sqrt(np.maximum(self.residual_var[:, None] * leverage, 0))
+        return mean, mean - half_width, mean + half_width
+
+    def threshold_crossing(self, threshold=70.0, horizon=3650.0, steps=512):
+        """
+        Estimate where health reaches a threshold, with a confidence interval.
+
+        The earliest crossing is where the lower bound reaches the threshold,
+        the latest where the upper bound does. Crossings are never before the
+        last observation: a line already below the threshold there crosses
+        at `last_x` (see crossed). Crossings beyond `horizon` (and devices
+        that are not degrading) are NaN.
+
+        Parameters:
+            threshold (float): Health percentage, e.g. 70
+            horizon (float): Largest x to consider
+            steps (int): Grid resolution for the interval bounds
+
+        Returns:
+            tuple: estimated, earliest and latest crossing arrays (in units of x)
+        """
+        slope = self.slope
+        with np.errstate(divide="ignore", invalid="ignore"):
+            estimate = np.where(slope < 0, (threshold - self.intercept) / slope, np.nan)
+        estimate = np.maximum(estimate, self.last_x)
+        estimate = np.where(estimate <= horizon, estimate, np.nan)
+
+        # One grid per device, from its last observation to the horizon
+        start = np.minimum(self.last_x, horizon)
+        grid = start[:, None] + (horizon - start)[:, None] * np.linspace(0, 1, steps)
+        _, lower, upper = self.predict(grid)
+        rows = np.arange(len(grid))
+        bounds = []
+        for band in (lower, upper):
+            below = band <= threshold
+            first = np.argmax(below, axis=1)
+            bounds.append(np.where(below.any(axis=1), grid[rows, first], np.nan))
+        return estimate, bounds[0], bounds[1]
+
+    def crossed(self, threshold=70.0):
+        """
+        Returns:
+            numpy.ndarray: Whether the fitted health at the last observation is
+            already at or below the threshold
+        """
+        return self.intercept + self.slope * self.last_x <= threshold
+
+def fit_degradation(x_series, health_series, confidence=0.95):
+    """
+    Fit a degradation line to every device with one batched least-squares solve.
+
+    Parameters:
+        x_series (list): Per device, the x positions (e.g. days)
+        health_series (list): Per device, health percentages at those positions
+        confidence (float): 0.8, 0.9, 0.95 or 0.99
+
+    Returns:
+        DegradationForecast: Fits for all devices (devices with fewer than
+        3 points get NaN coefficients; with 3 or 4 points the intervals use
+        exact t values and are wide)
+    """
+    x, mask = _pad(x_series)
+    y, _ = _pad(health_series)
+    weights = mask.astype(float)
+
+    # Normal equations X'WX b = X'Wy for the design matrix [1, x], per device
+    s0 = weights.sum(axis=1)
+    sx = (weights * x).sum(axis=1)
+    sxx = (weights * x * x).sum(axis=1)
+    sy = (weights * y).sum(axis=1)
+    sxy = (weights * x * y).sum(axis=1)
+
+    normal = np.stack([np.stack([s0, sx], axis=-1), np.stack([sx, sxx], axis=-1)], axis=-2)
+    rhs = np.stack([sy, sxy], axis=-1)
+
+    # Degenerate devices (too few points or a single x) get an identity system
+    # so the batch solve succeeds; their results are replaced with NaN below
+    determinant = s0 * sxx - sx * sx
+    valid = (s0 >= 3) & (determinant > 1e-9 * np.maximum(sxx * s0, 1))
+    normal[~valid] = np.eye(2)
+    rhs[~valid] = 0
+
+    coefficients = np.linalg.solve(normal, rhs[..., None])[..., 0]
+    inverse_normal = np.linalg.inv(normal)
+
+    residuals = (y - coefficients[:, 0, None] - coefficients[:, 1, None] * x) * weights
+    residual_var = (residuals ** 2).sum(axis=1) / np.maximum(s0 - 2, 1)
+
+    coefficients[~valid] = np.nan
+    residual_var[~valid] = np.nan
+    last_x = np.where(mask, x, -np.inf).max(axis=1, initial=-np.inf)
+    last_x = np.where(np.isfinite(last_x), last_x, 0.0)
+    return DegradationForecast(coefficients, inverse_normal, residual_var, s0, confidence, last_x)
+
+def prepare_series(capacity_data):
+    """
+    Turn a report's capacity history into days since the first period and
+    health percentages. Periods without a design capacity are left out.
+
+    Parameters:
+        capacity_data (tuple): periods, full charge capacities, design capacities
+
+    Returns:
+        tuple: days array, health array and the date of the first period, or
+        None if the periods have no dates
+    """
+    periods, full_charges, design_capacities = capacity_data
+    dates = period_dates(periods)
+    if dates is None or len(periods) == 0:
+        return None
+
+    full_charge = np.asarray(full_charges, dtype=float)
+    design = np.asarray(design_capacities, dtype=float)
+    usable = design > 0
+    health = full_charge[usable] / design[usable] * 100
+    days = (dates[usable] - dates[0]).astype(float)
+    return days, health, dates[0]
+
+def forecast_capacity_history(capacity_data, threshold=70.0, horizon_periods=12, confidence=0.95):
+    """
+    Project one report's capacity history forward for plot_capacity_history.
+
+    Parameters:
+        capacity_data (tuple): periods, full charge capacities, design capacities
+        threshold (float): Health percentage to report the crossing date for
+        horizon_periods (int): Number of future periods to project
+        confidence (float): Confidence level of the interval
+
+    Returns:
+        dict or None: Projected periods, full charge mean/low/high (mWh), the
+        threshold capacity, the estimated/earliest/latest crossing dates (not
+        before the last period) and whether the threshold is already crossed;
+        None if the history is too short or undated
+    """
+    prepared = prepare_series(capacity_data)
+    if prepared is None:
+        return None
+    days, health, origin = prepared
+    forecast = fit_degradation([days], [health], confidence)
+    if np.isnan(forecast.slope[0]):
+        return None
+
+    design = float(capacity_data[2][-1])
+    step = float(np.median(np.diff(days))) if len(days) > 1 else 7.0
+    future_days = days[-1] + step * np.arange(1, horizon_periods + 1)
+    mean, low, high = (band[0] * design / 100 for band in forecast.predict(future_days))
+
+    crossing = forecast.threshold_crossing(threshold, horizon=days[-1] + 3650)
+    crossing_dates = [None if np.isnan(value[0]) else origin + np.timedelta64(int(round(value[0])), "D")
+                      for value in crossing]
+    future_dates = origin + np.round(future_days).astype(int).astype("timedelta64[D]")
+
+    return {
+        "periods": [str(date) for date in future_dates],
+        "full_charge": mean,
+        "low": low,
+        "high": high,
+        "threshold": design * threshold / 100,
+        "threshold_pct": threshold,
+        "crossing": crossing_dates[0],
+        "crossing_earliest": crossing_dates[1],
+        "crossing_latest": crossing_dates[2],
+        "crossed": bool(forecast.crossed(threshold)[0]),
+        "confidence": confidence
+    }
@@ -11,7 +11,11 @@ from datetime import datetime
 # Import our modules - adjust paths if needed
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from battery_repport import generate_battery_report, parse_battery_report
-from visualization import create_battery_health_gauge, plot_capacity_history
+from visualization import create_battery_health_gauge, plot_capacity_history, CapacityComparisonPlot
+from comparison import CapacitySeriesCache, load_reports
+from watcher import ReportWatcher
+from data_sources import get_default_data_source
+from forecasting import forecast_capacity_history
 
 class BatteryReportApp:
     def __init__(self, root):
@@ -43,15 +47,18 @@ class BatteryReportApp:
         self.dashboard_tab = ttk.Frame(self.notebook)
         self.details_tab = ttk.Frame(self.notebook)
         self.raw_data_tab = ttk.Frame(self.notebook)
+        self.compare_tab = ttk.Frame(self.notebook)
         
         self.notebook.add(self.dashboard_tab, text="Dashboard")
         self.notebook.add(self.details_tab, text="Details")
         self.notebook.add(self.raw_data_tab, text="Raw Report")
+        self.notebook.add(self.compare_tab, text="Compare")
         
         # Setup the UI
         self.setup_dashboard()
         self.setup_details_tab()
         self.setup_raw_data_tab()
+        self.setup_compare_tab()
         
         # Control frame at the bottom
         self.control_frame = ttk.Frame(self.main_frame)
@@ -210,6 +217,125 @@ class BatteryReportApp:
         # Add placeholder text
         self.set_raw_text_content("Generate a report to see raw HTML data")
 
+    def setup_compare_tab(self):
+        # Parsed capacity series are shared across comparisons
+        self.series_cache = CapacitySeriesCache()
+        self.compare_paths = []
+        self.watcher = None
+        
+        compare_frame = ttk.Frame(self.compare_tab)
+        compare_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # List of compared reports with add/remove controls
+        list_frame = ttk.LabelFrame(compare_frame, text="Reports")
+        list_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 5))
+        
+        self.compare_listbox = tk.Listbox(list_frame, selectmode=tk.EXTENDED, width=30)
+        self.compare_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.compare_add_btn = ttk.Button(list_frame, text="Add Reports...", command=self.add_compare_reports)
+        self.compare_add_btn.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        remove_btn = ttk.Button(list_frame, text="Remove Selected", command=self.remove_compare_reports)
+        remove_btn.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        self.watch_btn = ttk.Button(list_frame, text="Watch Folder...", command=self.toggle_watch_folder)
+        self.watch_btn.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        # The comparison chart is created once and updated per series
+        chart_frame = ttk.LabelFrame(compare_frame, text="Health Comparison")
+        chart_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0))
+        
+        self.comparison_plot = CapacityComparisonPlot()
+        self.compare_canvas = FigureCanvasTkAgg(self.comparison_plot.fig, master=chart_frame)
+        self.compare_canvas.draw()
+        self.compare_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def add_compare_reports(self):
+        file_paths = filedialog.askopenfilenames(
+            title="Select Battery Reports to Compare",
+            filetypes=[("HTML files", "*.html"), ("All files", "*.*")]
+        )
+        file_paths = [os.path.abspath(path) for path in file_paths]
+        file_paths = [path for path in file_paths if path not in self.compare_paths]
+        if not file_paths:
+            return
+        
+        self.compare_add_btn.configure(state=tk.DISABLED)
+        self.status_var.set(f"Loading {len(file_paths)} report(s) for comparison...")
+        
+        def process():
+            try:
+                series_list, errors = load_reports(file_paths, cache=self.series_cache)
+                self.root.after(0, lambda: self.show_compare_series(series_list, errors))
+            except Exception as e:
+                self.root.after(0, lambda: messagebox.showerror("Error", f"Error loading reports: {e}"))
+            finally:
+                self.root.after(0, lambda: self.compare_add_btn.configure(state=tk.NORMAL))
+        
+        # Run the process in a separate thread
+        thread = threading.Thread(target=process)
+        thread.daemon = True
+        thread.start()
+
+    def show_compare_series(self, series_list, errors):
+        skipped = []
+        for series in series_list:
+            if series.path in self.compare_paths:
+                # A watched report was modified: redraw only its series
+                self.comparison_plot.add_series(series.path, series.label, series.dates,
+                                                series.full_charge, series.design)
+                continue
+            if self.comparison_plot.add_series(series.path, series.label, series.dates,
+                                               series.full_charge, series.design):
+                self.compare_paths.append(series.path)
+                self.compare_listbox.insert(tk.END, series.label)
+            else:
+                skipped.append(series.label)
+        self.compare_canvas.draw_idle()
+        
+        status = f"{len(self.compare_paths)} report(s) in comparison."
+        if skipped:
+            status += f" No dated capacity history in: {', '.join(skipped)}."
+        if errors:
+            status += f" Failed to load {len(errors)} report(s)."
+        self.status_var.set(status)
+
+    def toggle_watch_folder(self):
+        if self.watcher:
+            self.watcher.stop(wait=False)
+            self.watcher = None
+            self.watch_btn.configure(text="Watch Folder...")
+            self.status_var.set("Stopped watching folder.")
+            return
+        
+        folder = filedialog.askdirectory(title="Select Folder to Watch for Battery Reports")
+        if not folder:
+            return
+        
+        # Watched reports go through the same cache and display as manually added ones
+        def on_report(path, series):
+            self.root.after(0, lambda: self.show_compare_series([series], {}))
+        
+        try:
+            self.watcher = ReportWatcher(folder, sinks=[on_report], cache=self.series_cache)
+            self.watcher.start()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to watch folder: {e}")
+            self.watcher = None
+            return
+        
+        self.watch_btn.configure(text="Stop Watching")
+        self.status_var.set(f"Watching {folder} for new battery reports...")
+
+    def remove_compare_reports(self):
+        # Delete from the end so the remaining indices stay valid
+        for index in sorted(self.compare_listbox.curselection(), reverse=True):
+            self.comparison_plot.remove_series(self.compare_paths.pop(index))
+            self.compare_listbox.delete(index)
+        self.compare_canvas.draw_idle()
+        self.status_var.set(f"{len(self.compare_paths)} report(s) in comparison.")
+
     def set_raw_text_content(self, content):
         self.raw_text.configure(state=tk.NORMAL)
         self.raw_text.delete(1.0, tk.END)
@@ -260,7 +386,8 @@ class BatteryReportApp:
                 timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
                 output_path = os.path.join(os.path.expanduser("~"), f"battery-report-{timestamp}.html")
                 
-                self.report_path = generate_battery_report(output_path)
+                # powercfg on Windows, sysfs on Linux
+                self.report_path = generate_battery_report(output_path, data_source=get_default_data_source())
                 self.report_location_var.set(self.report_path)
                 
                 # Parse the report
@@ -391,8 +518,11 @@ class BatteryReportApp:
             self.chart_placeholder.pack_forget()
             self.chart_placeholder = None
         
+        # Project the history forward when it has dated periods
+        forecast = forecast_capacity_history(capacity_data)
+        
         # Create the capacity history chart
-        fig = plot_capacity_history(periods, full_charges, design_capacities)
+        fig = plot_capacity_history(periods, full_charges, design_capacities, forecast=forecast)
         
         # Get the parent widget (the Capacity History LabelFrame)
         parent = self.dashboard_tab.winfo_children()[1]
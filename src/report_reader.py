@@ -0,0 +1,197 @@
+import codecs
+import mmap
+import os
+import re
+import sys
+from html import unescape
+
+from bs4 import BeautifulSoup
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from battery_repport import add_battery_health, extract_capacity_history, find_battery_info
+from section_locator import SectionLocator, header_labels, match_section
+
+_TAG = re.compile(rb"<[^>]*>")
+# Headings, and the blocks whose content is not markup: a "<h2>" inside a
+# script, style or comment is not a heading
+_MARKUP = re.compile(rb"<(?:(h[23])|(script|style))(?=[\s>/])|<!--", re.IGNORECASE)
+_BLOCK_END = {b"script": re.compile(rb"</script", re.IGNORECASE), b"style": re.compile(rb"</style", re.IGNORECASE)}
+
+class MappedReport:
+    """
+    Memory-mapped battery report that decodes only the sections asked for.
+
+    Section boundaries are found by scanning the raw bytes for `<h2`/`<h3`
+    headings, skipping script, style and comment blocks. Scanning is lazy and stops as soon as the
+    requested section is complete, so a section near the top of a large
+    report (such as "Installed batteries") only touches the first pages of
+    the file. `bytes_scanned` records how far the scan went.
+
+    powercfg writes UTF-8 with lower-case tags; UTF-16 reports are decoded
+    and re-encoded in memory, which loses the mmap benefit but still works.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        self._mmap = None
+
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self.data = b""
+        else:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = self._mmap
+            if self._mmap[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+                self.data = self._mmap[:].decode("utf-16").encode("utf-8")
+
+        self.sections = {}           # name -> [start, end or None]
+        self.bytes_scanned = 0
+        self._scan_pos = 0
+        self._open_section = "system_info"
+        self.sections["system_info"] = [0, None]
+        self._done = False
+
+    def close(self):
+        self.data = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _next_heading(self):
+        # Next "<h2" or "<h3" at or after the scan position, skipping over
+        # <script>, <style> and <!-- --> blocks
+        pos = self._scan_pos
+        while True:
+            match = _MARKUP.search(self.data, pos)
+            if match is None:
+                return -1
+            if match.group(1):
+                return match.start()
+            if match.group(2):
+                end = _BLOCK_END[match.group(2).lower()].search(self.data, match.end())
+                end = -1 if end is None else end.end()
+            else:
+                end = self.data.find(b"-->", match.end())
+                end = -1 if end < 0 else end + 3
+            if end < 0:
+                return -1
+            pos = end
+
+    def _scan_until(self, name):
+        # Advance the scan until `name` has both a start and an end, or the file ends
+        while not self._done:
+            section = self.sections.get(name)
+            if section is not None and section[1] is not None:
+                return
+
+            start = self._next_heading()
+            if start < 0:
+                self.sections[self._open_section][1] = len(self.data)
+                self.bytes_scanned = len(self.data)
+                self._done = True
+                return
+
+            close = self.data.find(b"</h", start)
+            if close < 0:
+                close = len(self.data)
+            self.sections[self._open_section][1] = start
+            self._scan_pos = close
+            self.bytes_scanned = close
+
+            heading = _TAG.sub(b"", bytes(self.data[start:close]) + b">")
+            key = match_section(unescape(heading.decode("utf-8", "replace")))
+            if key and key not in self.sections:
+                self.sections[key] = [start, None]
+                self._open_section = key
+            else:
+                # Unknown or repeated heading: its content belongs to no section
+                self._open_section = "_ignored"
+                self.sections["_ignored"] = [start, None]
+
+    def section_bytes(self, name):
+        """
+        Returns:
+            bytes or None: The raw bytes of a section (heading included), or None if absent
+        """
+        self._scan_until(name)
+        section = self.sections.get(name)
+        if section is None:
+            return None
+        return bytes(self.data[section[0]:section[1]])
+
+    def section_html(self, name):
+        raw = self.section_bytes(name)
+        return None if raw is None else raw.decode("utf-8", "replace")
+
+    def section_soup(self, name):
+        """
+        Returns:
+            BeautifulSoup or None: The parsed section, or None if absent
+        """
+        html = self.section_html(name)
+        return None if html is None else BeautifulSoup(html, "html.parser")
+
+def read_key_metrics(file_path):
+    """
+    Read the key metrics from the "Installed batteries" section only.
+
+    Parameters:
+        file_path (str): Path to the battery report HTML
+
+    Returns:
+        dict: Design capacity, full charge capacity, cycle count and battery
+        health (empty if the section is missing; no default values are invented)
+    """
+    with MappedReport(file_path) as report:
+        soup = report.section_soup("installed_batteries")
+    if soup is None:
+        return {}
+    metrics = find_battery_info(soup, SectionLocator(soup), strict=True)
+    return add_battery_health(metrics)
+
+def read_capacity_history(file_path):
+    """
+    Read the "Battery capacity history" section only.
+
+    Returns:
+        tuple: Lists of periods, full charge capacities and design capacities
+        (empty if the section is missing)
+    """
+    with MappedReport(file_path) as report:
+        soup = report.section_soup("capacity_history")
+    if soup is None:
+        return [], [], []
+    return extract_capacity_history(soup, SectionLocator(soup), strict=True)
+
+def read_battery_usage(file_path):
+    """
+    Read every row of the "Battery usage" section.
+
+    parse_battery_report keeps only the first rows for display; this returns
+    the whole table from the section slice alone.
+
+    Returns:
+        list: One dict per row, keyed by the table's header cells (see
+        section_locator.header_labels: a spanned "ENERGY DRAINED" header
+        becomes "ENERGY DRAINED (%)" and "ENERGY DRAINED (mWh)")
+    """
+    with MappedReport(file_path) as report:
+        soup = report.section_soup("battery_usage")
+    if soup is None:
+        return []
+    locator = SectionLocator(soup)
+    table = locator.table("battery_usage") or soup.find("table")
+    rows = locator.cells.table_rows(table)
+    if not rows:
+        return []
+    headers = header_labels(table, rows[1].cells if len(rows) > 1 else ())
+    return [dict(zip(headers, row.cells)) for row in rows[1:] if len(row.cells) >= 3]
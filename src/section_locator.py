@@ -0,0 +1,328 @@
+import re
+from collections import namedtuple
+
+from bs4 import CData, NavigableString
+
+# Known powercfg section headings, including localized reports. Keys are the
+# logical section names used throughout the parser.
+SECTION_NAMES = {
+    "installed_batteries": [
+        "installed batteries", "installierte akkus", "batteries installées", "baterías instaladas"
+    ],
+    "recent_usage": [
+        "recent usage", "letzte nutzung", "utilisation récente", "uso reciente"
+    ],
+    "battery_usage": [
+        "battery usage", "akkunutzung", "utilisation de la batterie", "uso de la batería"
+    ],
+    "usage_history": [
+        "usage history", "nutzungsverlauf", "historique d'utilisation", "historial de uso"
+    ],
+    "capacity_history": [
+        "battery capacity history", "akkukapazitätsverlauf",
+        "historique de la capacité de la batterie", "historial de capacidad de la batería"
+    ],
+    "life_estimates": [
+        "battery life estimates", "akkulaufzeitschätzungen",
+        "estimations de l'autonomie de la batterie", "estimaciones de duración de la batería"
+    ],
+}
+
+# Row labels of the key metrics in the installed batteries table
+METRIC_LABELS = {
+    "Design Capacity": [
+        "design capacity", "auslegungskapazität", "capacité nominale", "capacidad de diseño"
+    ],
+    "Full Charge Capacity": [
+        "full charge capacity", "kapazität bei vollständiger aufladung",
+        "capacité de charge complète", "capacidad de carga completa"
+    ],
+    "Cycle Count": [
+        "cycle count", "zyklusanzahl", "nombre de cycles", "recuento de ciclos"
+    ],
+}
+
+# Row labels of the system information and battery identification, including
+# localized reports, in normalized form (see normalize_heading)
+COMPUTER_NAME_LABELS = ("computer name", "computername", "nom de l'ordinateur", "nombre del equipo")
+PRODUCT_NAME_LABELS = ("system product name", "systemproduktname", "nom du produit système",
+                       "nombre del producto del sistema", "product name", "model")
+SERIAL_NUMBER_LABELS = ("serial number", "seriennummer", "numéro de série", "número de serie")
+REPORT_TIME_LABELS = ("report time", "berichtszeit", "heure du rapport", "hora del informe")
+
+def normalize_heading(text):
+    """
+    Normalize heading or label text for lookups: lower case, single spaces.
+    """
+    return " ".join(text.split()).lower()
+
+def labeled_value(rows, labels):
+    """
+    Find the value of a labeled row, whatever the case, spacing or language of the label.
+
+    Parameters:
+        rows (dict or iterable): Label -> value mapping (e.g. the details of
+            parse_battery_report) or (label, value) pairs
+        labels (sequence): Normalized labels, in order of preference
+
+    Returns:
+        The value of the first label present with a non-empty value, or None
+    """
+    if isinstance(rows, dict):
+        rows = rows.items()
+    values = {}
+    for label, value in rows:
+        if value:
+            values.setdefault(normalize_heading(label), value)
+    for label in labels:
+        if label in values:
+            return values[label]
+    return None
+
+def _compile_matcher(names):
+    # One alternation with a named group per key, longest names first so
+    # "battery capacity history" wins over shorter overlapping names
+    alternatives = []
+    for key, variants in names.items():
+        for variant in variants:
+            alternatives.append((len(variant), key, variant))
+    alternatives.sort(reverse=True)
+
+    groups = {}
+    for _, key, variant in alternatives:
+        groups.setdefault(key, []).append(re.escape(variant))
+    pattern = "|".join(f"(?P<{key}>{'|'.join(variants)})" for key, variants in groups.items())
+    return re.compile(pattern)
+
+_EXACT_SECTIONS = {variant: key for key, variants in SECTION_NAMES.items() for variant in variants}
+_SECTION_MATCHER = _compile_matcher(SECTION_NAMES)
+_EXACT_LABELS = {variant: key for key, variants in METRIC_LABELS.items() for variant in variants}
+_LABEL_MATCHER = _compile_matcher({key.lower().replace(" ", "_"): variants for key, variants in METRIC_LABELS.items()})
+_LABEL_KEYS = {key.lower().replace(" ", "_"): key for key in METRIC_LABELS}
+
+def match_section(heading_text):
+    """
+    Find the logical section name for a heading.
+
+    Parameters:
+        heading_text (str): Text of an h2/h3 heading
+
+    Returns:
+        str or None: Section key from SECTION_NAMES, or None if unknown
+    """
+    text = normalize_heading(heading_text)
+    key = _EXACT_SECTIONS.get(text)
+    if key:
+        return key
+    match = _SECTION_MATCHER.search(text)
+    return match.lastgroup if match else None
+
+def match_metric_label(label_text):
+    """
+    Find the canonical metric name for a row label.
+
+    Parameters:
+        label_text (str): First cell of a table row
+
+    Returns:
+        str or None: "Design Capacity", "Full Charge Capacity", "Cycle Count" or None
+    """
+    text = normalize_heading(label_text)
+    key = _EXACT_LABELS.get(text)
+    if key:
+        return key
+    match = _LABEL_MATCHER.search(text)
+    return _LABEL_KEYS[match.lastgroup] if match else None
+
+# One table row: index of its table, stripped <td> texts, stripped <th> texts,
+# and the first cell's text as label and lower-cased label
+CellRow = namedtuple("CellRow", ["table", "cells", "headers", "label", "label_lower"])
+
+# String types get_text() includes by default (comments, doctypes... are skipped)
+_TEXT_TYPES = (NavigableString, CData)
+
+class CellTable:
+    """
+    Text of every table cell, extracted once and shared by all extractors.
+
+    Each table is walked once and the strings under every <td>/<th> are
+    collected as get_text(strip=True) would (stripped and concatenated), so no
+    cell subtree is visited twice. Rows of a nested table belong to that
+    table, not to the enclosing one. Rows are stored in document order in the
+    flat `rows` list and can be looked up per table.
+    """
+
+    def __init__(self, soup):
+        self.rows = []
+        self._spans = {}
+        self._texts = {}
+        self._tables = soup.find_all("table")
+
+        for index, table in enumerate(self._tables):
+            start = len(self.rows)
+            self._index, self._row, self._parts = index, None, None
+            self._walk(table)
+            if self._row is not None:
+                self._add_row(index, self._row)
+            self._spans[id(table)] = (start, len(self.rows))
+        del self._index, self._row, self._parts
+
+    def _walk(self, node):
+        # Collects the rows of one table. Text only counts inside a cell, and
+        # a nested table is part of the enclosing cell's text (as in get_text)
+        # rather than a source of rows; it gets its own rows as a table of its own.
+        for child in node.contents:
+            name = child.name
+            if name is None:
+                if self._parts is not None and type(child) in _TEXT_TYPES:
+                    text = child.strip()
+                    if text:
+                        self._parts.append(text)
+            elif name == "table":
+                if self._parts is not None:
+                    for string in child.descendants:
+                        if type(string) in _TEXT_TYPES:
+                            text = string.strip()
+                            if text:
+                                self._parts.append(text)
+            elif name == "tr":
+                if self._row is not None:
+                    self._add_row(self._index, self._row)
+                self._row = ([], [])
+                self._parts = None
+                self._walk(child)
+                self._parts = None
+            elif (name == "td" or name == "th") and self._row is not None:
+                outer = self._parts
+                self._parts = []
+                self._row[name == "th"].append(self._parts)
+                self._walk(child)
+                # Text after the cell's end tag is not part of it
+                self._parts = outer
+            else:
+                self._walk(child)
+
+    def _add_row(self, index, row):
+        cells = tuple("".join(parts) for parts in row[0])
+        headers = tuple("".join(parts) for parts in row[1])
+        label = cells[0] if cells else ""
+        self.rows.append(CellRow(index, cells, headers, label, label.lower()))
+
+    def table_rows(self, table):
+        """
+        Returns the rows of a table node (an empty list for None or unknown tables).
+        """
+        span = self._spans.get(id(table))
+        return self.rows[span[0]:span[1]] if span else []
+
+    def table_text(self, table):
+        """
+        Returns the lower-cased text of all cells of a table, for keyword searches.
+        """
+        key = id(table)
+        if key not in self._texts:
+            self._texts[key] = " ".join(" ".join(row.headers + row.cells)
+                                        for row in self.table_rows(table)).lower()
+        return self._texts[key]
+
+    def tables(self):
+        """
+        Yields (table, rows) for every table in document order.
+        """
+        for table in self._tables:
+            yield table, self.table_rows(table)
+
+_UNIT = re.compile(r'(%|mWh|mW)\s*$')
+
+def header_labels(table, sample_cells=()):
+    """
+    Column labels from the first row of a table, with colspans expanded.
+
+    Header cells are <th> in some reports and <td> inside a <thead> in real
+    powercfg reports. A header spanning several columns (powercfg's "ENERGY
+    DRAINED" over a % and a mWh column) is repeated for each column with the
+    unit of the matching sample cell appended, e.g. "ENERGY DRAINED (%)".
+
+    Parameters:
+        table (Tag): The table node
+        sample_cells (sequence): Texts of a data row, used to name spanned columns
+
+    Returns:
+        list: One label per column (empty if the table has no rows)
+    """
+    row = table.find("tr") if table is not None else None
+    if row is None:
+        return []
+    labels = []
+    for cell in row.find_all(["td", "th"], recursive=False):
+        text = cell.get_text(strip=True)
+        try:
+            span = max(1, int(cell.get("colspan", 1)))
+        except ValueError:
+            span = 1
+        if span == 1:
+            labels.append(text)
+            continue
+        for i in range(span):
+            column = len(labels)
+            unit = _UNIT.search(sample_cells[column]) if column < len(sample_cells) else None
+            labels.append(f"{text} ({unit.group(1) if unit else i + 1})")
+    return labels
+
+class SectionNotFoundError(KeyError):
+    """Raised when a required report section is not present."""
+
+class SectionLocator:
+    """
+    Maps report sections to their tables with a single pass over the document.
+
+    The table of a section is the first table after its heading and before
+    the next heading. The table before any heading (computer name, BIOS, ...)
+    is stored as "system_info". Lookups afterwards are dictionary reads.
+    Cell texts are extracted on first use of `cells` (see CellTable).
+    """
+
+    def __init__(self, soup):
+        self.soup = soup
+        self._cells = None
+        self.sections = {}
+        self.headings = {}
+        self.missing = set()
+
+        current = "system_info"
+        for node in soup.find_all(["h2", "h3", "table"]):
+            if node.name == "table":
+                if current and current not in self.sections:
+                    self.sections[current] = node
+                current = None
+            else:
+                current = match_section(node.get_text())
+                if current:
+                    self.headings.setdefault(current, node)
+
+    @property
+    def cells(self):
+        if self._cells is None:
+            self._cells = CellTable(self.soup)
+        return self._cells
+
+    def table(self, name):
+        """
+        Returns the table of a section, or None (recorded in `missing`).
+        """
+        table = self.sections.get(name)
+        if table is None:
+            self.missing.add(name)
+        return table
+
+    def require(self, name):
+        """
+        Returns the table of a section, raising SectionNotFoundError if absent.
+        """
+        table = self.table(name)
+        if table is None:
+            raise SectionNotFoundError(name)
+        return table
+
+    def __contains__(self, name):
+        return name in self.sections
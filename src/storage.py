@@ -0,0 +1,470 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from battery_repport import IncompleteReportError, parse_battery_report, parse_number
+from comparison import period_dates
+from section_locator import COMPUTER_NAME_LABELS, PRODUCT_NAME_LABELS, SERIAL_NUMBER_LABELS, labeled_value
+
+# Long-term fleet history, one row per device and capacity period, stored as
+#
+#   <root>/model=<model>/year=<yyyy>/part-<id>.bhc
+#
+# Partition values are URL-quoted as in Hive layouts. Each .bhc file is columnar:
+#
+#   column chunks   one per column and row group, each 8-byte aligned
+#   footer          UTF-8 JSON: schema, string dictionaries and, per row group,
+#                   row count, chunk offsets and min/max of numeric columns
+#   trailer         footer length u32, magic "BHC1"
+#
+# Rows in a file are sorted by health so row-group statistics on health (and
+# the correlated cycle count) let scans skip most groups for selective filters.
+
+MAGIC = b"BHC1"
+_TRAILER = struct.Struct("<I4s")
+ROW_GROUP_SIZE = 8192
+
+# Column name -> storage dtype; "str" columns are dictionary encoded as int32 codes
+SCHEMA = {
+    "computer_name": "str",
+    "serial_number": "str",
+    "date": "<i4",           # days since 1970-01-01, returned as datetime64[D]
+    "full_charge": "<i4",
+    "design": "<i4",
+    "health": "<f4",
+    "cycle_count": "<i4",    # estimated cycles at that date, -1 if unknown
+}
+PARTITION_COLUMNS = ("model", "year")
+
+class StorageError(ValueError):
+    """Raised for files that are not valid fleet history files."""
+
+def _partition_dir(root, model, year):
+    return os.path.join(root, f"model={quote(model, safe='')}", f"year={int(year)}")
+
+def _to_storage(name, values):
+    if name == "date":
+        return np.asarray(values, dtype="datetime64[D]").astype("<i4")
+    return np.asarray(values, dtype=SCHEMA[name])
+
+def write_history_file(path, columns, row_group_size=ROW_GROUP_SIZE):
+    """
+    Write one columnar history file.
+
+    Parameters:
+        path (str): Destination path (written atomically)
+        columns (dict): Column name -> array, for every column in SCHEMA
+        row_group_size (int): Rows per row group
+
+    Returns:
+        int: Number of rows written
+    """
+    rows = len(columns["health"])
+    order = np.argsort(np.asarray(columns["health"], dtype="<f4"), kind="stable")
+
+    data = {}
+    dictionaries = {}
+    for name, dtype in SCHEMA.items():
+        values = np.asarray(columns[name])[order]
+        if dtype == "str":
+            dictionary, codes = np.unique(values.astype(str), return_inverse=True)
+            dictionaries[name] = dictionary.tolist()
+            data[name] = codes.astype("<i4")
+        else:
+            data[name] = _to_storage(name, values)
+
+    chunks = []
+    offset = 0
+    groups = []
+    for start in range(0, rows, row_group_size):
+        group = {"rows": min(row_group_size, rows - start), "columns": {}, "stats": {}}
+        for name, values in data.items():
+            chunk = values[start:start + row_group_size].tobytes()
+            padding = -len(chunk) % 8
+            group["columns"][name] = [offset, len(chunk)]
+            chunks.append(chunk + b"\0" * padding)
+            offset += len(chunk) + padding
+            if SCHEMA[name] != "str":
+                part = values[start:start + row_group_size]
+                group["stats"][name] = [part.min().item(), part.max().item()]
+        groups.append(group)
+
+    footer = json.dumps({"rows": rows, "schema": SCHEMA, "dictionaries": dictionaries,
+                         "row_groups": groups}).encode("utf-8")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.writelines(chunks)
+        f.write(footer)
+        f.write(_TRAILER.pack(len(footer), MAGIC))
+    os.replace(temp_path, path)
+    return rows
+
+def _read_footer(buffer):
+    if len(buffer) < _TRAILER.size:
+        raise StorageError("Truncated file")
+    length, magic = _TRAILER.unpack_from(buffer, len(buffer) - _TRAILER.size)
+    if magic != MAGIC:
+        raise StorageError("Not a fleet history file")
+    start = len(buffer) - _TRAILER.size - length
+    try:
+        return json.loads(bytes(buffer[start:start + length]).decode("utf-8"))
+    except ValueError as e:
+        raise StorageError(f"Corrupt footer: {e}") from e
+
+def _group_matches(stats, filters):
+    for name, (low, high) in filters.items():
+        if name not in stats:
+            continue
+        minimum, maximum = stats[name]
+        if (low is not None and maximum < low) or (high is not None and minimum > high):
+            return False
+    return True
+
+def _normalize_filters(filters):
+    # Dates are compared as stored (days since the epoch)
+    normalized = {}
+    for name, (low, high) in (filters or {}).items():
+        if name not in SCHEMA or SCHEMA[name] == "str":
+            raise ValueError(f"Cannot filter on column {name!r}")
+        if name == "date":
+            low = None if low is None else int(np.datetime64(low, "D").astype(int))
+            high = None if high is None else int(np.datetime64(high, "D").astype(int))
+        normalized[name] = (low, high)
+    return normalized
+
+def scan_file(path, columns, filters):
+    """
+    Read the rows of one file that match the filters.
+
+    Row groups whose min/max statistics exclude the filters are skipped
+    without reading their data; only the requested and filtered columns of
+    the other groups are read from the memory-mapped file.
+
+    Parameters:
+        path (str): Path of a .bhc file
+        columns (list): Names of the stored columns to return
+        filters (dict): Column -> (low, high) inclusive bounds, None for open ends
+            (dates as days since the epoch, see _normalize_filters)
+
+    Returns:
+        tuple: dict of column arrays, and a dict with row group and row counts
+        ("rows_matched" counts the returned rows, also when no columns are asked for)
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        footer = _read_footer(buffer)
+        needed = list(dict.fromkeys(list(columns) + list(filters)))
+        parts = {name: [] for name in columns}
+        counts = {"row_groups": len(footer["row_groups"]), "row_groups_skipped": 0, "rows_scanned": 0,
+                  "rows_matched": 0}
+
+        for group in footer["row_groups"]:
+            if not _group_matches(group["stats"], filters):
+                counts["row_groups_skipped"] += 1
+                continue
+            values = {}
+            for name in needed:
+                offset, length = group["columns"][name]
+                dtype = "<i4" if footer["schema"][name] == "str" else footer["schema"][name]
+                values[name] = np.frombuffer(buffer, dtype=dtype, count=length // np.dtype(dtype).itemsize,
+                                             offset=offset)
+            mask = np.ones(group["rows"], dtype=bool)
+            for name, (low, high) in filters.items():
+                if low is not None:
+                    mask &= values[name] >= low
+                if high is not None:
+                    mask &= values[name] <= high
+            counts["rows_scanned"] += group["rows"]
+            counts["rows_matched"] += int(mask.sum())
+            for name in columns:
+                # Copy the selected rows out before the mapping is closed
+                parts[name].append(values[name][mask].copy())
+            del values
+
+    result = {}
+    for name in columns:
+        stored = np.concatenate(parts[name]) if parts[name] else np.zeros(0, dtype="<i4")
+        if SCHEMA[name] == "str":
+            result[name] = np.asarray(footer["dictionaries"][name], dtype=str)[stored] \
+                if footer["dictionaries"][name] else np.zeros(0, dtype=str)
+        elif name == "date":
+            result[name] = stored.astype("datetime64[D]")
+        else:
+            result[name] = stored.astype(SCHEMA[name], copy=False)
+    return result, counts
+
+def _scan_task(task):
+    path, model, year, columns, filters = task
+    data, counts = scan_file(path, columns, filters)
+    return model, year, data, counts
+
+class FleetStore:
+    """
+    Partitioned, columnar storage of fleet capacity history.
+
+    Data is partitioned by device model and year in a Hive-style directory
+    layout. Scans prune partitions from the directory names, skip row groups
+    with min/max statistics (predicate pushdown on health, cycle count and
+    date) and read the remaining files in parallel worker processes.
+    """
+
+    def __init__(self, root, row_group_size=ROW_GROUP_SIZE):
+        self.root = root
+        self.row_group_size = row_group_size
+
+    def append(self, model, columns):
+        """
+        Append rows of one model, split into one new file per year.
+
+        Parameters:
+            model (str): Device model (partition value)
+            columns (dict): Column name -> array for every column in SCHEMA
+
+        Returns:
+            list: Paths of the files written
+        """
+        dates = np.asarray(columns["date"], dtype="datetime64[D]")
+        years = dates.astype("datetime64[Y]").astype(int) + 1970
+        paths = []
+        for year in np.unique(years):
+            selected = years == year
+            directory = _partition_dir(self.root, model, year)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{time.time_ns():x}-{os.getpid()}.bhc")
+            write_history_file(path, {name: np.asarray(values)[selected] for name, values in columns.items()},
+                               self.row_group_size)
+            paths.append(path)
+        return paths
+
+    def add_reports(self, parsed_reports):
+        """
+        Store the capacity history of parsed reports.
+
+        Parameters:
+            parsed_reports (list): Results of parse_battery_report
+
+        Returns:
+            int: Number of rows stored
+        """
+        by_model = {}
+        for parsed in parsed_reports:
+            rows = report_rows(parsed)
+            if rows is not None:
+                model, columns = rows
+                by_model.setdefault(model, []).append(columns)
+
+        stored = 0
+        for model, chunks in by_model.items():
+            merged = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in SCHEMA}
+            self.append(model, merged)
+            stored += len(merged["health"])
+        return stored
+
+    def partitions(self, models=None, start=None, end=None):
+        """
+        List the partitions that can hold matching rows.
+
+        Parameters:
+            models (iterable): Models to keep (default: all)
+            start, end (str or datetime64): Date range (inclusive)
+
+        Returns:
+            tuple: List of (model, year, directory) kept, and the total number of partitions
+        """
+        models = None if models is None else set(models)
+        first = None if start is None else int(str(np.datetime64(start, "Y")))
+        last = None if end is None else int(str(np.datetime64(end, "Y")))
+
+        kept = []
+        total = 0
+        if not os.path.isdir(self.root):
+            return kept, total
+        for model_entry in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if not model_entry.is_dir() or not model_entry.name.startswith("model="):
+                continue
+            model = unquote(model_entry.name[len("model="):])
+            for year_entry in sorted(os.scandir(model_entry.path), key=lambda entry: entry.name):
+                if not year_entry.is_dir() or not year_entry.name.startswith("year="):
+                    continue
+                total += 1
+                year = int(year_entry.name[len("year="):])
+                if models is not None and model not in models:
+                    continue
+                if (first is not None and year < first) or (last is not None and year > last):
+                    continue
+                kept.append((model, year, year_entry.path))
+        return kept, total
+
+    def scan(self, columns=None, models=None, start=None, end=None, filters=None, max_workers=None):
+        """
+        Query the stored history.
+
+        Parameters:
+            columns (list): Columns to return, stored ones and/or "model"/"year" (default: all)
+            models (iterable): Models to read (partition pruning)
+            start, end (str or datetime64): Date range, inclusive (partition pruning and filter)
+            filters (dict): Column -> (low, high) inclusive bounds on numeric columns,
+                e.g. {"health": (None, 70), "cycle_count": (500, None)}
+            max_workers (int): Worker processes (default: CPU count; 1 scans in-process)
+
+        Returns:
+            tuple: dict of column arrays, and a dict of scan statistics
+        """
+        columns = list(columns or list(SCHEMA) + list(PARTITION_COLUMNS))
+        filters = dict(filters or {})
+        if start is not None or end is not None:
+            low, high = filters.get("date", (None, None))
+            filters["date"] = (start if start is not None else low, end if end is not None else high)
+        filters = _normalize_filters(filters)
+        stored_columns = [name for name in columns if name in SCHEMA]
+
+        partitions, total = self.partitions(models, start, end)
+        tasks = []
+        for model, year, directory in partitions:
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".bhc"):
+                    tasks.append((os.path.join(directory, name), model, year, stored_columns, filters))
+
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks)))
+        if workers == 1:
+            results = [_scan_task(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_scan_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+        stats = {"partitions": total, "partitions_scanned": len(partitions), "files": len(tasks),
+                 "row_groups": 0, "row_groups_skipped": 0, "rows_scanned": 0, "rows_matched": 0}
+        parts = {name: [] for name in columns}
+        for model, year, data, counts in results:
+            for key, value in counts.items():
+                stats[key] += value
+            # Partition columns are sized by the matched rows: with only
+            # "model" or "year" requested, no stored column is read
+            rows = counts["rows_matched"]
+            for name in columns:
+                if name == "model":
+                    parts[name].append(np.full(rows, model, dtype=object))
+                elif name == "year":
+                    parts[name].append(np.full(rows, year, dtype=np.int32))
+                else:
+                    parts[name].append(data[name])
+
+        result = {}
+        for name in columns:
+            if parts[name]:
+                result[name] = np.concatenate(parts[name])
+            else:
+                result[name] = np.zeros(0, dtype="datetime64[D]" if name == "date" else object)
+        stats["rows"] = len(result[columns[0]]) if columns else 0
+        return result, stats
+
+def report_rows(parsed):
+    """
+    Turn one parsed report into history rows.
+
+    Reports only give the current cycle count, so cycle counts of past
+    periods are estimated by assuming cycles accrued evenly over the
+    capacity history.
+
+    Parameters:
+        parsed (tuple): Result of parse_battery_report
+
+    Periods without a design capacity have no health and are left out.
+
+    Returns:
+        tuple or None: Model and dict of column arrays, or None if the report
+        has no dated capacity history
+    """
+    metrics, details, _, (periods, full_charges, design_capacities) = parsed[:4]
+    dates = period_dates(periods)
+    length = len(periods)
+    if dates is None or length == 0:
+        return None
+
+    full_charge = np.asarray(full_charges, dtype="<i4")
+    design = np.asarray(design_capacities, dtype="<i4")
+    health = np.divide(full_charge * 100.0, design, out=np.zeros(length), where=design > 0).astype("<f4")
+
+    cycle_count = parse_number(metrics.get("Cycle Count"))
+    days = (dates - dates[0]).astype(float)
+    if cycle_count is None:
+        cycles = np.full(length, -1, dtype="<i4")
+    elif days[-1] > 0:
+        cycles = np.round(days / days[-1] * cycle_count).astype("<i4")
+    else:
+        cycles = np.full(length, cycle_count, dtype="<i4")
+
+    usable = design > 0
+    if not usable.any():
+        return None
+    length = int(usable.sum())
+
+    model = labeled_value(details, PRODUCT_NAME_LABELS) or "Unknown"
+    columns = {
+        "computer_name": np.full(length, labeled_value(details, COMPUTER_NAME_LABELS) or "", dtype=object),
+        "serial_number": np.full(length, labeled_value(details, SERIAL_NUMBER_LABELS) or "", dtype=object),
+        "date": dates[usable],
+        "full_charge": full_charge[usable],
+        "design": design[usable],
+        "health": health[usable],
+        "cycle_count": cycles[usable],
+    }
+    return model, columns
+
+def _parse_for_storage(path):
+    try:
+        return parse_battery_report(path, strict=True)[:4]
+    except IncompleteReportError as e:
+        return e.partial[:4]
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Store and query partitioned fleet capacity history.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Parse reports and add their capacity history")
+    ingest.add_argument("root", help="Storage directory")
+    ingest.add_argument("reports", nargs="+", help="Battery report HTML files")
+    ingest.add_argument("--workers", type=int, default=None, help="Number of parser processes")
+
+    query = commands.add_parser("query", help="Count matching rows and devices")
+    query.add_argument("root", help="Storage directory")
+    query.add_argument("--model", action="append", help="Model to include (repeatable)")
+    query.add_argument("--start", help="First date (YYYY-MM-DD)")
+    query.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    query.add_argument("--max-health", type=float, help="Only rows at or below this health (%%)")
+    query.add_argument("--min-cycles", type=int, help="Only rows with at least this many cycles")
+    query.add_argument("--workers", type=int, default=None, help="Number of scan processes")
+    args = parser.parse_args()
+
+    store = FleetStore(args.root)
+    if args.command == "ingest":
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            parsed = list(executor.map(_parse_for_storage, args.reports))
+        print(f"Stored {store.add_reports(parsed)} rows from {len(parsed)} reports")
+        return
+
+    filters = {}
+    if args.max_health is not None:
+        filters["health"] = (None, args.max_health)
+    if args.min_cycles is not None:
+        filters["cycle_count"] = (args.min_cycles, None)
+    start = time.perf_counter()
+    data, stats = store.scan(["computer_name", "serial_number", "health"], models=args.model,
+                             start=args.start, end=args.end, filters=filters, max_workers=args.workers)
+    devices = len(set(zip(data["computer_name"], data["serial_number"])))
+    print(f"{stats['rows']} rows from {devices} devices in {time.perf_counter() - start:.2f} s")
+    print(f"Scanned {stats['partitions_scanned']}/{stats['partitions']} partitions, {stats['files']} files, "
+          f"{stats['row_groups'] - stats['row_groups_skipped']}/{stats['row_groups']} row groups")
+
+if __name__ == "__main__":
+    main()
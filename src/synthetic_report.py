@@ -0,0 +1,209 @@
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+from html import escape
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from section_locator import METRIC_LABELS, SECTION_NAMES
+
+# Position of each locale in the SECTION_NAMES / METRIC_LABELS variant lists
+LOCALES = {"en": 0, "de": 1, "fr": 2, "es": 3}
+THOUSANDS_SEPARATORS = {"en": ",", "de": ".", "fr": "\u202f", "es": "."}
+
+def _format_mwh(value, locale):
+    return f"{int(value):,} mWh".replace(",", THOUSANDS_SEPARATORS[locale])
+
+def _heading(section, locale):
+    text = SECTION_NAMES[section][LOCALES[locale]]
+    return text[0].upper() + text[1:]
+
+def _label(metric, locale):
+    return METRIC_LABELS[metric][LOCALES[locale]].upper()
+
+def _date_time_cell(moment):
+    return (f'<td class="dateTime"><span class="date">{moment:%Y-%m-%d} </span>'
+            f'<span class="time">{moment:%H:%M:%S}</span></td>')
+
+def render_battery_report(computer_name="SYNTHETIC-PC", product_name="Synthetic Laptop 14",
+                          serial_number="SN-0001", design_capacity=50000, full_charge_capacity=42000,
+                          cycle_count=300, periods=52, usage_rows=200, start_date=date(2022, 1, 1),
+                          locale="en", seed=0, battery_name=None, manufacturer=None, chemistry=None,
+                          report_time=None, placeholders=True):
+    """
+    Render an HTML battery report with the structure of `powercfg /batteryreport`.
+
+    Used by the fake powercfg executable, the sysfs data source and tests, so the
+    whole generate -> parse -> render pipeline can run without Windows.
+
+    With `placeholders` (the default) the rows a test report does not care
+    about (BIOS, OS build, battery name, ...) and the battery life estimates
+    are filled with made-up values. Without, a report holds only the values
+    passed in: rows whose value is None are left out, and so are the life
+    estimates.
+
+    Parameters:
+        computer_name (str): Value of the COMPUTER NAME row
+        product_name (str): Value of the SYSTEM PRODUCT NAME row
+        serial_number (str): Battery serial number
+        design_capacity (int or None): Design capacity in mWh
+        full_charge_capacity (int or None): Current full charge capacity in mWh;
+            without both capacities there is no capacity history
+        cycle_count (int or None): Cycle count, None renders "-"
+        periods (int): Number of weekly capacity history periods
+        usage_rows (int): Number of rows in each usage table
+        start_date (date): Start of the first capacity history period
+        locale (str): One of "en", "de", "fr", "es"
+        seed (int): Seed for the random noise in the generated history
+        battery_name (str): Value of the battery NAME row
+        manufacturer (str): Value of the MANUFACTURER row
+        chemistry (str): Value of the CHEMISTRY row
+        report_time (datetime): REPORT TIME (default: 10:00 on the day the history ends)
+        placeholders (bool): Fill unset rows and the life estimates with made-up values
+
+    Returns:
+        str: The report HTML
+    """
+    rng = random.Random(seed)
+    end_date = start_date + timedelta(weeks=periods)
+    if report_time is None:
+        report_time = datetime.combine(end_date, datetime.min.time()) + timedelta(hours=10)
+    if placeholders:
+        battery_name = battery_name or "SYNTH-" + serial_number[-4:]
+        manufacturer = manufacturer or "Synthetic Cells"
+        chemistry = chemistry or "LiP"
+
+    parts = [
+        '<!DOCTYPE html>',
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=UTF-8">',
+        '<title>Battery report</title></head><body>',
+        '<h1>Battery report</h1>',
+        '<table style="margin-bottom: 6em;"><col/>',
+    ]
+    system_rows = [
+        ("COMPUTER NAME", computer_name),
+        ("SYSTEM PRODUCT NAME", product_name),
+    ]
+    if placeholders:
+        system_rows += [
+            ("BIOS", "1.0.0 01/01/2022"),
+            ("OS BUILD", "22621.1.amd64fre.ni_release.220506-1250"),
+            ("PLATFORM ROLE", "Mobile"),
+            ("CONNECTED STANDBY", "Supported"),
+        ]
+    for label, value in system_rows:
+        if value is None:
+            continue
+        parts.append(f'<tr><td><span class="label">{label}</span></td><td>{escape(str(value))}</td></tr>')
+    parts.append(f'<tr><td><span class="label">REPORT TIME</span></td>{_date_time_cell(report_time)}</tr>')
+    parts.append('</table>')
+
+    # Installed batteries
+    battery_rows = [
+        ("NAME", battery_name),
+        ("MANUFACTURER", manufacturer),
+        ("SERIAL NUMBER", serial_number),
+        ("CHEMISTRY", chemistry),
+        (_label("Design Capacity", locale),
+         None if design_capacity is None else _format_mwh(design_capacity, locale)),
+        (_label("Full Charge Capacity", locale),
+         None if full_charge_capacity is None else _format_mwh(full_charge_capacity, locale)),
+        (_label("Cycle Count", locale), "-" if cycle_count is None else str(cycle_count)),
+    ]
+    parts.append(f'<h2>{_heading("installed_batteries", locale)}</h2>')
+    parts.append('<div class="explanation">Information about each currently installed battery</div>')
+    parts.append('<table><thead><tr><td> </td><td>BATTERY 1</td></tr></thead>')
+    for label, value in battery_rows:
+        if value is None:
+            continue
+        parts.append(f'<tr><td><span class="label">{label}</span></td><td>{escape(value)}</td></tr>')
+    parts.append('</table>')
+
+    # Recent usage: power state changes with remaining capacity
+    parts.append(f'<h2>{_heading("recent_usage", locale)}</h2>')
+    parts.append('<table><thead><tr><td>START TIME</td><td class="centered">STATE</td>'
+                 '<td class="centered">SOURCE</td><td colspan="2" class="centered">CAPACITY REMAINING</td>'
+                 '</tr></thead>')
+    # The usage tables are made up from the full charge capacity
+    capacity_rows = usage_rows if full_charge_capacity else 0
+    moment = report_time - timedelta(days=3)
+    remaining = full_charge_capacity
+    for i in range(capacity_rows):
+        moment += timedelta(minutes=rng.randint(5, 40))
+        remaining = max(0, remaining - rng.randint(0, full_charge_capacity // 20))
+        if remaining < full_charge_capacity * 0.1:
+            remaining = full_charge_capacity
+        percent = round(remaining / full_charge_capacity * 100)
+        state = "Active" if i % 3 else "Connected standby"
+        parts.append(f'<tr class="{"even" if i % 2 else "odd"}">{_date_time_cell(moment)}'
+                     f'<td class="state">{state}</td><td class="acdc">Battery</td>'
+                     f'<td class="percent">{percent} %</td><td class="mw">{_format_mwh(remaining, locale)}</td></tr>')
+    parts.append('</table>')
+
+    # Battery usage: drains; ENERGY DRAINED spans the % and mWh columns
+    parts.append(f'<h2>{_heading("battery_usage", locale)}</h2>')
+    parts.append('<table><thead><tr><td>START TIME</td><td class="centered">STATE</td>'
+                 '<td class="centered">DURATION</td><td class="centered" colspan="2">ENERGY DRAINED</td>'
+                 '</tr></thead>')
+    moment = report_time - timedelta(days=3)
+    for i in range(capacity_rows):
+        moment += timedelta(minutes=rng.randint(20, 90))
+        minutes = rng.randint(1, 59)
+        drained = rng.randint(0, full_charge_capacity // 10)
+        percent = round(drained / full_charge_capacity * 100)
+        parts.append(f'<tr>{_date_time_cell(moment)}<td class="state">Active</td>'
+                     f'<td class="hms">0:{minutes:02d}:00</td><td class="percent">{percent} %</td>'
+                     f'<td class="mw">{_format_mwh(drained, locale)}</td></tr>')
+    parts.append('</table>')
+
+    # Usage history: daily durations on battery and AC
+    parts.append(f'<h2>{_heading("usage_history", locale)}</h2>')
+    parts.append('<table><thead><tr><td>PERIOD</td><td>BATTERY ACTIVE</td><td>BATTERY STANDBY</td>'
+                 '<td>AC ACTIVE</td><td>AC STANDBY</td></tr></thead>')
+    for i in range(usage_rows):
+        day = end_date - timedelta(days=usage_rows - i)
+        durations = [f"{rng.randint(0, 8)}:{rng.randint(0, 59):02d}:00" for _ in range(4)]
+        parts.append(f'<tr><td class="dateTime">{day:%Y-%m-%d}</td>'
+                     + "".join(f'<td class="hms">{d}</td>' for d in durations) + '</tr>')
+    parts.append('</table>')
+
+    # Capacity history: weekly periods degrading linearly towards the current capacity
+    parts.append(f'<h2>{_heading("capacity_history", locale)}</h2>')
+    parts.append('<table><thead><tr><td><span>PERIOD</span></td><td class="centered">FULL CHARGE CAPACITY</td>'
+                 '<td class="centered">DESIGN CAPACITY</td></tr></thead>')
+    history_periods = periods if design_capacity and full_charge_capacity is not None else 0
+    for i in range(history_periods):
+        period_start = start_date + timedelta(weeks=i)
+        progress = (i + 1) / periods
+        capacity = design_capacity + (full_charge_capacity - design_capacity) * progress
+        capacity = min(design_capacity, capacity * (1 + rng.uniform(-0.005, 0.005)))
+        if i == periods - 1:
+            capacity = full_charge_capacity
+        parts.append(f'<tr class="{"even" if i % 2 else "odd"}">'
+                     f'<td class="dateTime">{period_start:%Y-%m-%d} - {period_start + timedelta(weeks=1):%Y-%m-%d}</td>'
+                     f'<td class="mw">{_format_mwh(capacity, locale)}</td>'
+                     f'<td class="mw">{_format_mwh(design_capacity, locale)}</td></tr>')
+    parts.append('</table>')
+
+    if placeholders:
+        parts.append(f'<h2>{_heading("life_estimates", locale)}</h2>')
+        parts.append('<table><thead><tr><td>PERIOD</td><td>AT FULL CHARGE ACTIVE</td>'
+                     '<td>AT DESIGN CAPACITY ACTIVE</td></tr></thead>')
+        parts.append(f'<tr><td class="dateTime">{end_date:%Y-%m-%d}</td><td class="hms">5:12:00</td>'
+                     f'<td class="hms">6:10:00</td></tr></table>')
+
+    parts.append('</body></html>')
+    return "\n".join(parts)
+
+def write_battery_report(output_path, **kwargs):
+    """
+    Render a synthetic report (see render_battery_report) and write it to disk.
+
+    Returns:
+        str: Absolute path of the written report
+    """
+    output_path = os.path.abspath(output_path)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(render_battery_report(**kwargs))
+    return output_path
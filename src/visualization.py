@@ -1,9 +1,18 @@
+import io
+import os
+import sys
 import matplotlib.pyplot as plt
+from collections import OrderedDict
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.figure import Figure
+from PIL import Image
 import numpy as np
-import re
 
-def plot_capacity_history(periods, full_charge_capacities, design_capacities):
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from battery_repport import parse_number
+
+def plot_capacity_history(periods, full_charge_capacities, design_capacities, forecast=None):
     """
     Plots the battery capacity history.
     
@@ -11,6 +20,8 @@ def plot_capacity_history(periods, full_charge_capacities, design_capacities):
         periods (list): A list of strings representing the reporting periods.
         full_charge_capacities (list): A list of full charge capacity values (in mWh) over time.
         design_capacities (list): A list of design capacity values (in mWh) corresponding to each period.
+        forecast (dict): Optional projection from forecasting.forecast_capacity_history,
+            drawn after the last period with its confidence band and threshold.
         
     Returns:
         Figure: Matplotlib figure containing the plot
@@ -44,17 +55,40 @@ def plot_capacity_history(periods, full_charge_capacities, design_capacities):
             ax.text(i - width/2, fc + max(full_charge_capacities) * 0.05, f"{hp:.1f}%", 
                    ha='center', va='bottom', fontsize=9, fontweight='bold', color='#333333')
             
+        tick_labels = list(periods)
+        max_capacity = max(max(full_charge_capacities), max(design_capacities))
+        
+        # Projected full charge capacity, continuing from the last bar
+        if forecast:
+            fx = np.arange(len(periods), len(periods) + len(forecast["periods"])) - width/2
+            line_x = np.concatenate([[x[-1] - width/2], fx])
+            line_y = np.concatenate([[full_charge_capacities[-1]], forecast["full_charge"]])
+            ax.plot(line_x, line_y, linestyle='--', marker='o', markersize=3, color='#4a86e8',
+                    label='Projected Full Charge')
+            ax.fill_between(fx, forecast["low"], forecast["high"], color='#4a86e8', alpha=0.15,
+                            label=f"{forecast['confidence'] * 100:.0f}% Confidence")
+            
+            crossing = forecast.get("crossing")
+            threshold_label = f"{forecast['threshold_pct']:.0f}% Health"
+            if forecast.get("crossed"):
+                threshold_label += " (already below)"
+            elif crossing is not None:
+                threshold_label += f" (est. {crossing})"
+            ax.axhline(forecast["threshold"], color='#F44336', linestyle=':', linewidth=1.5, label=threshold_label)
+            
+            tick_labels += forecast["periods"]
+            max_capacity = max(max_capacity, float(np.max(forecast["high"])))
+            
         # Set labels and title
         ax.set_xlabel("Period", fontsize=11, fontweight='bold')
         ax.set_ylabel("Capacity (mWh)", fontsize=11, fontweight='bold')
         ax.set_title("Battery Capacity History and Health Percentage", fontsize=13, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(periods, rotation=45, ha='right')
+        ax.set_xticks(np.arange(len(tick_labels)))
+        ax.set_xticklabels(tick_labels, rotation=45, ha='right')
         ax.legend(loc='upper right')
         ax.grid(True, alpha=0.3)
         
         # Set y-limit with some padding
-        max_capacity = max(max(full_charge_capacities), max(design_capacities))
         ax.set_ylim(0, max_capacity * 1.15)
     else:
         ax.text(0.5, 0.5, "No capacity history data available", 
@@ -63,71 +97,159 @@ def plot_capacity_history(periods, full_charge_capacities, design_capacities):
     fig.tight_layout()
     return fig
 
-def create_battery_health_gauge(full_charge, design_capacity):
+class CapacityComparisonPlot:
     """
-    Creates a gauge chart showing current battery health as a percentage of design capacity.
+    Overlays the health curves of several battery reports in one chart.
+
+    Each report is drawn as a single line artist, so adding or removing a
+    report only touches that report's series.
+    """
+
+    def __init__(self, figsize=(10, 6)):
+        self.fig = Figure(figsize=figsize)
+        self.ax = self.fig.add_subplot(111)
+        self.lines = {}
+
+        self.ax.set_xlabel("Period Start", fontsize=11, fontweight='bold')
+        self.ax.set_ylabel("Health (% of Design Capacity)", fontsize=11, fontweight='bold')
+        self.ax.set_title("Battery Health Comparison", fontsize=13, fontweight='bold')
+        self.ax.grid(True, alpha=0.3)
+        self.fig.autofmt_xdate()
+        self.empty_text = self.ax.text(0.5, 0.5, "No reports to compare",
+                                       ha='center', va='center', transform=self.ax.transAxes, fontsize=12)
+
+    def add_series(self, key, label, dates, full_charge_capacities, design_capacities):
+        """
+        Adds or replaces one report's health curve.
+
+        Parameters:
+            key (str): Unique identifier of the report (e.g. its path)
+            label (str): Legend label for the report
+            dates (numpy.ndarray): datetime64 start date of each period
+            full_charge_capacities (numpy.ndarray): Full charge capacity per period (mWh)
+            design_capacities (numpy.ndarray): Design capacity per period (mWh)
+
+        Returns:
+            bool: True if the series was drawn, False if it had no usable data
+        """
+        if dates is None or len(dates) == 0:
+            return False
+
+        full_charge = np.asarray(full_charge_capacities, dtype=float)
+        design = np.asarray(design_capacities, dtype=float)
+        health = np.divide(full_charge * 100, design, out=np.zeros_like(full_charge), where=design > 0)
+
+        if key in self.lines:
+            line = self.lines[key]
+            line.set_data(dates, health)
+            line.set_label(label)
+        else:
+            (line,) = self.ax.plot(dates, health, marker='o', markersize=3, linewidth=1.5, label=label)
+            self.lines[key] = line
+
+        self._refresh()
+        return True
+
+    def remove_series(self, key):
+        """
+        Removes one report's health curve if present.
+
+        Parameters:
+            key (str): Identifier passed to add_series
+        """
+        line = self.lines.pop(key, None)
+        if line is not None:
+            line.remove()
+            self._refresh()
+
+    def _refresh(self):
+        self.empty_text.set_visible(not self.lines)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        if self.lines:
+            self.ax.legend(loc='lower left', fontsize=9)
+        elif self.ax.get_legend():
+            self.ax.get_legend().remove()
+
+def plot_capacity_comparison(series_list):
+    """
+    Plots the health history of several battery reports in one chart.
+
+    Parameters:
+        series_list (list): CapacitySeries items (see comparison.load_reports)
+
+    Returns:
+        Figure: Matplotlib figure containing the plot
+    """
+    plot = CapacityComparisonPlot()
+    for series in series_list:
+        if not plot.add_series(series.path, series.label, series.dates, series.full_charge, series.design):
+            print(f"WARNING: No dated capacity history in {series.label}, skipping it in the comparison.")
+    return plot.fig
+
+def gauge_health_percentage(full_charge, design_capacity):
+    """
+    Battery health shown by the gauge, as a percentage of design capacity capped at 100.
     
     Parameters:
         full_charge (int or str): Current full charge capacity in mWh
         design_capacity (int or str): Original design capacity in mWh
         
     Returns:
-        Figure: Matplotlib figure containing the gauge chart
+        float: Health percentage (0 if the values cannot be read)
     """
-    fig = Figure(figsize=(6, 4))
-    ax = fig.add_subplot(111, polar=True)
-    
-    # Process input values to ensure we have integers
     try:
-        # Handle string values with units (e.g., "45000 mWh")
+        # Handle string values with units and thousands separators (e.g.
+        # "41,650 mWh"), read the same way as for the "Battery Health" metric
         if isinstance(full_charge, str):
-            match = re.search(r'(\d+)', full_charge)
-            if match:
-                full_charge = int(match.group(1))
-            else:
-                full_charge = 0
+            full_charge = parse_number(full_charge) or 0
         
         if isinstance(design_capacity, str):
-            match = re.search(r'(\d+)', design_capacity)
-            if match:
-                design_capacity = int(match.group(1))
-            else:
-                design_capacity = 1  # Avoid division by zero
+            design_capacity = parse_number(design_capacity) or 1  # Avoid division by zero
         
         # Ensure we have positive values
         full_charge = max(0, full_charge)
         design_capacity = max(1, design_capacity)  # Avoid division by zero
         
-        # Calculate health percentage
-        health_pct = min(100, (full_charge / design_capacity) * 100)
+        return min(100, (full_charge / design_capacity) * 100)
     except (ValueError, TypeError, ZeroDivisionError) as e:
         print(f"Error calculating battery health: {e}")
-        health_pct = 0
-    
-    # Gauge settings
-    theta = np.linspace(np.pi/2, 3*np.pi/2, 100)
-    radii = np.ones_like(theta)
-    
+        return 0
+
+def _gauge_color(health_pct):
     # Map health percentage to color (green->yellow->red)
     if health_pct > 80:
-        color = '#4CAF50'  # Green
+        return '#4CAF50'  # Green
     elif health_pct > 60:
-        color = '#8BC34A'  # Light green
+        return '#8BC34A'  # Light green
     elif health_pct > 40:
-        color = '#FFC107'  # Amber
+        return '#FFC107'  # Amber
     elif health_pct > 20:
-        color = '#FF9800'  # Orange
-    else:
-        color = '#F44336'  # Red
+        return '#FF9800'  # Orange
+    return '#F44336'  # Red
+
+def _gauge_arc_theta(health_pct):
+    # Centers and width of the 100 overlapping bars of the health arc
+    width = np.pi * health_pct / 100
+    return np.linspace(np.pi/2, np.pi/2 + width, 100), width
+
+def _draw_gauge(fig, health_pct):
+    # Draws the whole gauge; returns the axes and the artists that depend on
+    # the health: the arc bars, the spokes drawn over them and the center text
+    ax = fig.add_subplot(111, polar=True)
+    
+    # Gauge settings
+    theta = np.linspace(np.pi/2, 3*np.pi/2, 100)
+    radii = np.ones_like(theta)
     
     # Background gauge (grey)
     ax.bar(theta, radii, width=np.pi, bottom=0.0, color='#E0E0E0', alpha=0.5)
     
-    # Health percentage gauge
-    if health_pct > 0:  # Only draw if we have a non-zero health percentage
-        health_theta = np.linspace(np.pi/2, np.pi/2 + np.pi * health_pct/100, 100)
-        health_radii = np.ones_like(health_theta)
-        ax.bar(health_theta, health_radii, width=np.pi * health_pct/100, bottom=0.0, color=color, alpha=0.8)
+    # Health percentage gauge (hidden at 0%)
+    health_theta, width = _gauge_arc_theta(health_pct)
+    arc = ax.bar(health_theta, radii, width=width, bottom=0.0, color=_gauge_color(health_pct), alpha=0.8)
+    for bar in arc:
+        bar.set_visible(health_pct > 0)
     
     # Remove spines and ticks
     ax.set_yticks([])
@@ -139,13 +261,133 @@ def create_battery_health_gauge(full_charge, design_capacity):
     ax.set_xticks(positions)
     ax.set_xticklabels(labels, fontsize=10, fontweight='bold')
     
+    # Spokes at the labels, as lines in the grid style so that redrawing
+    # them over the arc does not redraw the whole axis. One line each, like
+    # the grid: the vertical and horizontal ones snap to pixels.
+    ax.xaxis.grid(False)
+    top = ax.get_ylim()[1]
+    spokes = [ax.plot([position, position], [0, top], color=plt.rcParams['grid.color'],
+                      linewidth=plt.rcParams['grid.linewidth'], linestyle=plt.rcParams['grid.linestyle'],
+                      alpha=plt.rcParams['grid.alpha'], scalex=False, scaley=False)[0]
+              for position in positions]
+    
     # Add text in the center
-    ax.text(0, 0, f"{health_pct:.1f}%", ha='center', va='center', 
-           fontsize=24, fontweight='bold', color='#333333')
+    text = ax.text(0, 0, f"{health_pct:.1f}%", ha='center', va='center', 
+                   fontsize=24, fontweight='bold', color='#333333')
     
     fig.tight_layout()
+    return ax, arc, spokes, text
+
+def create_battery_health_gauge(full_charge, design_capacity):
+    """
+    Creates a gauge chart showing current battery health as a percentage of design capacity.
+    
+    Parameters:
+        full_charge (int or str): Current full charge capacity in mWh
+        design_capacity (int or str): Original design capacity in mWh
+        
+    Returns:
+        Figure: Matplotlib figure containing the gauge chart
+    """
+    fig = Figure(figsize=(6, 4))
+    _draw_gauge(fig, gauge_health_percentage(full_charge, design_capacity))
     return fig
 
+class HealthGaugeRenderer:
+    """
+    Renders health gauges to PNG for many devices.
+    
+    The static parts of the gauge (background, tick labels, layout) are drawn
+    once into a raster; each gauge restores that raster and draws only the
+    health arc, the spokes over it and the center text. Rendered images
+    are kept in an LRU cache keyed by the health rounded to the one decimal
+    the gauge shows and by the arc color, which is picked from the unrounded
+    health (80.04% is green, as in create_battery_health_gauge).
+    """
+
+    def __init__(self, figsize=(6, 4), dpi=100, max_entries=1024):
+        """
+        Parameters:
+            figsize (tuple): Figure size in inches
+            dpi (int): Resolution of the PNG
+            max_entries (int): Number of rendered gauges kept in the cache
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax, self.arc, self.spokes, self.text = _draw_gauge(self.fig, 100)
+        
+        # Everything drawn per gauge is left out of the cached background
+        for artist in (*self.arc, *self.spokes, self.text):
+            artist.set_animated(True)
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def render_rgba(self, health_pct, color=None):
+        """
+        Draws one gauge.
+        
+        Parameters:
+            health_pct (float): Health percentage (see gauge_health_percentage)
+            color (str): Arc color (default: picked from health_pct)
+            
+        Returns:
+            numpy.ndarray: (height, width, 4) uint8 image
+        """
+        self.canvas.restore_region(self._background)
+        if health_pct > 0:
+            health_theta, width = _gauge_arc_theta(health_pct)
+            color = color or _gauge_color(health_pct)
+            for bar, center in zip(self.arc, health_theta):
+                bar.set_x(center - width/2)
+                bar.set_width(width)
+                bar.set_facecolor(color)
+                self.ax.draw_artist(bar)
+        for spoke in self.spokes:
+            self.ax.draw_artist(spoke)
+        self.text.set_text(f"{health_pct:.1f}%")
+        self.ax.draw_artist(self.text)
+        return np.array(self.canvas.buffer_rgba())
+
+    def render_png(self, health_pct):
+        """
+        Returns the PNG of one gauge, from the cache if possible.
+        
+        Parameters:
+            health_pct (float): Health percentage (see gauge_health_percentage)
+            
+        Returns:
+            bytes: PNG image
+        """
+        key = (round(float(health_pct), 1), _gauge_color(health_pct))
+        png = self._entries.get(key)
+        if png is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+        
+        self.misses += 1
+        buffer = io.BytesIO()
+        Image.fromarray(self.render_rgba(*key)).save(buffer, format="png", dpi=(self.fig.dpi, self.fig.dpi))
+        png = buffer.getvalue()
+        self._entries[key] = png
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return png
+
+    def render_report_png(self, full_charge, design_capacity):
+        """
+        Same as render_png, from the capacities as accepted by create_battery_health_gauge.
+        
+        Returns:
+            bytes: PNG image
+        """
+        return self.render_png(gauge_health_percentage(full_charge, design_capacity))
+
 # For testing purposes
 if __name__ == "__main__":
     # Sample data
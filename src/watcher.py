@@ -0,0 +1,330 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from anomaly import AnomalyMonitor, load_monitored_report, print_anomaly
+from comparison import load_capacity_series
+
+REPORT_PATTERN = "battery-report-*.html"
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+class _InotifyBackend:
+    """
+    Change detection using the Linux inotify API through ctypes.
+
+    wait() returns the names of files that changed, or None when the kernel
+    queue overflowed and the folder has to be rescanned.
+    """
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if length:
+                name = data[offset:offset + length].rstrip(b"\0")
+                names.add(os.fsdecode(name))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class _PollingBackend:
+    """
+    Portable change detection that compares (size, mtime) snapshots.
+
+    Only one directory listing is made per interval; os.scandir returns the
+    stat data with the entries on Windows, so no per-file stat is needed there.
+    """
+
+    def __init__(self, folder, pattern):
+        self.folder = folder
+        self.pattern = pattern
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if fnmatch.fnmatch(entry.name, self.pattern) and entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        snapshot = self._scan()
+        changed = {name for name, signature in snapshot.items() if self.snapshot.get(name) != signature}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+class ReportWatcher:
+    """
+    Watches a drop folder and parses new or modified battery reports.
+
+    Files are only parsed once their size and modification time have been
+    stable for `settle_time` seconds, so partially written reports are skipped
+    until the writer is done. Parses run in a bounded worker pool: when
+    `max_pending` parses are in flight, ready files wait in a queue instead of
+    being submitted, which keeps memory bounded under bursts. The queue holds
+    each file name at most once (with its latest version), so it never grows
+    beyond the number of reports in the folder.
+
+    Results are pushed to the same sinks as comparison.load_reports, called as
+    sink(path, result) from the worker pool's callback thread; a shared
+    CapacitySeriesCache is safe to use from other threads meanwhile.
+
+    Latency is measured from the moment the watcher first saw a file, not its
+    modification time: copied or moved reports keep their original mtime.
+    """
+
+    def __init__(self, folder, sinks=(), parse_func=load_capacity_series, pattern=REPORT_PATTERN,
+                 settle_time=1.0, poll_interval=0.5, max_workers=None, max_pending=None,
+                 use_inotify=True, process_existing=True, cache=None):
+        self.folder = os.path.abspath(folder)
+        self.sinks = list(sinks)
+        self.parse_func = parse_func
+        self.pattern = pattern
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 2
+        self.cache = cache
+        self.latencies = deque(maxlen=1000)
+
+        self._pending = {}          # name -> [signature, last_change, landed_at]
+        self._ready = OrderedDict()  # name -> (signature, landed_at) waiting for a worker slot
+        self._processed = {}   # name -> signature of the last submitted version
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._executor = None
+
+        self.backend = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self.backend = _InotifyBackend(self.folder)
+            except (OSError, AttributeError) as e:
+                print(f"WARNING: inotify unavailable ({e}). Falling back to polling.")
+        if self.backend is None:
+            self.backend = _PollingBackend(self.folder, self.pattern)
+
+        if process_existing:
+            self._mark_changed(self._list_reports())
+
+    @property
+    def uses_inotify(self):
+        return isinstance(self.backend, _InotifyBackend)
+
+    def _list_reports(self):
+        return {name for name in os.listdir(self.folder) if fnmatch.fnmatch(name, self.pattern)}
+
+    def _mark_changed(self, names):
+        now = time.monotonic()
+        for name in names:
+            if not fnmatch.fnmatch(name, self.pattern) or name in self._pending:
+                continue
+            self._pending[name] = [None, now, time.time()]
+
+    def _settle(self):
+        # Move files whose size and mtime stopped changing to the ready queue
+        now = time.monotonic()
+        for name, entry in list(self._pending.items()):
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                del self._pending[name]
+                continue
+
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature != entry[0]:
+                entry[0] = signature
+                entry[1] = now
+            elif stat.st_size > 0 and now - entry[1] >= self.settle_time:
+                del self._pending[name]
+                if self._processed.get(name) != signature:
+                    # A newer version replaces one still waiting, keeping its place
+                    landed_at = self._ready[name][1] if name in self._ready else entry[2]
+                    self._ready[name] = (signature, landed_at)
+
+    def _dispatch(self):
+        while self._ready:
+            if not self._slots.acquire(blocking=False):
+                # Backpressure: all worker slots are busy, retry on the next tick
+                return
+            name, (signature, landed_at) = self._ready.popitem(last=False)
+            self._processed[name] = signature
+            path = os.path.join(self.folder, name)
+            future = self._executor.submit(self.parse_func, path)
+            future.add_done_callback(lambda f, p=path, t=landed_at: self._on_done(f, p, t))
+
+    def _on_done(self, future, path, landed_at):
+        self._slots.release()
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error parsing battery report {path}: {e}")
+            return
+
+        self.latencies.append(time.time() - landed_at)
+        if self.cache is not None:
+            self.cache.put(path, result)
+        for sink in self.sinks:
+            try:
+                sink(path, result)
+            except Exception as e:
+                print(f"Error in report sink for {path}: {e}")
+
+    def poll_once(self, timeout=None):
+        """
+        Runs one detection/settle/dispatch cycle.
+
+        Parameters:
+            timeout (float): Seconds to wait for changes (default: poll_interval)
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        wait_time = self.poll_interval if timeout is None else timeout
+        if self._pending:
+            wait_time = min(wait_time, self.settle_time / 2)
+
+        changed = self.backend.wait(wait_time)
+        if changed is None:
+            # inotify queue overflow: rescan the whole folder
+            changed = self._list_reports()
+        self._mark_changed(changed)
+        self._settle()
+        self._dispatch()
+
+    def start(self):
+        """Starts watching in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.is_set():
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    print(f"Error watching {self.folder}: {e}")
+                    time.sleep(self.poll_interval)
+
+        self._thread = threading.Thread(target=run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stops watching and shuts the worker pool down."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        self.backend.close()
+
+    def latency_stats(self):
+        """
+        Summarizes the time from a report landing in the folder to its parsed result.
+
+        Returns:
+            dict: count, mean, p50, p95 and max latency in seconds
+        """
+        if not self.latencies:
+            return {"count": 0}
+        values = sorted(self.latencies)
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": values[len(values) // 2],
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "max": values[-1]
+        }
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Watch a folder for new battery reports and parse them.")
+    parser.add_argument("folder", help="Folder that receives battery-report-*.html files")
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds a file must be unchanged before parsing")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parser processes")
+    parser.add_argument("--poll", action="store_true", help="Force the polling backend instead of inotify")
+    parser.add_argument("--alerts", action="store_true",
+                        help="Print alerts for sudden capacity drops and drain spikes")
+    args = parser.parse_args()
+
+    def print_result(path, series):
+        if args.alerts:
+            series = series.series
+        health = series.metrics.get("Battery Health", "N/A")
+        print(f"{os.path.basename(path)}: health {health}, {len(series.periods)} capacity periods")
+
+    sinks = [print_result]
+    parse_func = load_capacity_series
+    if args.alerts:
+        # Device keys and usage rows are read in the parser processes
+        sinks.append(AnomalyMonitor(alert_sinks=[print_anomaly]))
+        parse_func = load_monitored_report
+
+    watcher = ReportWatcher(args.folder, sinks=sinks, parse_func=parse_func, settle_time=args.settle,
+                            max_workers=args.workers, use_inotify=not args.poll)
+    print(f"Watching {watcher.folder} ({'inotify' if watcher.uses_inotify else 'polling'}). Press Ctrl+C to stop.")
+    watcher.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    print(f"Latency: {watcher.latency_stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+# Import our modules - adjust paths if needed
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from battery_repport import IncompleteReportError, parse_battery_report
+
+# Wire format of a parsed battery report (all integers little-endian):
+#
+#   header   magic "BHMW", version u8, codec u8, reserved u16,
+#            payload length u32 (uncompressed), payload crc32 u32
+#   payload  (optionally zlib/zstd compressed)
+#            string table   u32 count, u32 offsets[count + 1], UTF-8 blob
+#            metrics        u32 count, u32 (key, value) string indices
+#            details        u32 count, u32 (key, value) string indices
+#            usage          u32 columns, u32 rows, u32 header indices[columns],
+#                           u32 cell indices[rows * columns] (MISSING if absent)
+#            capacity       u32 periods, u32 full charge count, u32 design count,
+#                           u32 period indices, i32 full charges, i32 design capacities
+#
+# Every array starts on a 4-byte boundary so the decoder can expose it with
+# numpy.frombuffer without copying.
+
+MAGIC = b"BHMW"
+VERSION = 1
+CODECS = {"none": 0, "zlib": 1, "zstd": 2}
+MISSING = 0xFFFFFFFF
+_HEADER = struct.Struct("<4sBBHII")
+
+class WireFormatError(ValueError):
+    """Raised for payloads that are not valid battery report wire data."""
+
+def _compress(payload, compression, level):
+    if compression == "none":
+        return payload
+    if compression == "zlib":
+        return zlib.compress(payload, level)
+    if zstandard is None:
+        raise WireFormatError("zstd compression requires the 'zstandard' package")
+    return zstandard.ZstdCompressor(level=level).compress(payload)
+
+def _decompress(data, codec, length):
+    if codec == CODECS["none"]:
+        return data
+    if codec == CODECS["zlib"]:
+        return zlib.decompress(data)
+    if codec == CODECS["zstd"]:
+        if zstandard is None:
+            raise WireFormatError("Payload is zstd compressed but 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=length)
+    raise WireFormatError(f"Unknown codec {codec}")
+
+class _Writer:
+    def __init__(self):
+        self.strings = {}
+        self.chunks = []
+
+    def intern(self, text):
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+
+    def u32_array(self, values):
+        self.chunks.append(np.asarray(values, dtype="<u4").tobytes())
+
+    def i32_array(self, values):
+        self.chunks.append(np.asarray(values, dtype="<i4").tobytes())
+
+    def string_table(self):
+        encoded = [text.encode("utf-8") for text in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        blob = b"".join(encoded)
+        blob += b"\0" * (-len(blob) % 4)
+        return struct.pack("<I", len(encoded)) + offsets.tobytes() + blob
+
+def encode_report(parsed, compression="zlib", level=6):
+    """
+    Serialize a parse_battery_report result to the compact wire format.
+
+    Parameters:
+        parsed (tuple): Result of parse_battery_report (the raw HTML is not sent)
+        compression (str): "none", "zlib" or "zstd" (needs the zstandard package)
+        level (int): Compression level
+
+    Returns:
+        bytes: The encoded report
+    """
+    if compression not in CODECS:
+        raise WireFormatError(f"Unknown compression {compression!r}")
+    metrics, details, usage_history, (periods, full_charges, design_capacities) = parsed[:4]
+    writer = _Writer()
+
+    for mapping in (metrics, details):
+        writer.u32_array([len(mapping)])
+        writer.u32_array([writer.intern(str(part)) for item in mapping.items() for part in item])
+
+    columns = []
+    for row in usage_history:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+    cells = [writer.intern(str(row[column])) if column in row else MISSING
+             for row in usage_history for column in columns]
+    writer.u32_array([len(columns), len(usage_history)])
+    writer.u32_array([writer.intern(column) for column in columns])
+    writer.u32_array(cells)
+
+    writer.u32_array([len(periods), len(full_charges), len(design_capacities)])
+    writer.u32_array([writer.intern(str(period)) for period in periods])
+    writer.i32_array(full_charges)
+    writer.i32_array(design_capacities)
+
+    payload = writer.string_table() + b"".join(writer.chunks)
+    body = _compress(payload, compression, level)
+    header = _HEADER.pack(MAGIC, VERSION, CODECS[compression], 0, len(payload), zlib.crc32(payload))
+    return header + body
+
+def encode_report_file(file_path, compression="zlib", level=6):
+    """
+    Parse a report on the endpoint and encode it for shipping to the collector.
+
+    Reports with missing sections are sent with those sections empty rather
+    than with the parser's dummy data.
+
+    Returns:
+        bytes: The encoded report
+    """
+    try:
+        parsed = parse_battery_report(file_path, strict=True)
+    except IncompleteReportError as e:
+        parsed = e.partial
+    return encode_report(parsed, compression, level)
+
+class WireReport:
+    """
+    Collector-side view of an encoded report.
+
+    Numeric arrays and string index arrays are numpy views into the payload
+    buffer (no copies); strings are decoded only when accessed.
+    """
+
+    def __init__(self, data):
+        view = memoryview(data)
+        if len(view) < _HEADER.size:
+            raise WireFormatError("Truncated header")
+        magic, version, codec, _, length, crc = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise WireFormatError("Not a battery report payload")
+        if version != VERSION:
+            raise WireFormatError(f"Unsupported wire format version {version}")
+
+        try:
+            payload = _decompress(view[_HEADER.size:], codec, length)
+        except WireFormatError:
+            raise
+        except Exception as e:
+            raise WireFormatError(f"Corrupt payload: {e}") from e
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            raise WireFormatError("Corrupt payload")
+        self.version = version
+        self.buffer = memoryview(payload)
+        self._offset = 0
+
+        try:
+            self._read_sections()
+        except ValueError as e:
+            raise WireFormatError(f"Truncated payload: {e}") from e
+
+    def _read_sections(self):
+        count = self._u32(1)[0]
+        self._string_offsets = self._u32(count + 1)
+        self._blob_start = self._offset
+        self._offset += int(self._string_offsets[-1]) + (-int(self._string_offsets[-1]) % 4)
+
+        self._metric_indices = self._u32(int(self._u32(1)[0]) * 2)
+        self._detail_indices = self._u32(int(self._u32(1)[0]) * 2)
+
+        columns, rows = (int(n) for n in self._u32(2))
+        self.usage_columns = self._u32(columns)
+        self.usage_cells = self._u32(rows * columns).reshape(rows, columns)
+
+        periods, full_count, design_count = (int(n) for n in self._u32(3))
+        self.period_indices = self._u32(periods)
+        self.full_charge_capacities = self._array("<i4", full_count)
+        self.design_capacities = self._array("<i4", design_count)
+
+    def _array(self, dtype, count):
+        array = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=self._offset)
+        self._offset += array.nbytes
+        return array
+
+    def _u32(self, count):
+        return self._array("<u4", count)
+
+    def string(self, index):
+        """Decode one entry of the string table."""
+        start = self._blob_start + int(self._string_offsets[index])
+        end = self._blob_start + int(self._string_offsets[index + 1])
+        return str(self.buffer[start:end], "utf-8")
+
+    def _mapping(self, indices):
+        return {self.string(key): self.string(value) for key, value in indices.reshape(-1, 2)}
+
+    @property
+    def metrics(self):
+        return self._mapping(self._metric_indices)
+
+    @property
+    def details(self):
+        return self._mapping(self._detail_indices)
+
+    @property
+    def periods(self):
+        return [self.string(index) for index in self.period_indices]
+
+    @property
+    def usage_history(self):
+        headers = [self.string(index) for index in self.usage_columns]
+        return [{header: self.string(index) for header, index in zip(headers, row) if index != MISSING}
+                for row in self.usage_cells]
+
+    def to_parsed(self):
+        """
+        Returns:
+            tuple: metrics, details, usage history and capacity data, like parse_battery_report without the HTML
+        """
+        return (self.metrics, self.details, self.usage_history,
+                (self.periods, self.full_charge_capacities.tolist(), self.design_capacities.tolist()))
+
+def decode_report(data):
+    """
+    Decode an encoded report on the collector.
+
+    Parameters:
+        data (bytes or memoryview): Output of encode_report
+
+    Returns:
+        WireReport: Lazy, zero-copy view of the report
+    """
+    return WireReport(data)
@@ -0,0 +1,96 @@
+import os
+import unittest
+
+import numpy as np
+
+from src.aggregation import FixedBinHistogram, FleetAggregator, RunningMoments, format_summary, parse_number
+from src.battery_repport import IncompleteReportError, parse_battery_report
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+def make_report(design, full_charge, cycles, model="XPS 13", computer="PC"):
+    metrics = {
+        "DESIGN CAPACITY": f"{design:,} mWh",
+        "FULL CHARGE CAPACITY": f"{full_charge:,} mWh",
+        "CYCLE COUNT": str(cycles)
+    }
+    details = {"SYSTEM PRODUCT NAME": model, "COMPUTER NAME": computer}
+    return metrics, details
+
+class TestFleetAggregation(unittest.TestCase):
+    def test_parse_number(self):
+        self.assertEqual(parse_number("56,999 mWh"), 56999)
+        self.assertEqual(parse_number("56.999 mWh"), 56999)
+        self.assertEqual(parse_number("300"), 300)
+        self.assertIsNone(parse_number("-"))
+        self.assertEqual(parse_number("12.5 %"), 12.5)
+        self.assertEqual(parse_number("1,234.56"), 1234.56)
+        self.assertEqual(parse_number("1.234,5 mWh"), 1234.5)
+        self.assertEqual(parse_number("56 999 mWh"), 56999)
+
+    def test_moments_and_histogram_merge(self):
+        values = np.random.default_rng(0).uniform(50, 100, 1000)
+
+        whole, left, right = RunningMoments(), RunningMoments(), RunningMoments()
+        histogram, left_hist, right_hist = (FixedBinHistogram(0, 120, 240) for _ in range(3))
+        for value in values:
+            whole.add(value)
+            histogram.add(value)
+        for value in values[:300]:
+            left.add(value)
+            left_hist.add(value)
+        for value in values[300:]:
+            right.add(value)
+            right_hist.add(value)
+        left.merge(right)
+        left_hist.merge(right_hist)
+
+        self.assertAlmostEqual(left.mean, np.mean(values))
+        self.assertAlmostEqual(left.std, np.std(values, ddof=1))
+        self.assertEqual(left.count, whole.count)
+        self.assertEqual(left_hist.counts.tolist(), histogram.counts.tolist())
+        self.assertAlmostEqual(histogram.quantile(0.5), np.median(values), delta=histogram.width)
+
+    def test_fleet_summary(self):
+        aggregator = FleetAggregator(max_outliers=2)
+        partial = FleetAggregator(max_outliers=2)
+        aggregator.add(*make_report(50000, 45000, 100, computer="A"))
+        aggregator.add(*make_report(50000, 30000, 400, computer="B"))
+        partial.add(*make_report(60000, 54000, 50, model="ThinkPad", computer="C"))
+        partial.add(*make_report(60000, 24000, 200, model="ThinkPad", computer="D"))
+        partial.add({}, {})
+        aggregator.merge(partial)
+
+        summary = aggregator.summary()
+        self.assertEqual(summary["reports"], 4)
+        self.assertEqual(summary["skipped"], 1)
+        self.assertEqual(sorted(summary["models"]), ["ThinkPad", "XPS 13"])
+        self.assertEqual([device for device, _ in summary["lowest_health"]], ["D", "B"])
+        self.assertEqual(summary["fastest_degradation"][0], ("D", 30.0))
+        self.assertAlmostEqual(summary["health"]["mean"], (90 + 60 + 90 + 40) / 4)
+
+    def test_out_of_range_counts(self):
+        aggregator = FleetAggregator()
+        aggregator.add(*make_report(50000, 20000, 100, computer="A"))  # 60% lost in 100 cycles
+        aggregator.add(*make_report(50000, 49000, 2500, computer="B"))
+        summary = aggregator.summary()
+        self.assertEqual(summary["models"]["XPS 13"]["degradation_overflow"], 1)
+        self.assertEqual(summary["cycle_overflow"], 1)
+        self.assertIn("1 above 20", format_summary(summary))
+
+    def test_battery_name_is_not_a_model(self):
+        aggregator = FleetAggregator()
+        aggregator.add(*make_report(50000, 45000, 100)[:1], {"NAME": "DELL 1VX1H8B"})
+        self.assertEqual(list(aggregator.summary()["models"]), ["Unknown"])
+
+    def test_localized_labels(self):
+        with self.assertRaises(IncompleteReportError) as raised:
+            parse_battery_report(os.path.join(CORPUS_DIR, "anonymized_no_history_de.html"), strict=True)
+        aggregator = FleetAggregator()
+        self.assertTrue(aggregator.add_report(raised.exception.partial, source="report.html"))
+        summary = aggregator.summary()
+        self.assertEqual(list(summary["models"]), ["Contoso Pro 14"])
+        self.assertEqual([device for device, _ in summary["lowest_health"]], ["HOST-0113"])
+
+if __name__ == "__main__":
+    unittest.main()
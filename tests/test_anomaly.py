@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.anomaly import (AnomalyMonitor, CusumDetector, EwmaDetector, WindowZScoreDetector,
+                         load_monitored_report, usage_drain_rate)
+from src.battery_repport import parse_battery_report
+from src.comparison import load_capacity_series
+from src.dedup import DeviceKey
+from src.synthetic_report import write_battery_report
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def periods(count):
+    return [f"2023-W{week:03d}" for week in range(count)]
+
+class TestAnomaly(unittest.TestCase):
+    def test_detectors(self):
+        values = 100 + np.random.default_rng(0).normal(0, 1, 200)
+        for detector in (EwmaDetector(min_std=0.1), WindowZScoreDetector(16, min_std=0.1)):
+            scores = [detector.update(value) for value in values]
+            self.assertIsNone(scores[0])
+            self.assertLess(max(abs(score) for score in scores[20:]), 6)
+            self.assertLess(detector.update(90), -6)
+
+        # Each step is only 1.5 sigma, but CUSUM accumulates the shift
+        cusum = CusumDetector(direction=-1, min_std=0.1)
+        for value in values[:50]:
+            cusum.update(value)
+        self.assertGreaterEqual(max(cusum.update(value - 1.5) for value in values[50:60]), 5)
+
+        window = WindowZScoreDetector(8)
+        for value in range(1000):
+            window.update(float(value))
+        self.assertEqual(len(window.values), 8)
+
+    def test_capacity_drop(self):
+        rng = np.random.default_rng(1)
+        full_charge = 50000 - np.arange(60) * 20 + rng.normal(0, 60, 60)
+        full_charge[40:] -= 3000
+        alerts = []
+        monitor = AnomalyMonitor(alert_sinks=[alerts.append])
+
+        found = monitor.consume_capacity_history("pc", (periods(60), full_charge, [50000] * 60))
+        self.assertEqual(found, alerts)
+        self.assertEqual([alert.position for alert in alerts], ["2023-W040"])
+        self.assertEqual(alerts[0].series, "capacity")
+        self.assertLess(alerts[0].value, -5)
+
+        # Feeding the same periods again (an overlapping report) changes nothing
+        monitor.consume_capacity_history("pc", (periods(60), full_charge, [50000] * 60))
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(monitor.points, 59)
+
+    def test_older_report_fed_late(self):
+        rng = np.random.default_rng(1)
+        full_charge = 50000 - np.arange(80) * 20 + rng.normal(0, 60, 80)
+        design = [50000] * 80
+        monitor = AnomalyMonitor()
+
+        alerts = monitor.consume_capacity_history("pc", (periods(80)[20:60], full_charge[20:60], design[20:60]))
+        # An older report: its periods were seen or precede them, so they are skipped
+        alerts += monitor.consume_capacity_history("pc", (periods(80)[:21], full_charge[:21], design[:21]))
+        alerts += monitor.consume_capacity_history("pc", (periods(80)[60:], full_charge[60:], design[60:]))
+        self.assertEqual(alerts, [])
+        self.assertEqual(monitor.points, 59)
+
+    def test_usage_spike_and_sink(self):
+        self.assertEqual(usage_drain_rate({"START TIME": "x", "DURATION": "0:30:00", "ENERGY DRAINED (%)": "5 %"}), 10)
+        self.assertIsNone(usage_drain_rate({"START TIME": "x", "DURATION": "0:01:00", "ENERGY DRAINED (%)": "5 %"}))
+
+        monitor = AnomalyMonitor()
+        rows = [{"START TIME": f"2023-01-01 {hour:02d}:00", "DURATION": "1:00:00",
+                 "ENERGY DRAINED (%)": f"{10 + hour % 3} %"} for hour in range(20)]
+        rows.append({"START TIME": "2023-01-01 21:00", "DURATION": "1:00:00", "ENERGY DRAINED (%)": "60 %"})
+        alerts = monitor.consume_usage_history("pc", rows)
+        self.assertEqual([alert.position for alert in alerts], ["2023-01-01 21:00"])
+
+        handle, path = tempfile.mkstemp(suffix=".html")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        write_battery_report(path, computer_name="PC-9", serial_number="SN-9", periods=30, usage_rows=50)
+        monitored = load_monitored_report(path)
+        self.assertEqual(len(monitored.usage), 50)
+        parsed = parse_battery_report(path)
+        series = load_capacity_series(path)
+
+        # The sink uses the parsed result only, never the file
+        os.remove(path)
+        open(path, "w").close()
+        monitor(path, monitored)
+        monitor(path, parsed)
+        monitor(path, series)
+        self.assertEqual(list(monitor.devices), ["pc", ("PC-9", "SN-9"), ("PC-9", None), os.path.basename(path)])
+        self.assertEqual(set(monitor.devices[("PC-9", "SN-9")]), {"capacity", "usage"})
+        self.assertEqual(set(monitor.devices[os.path.basename(path)]), {"capacity"})
+
+    def test_real_format_report(self):
+        monitor = AnomalyMonitor()
+        path = os.path.join(CORPUS_DIR, "anonymized_en_two_batteries.html")
+        monitor(path, load_monitored_report(path))
+        usage = monitor.devices[DeviceKey("HOST-0042", "ANON-0001")]["usage"]
+        # The second row has a time only; it takes the first row's date
+        self.assertEqual(usage.last_position, "2023-09-29 12:10:03")
+        self.assertEqual(monitor.points, 4 + 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from src.api_server import BatteryApiServer
+from src.synthetic_report import render_battery_report, write_battery_report
+
+class TestBatteryApiServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.server = BatteryApiServer(storage_dir=os.path.join(cls.tmp_dir, "storage"),
+                                      allowed_dirs=[os.path.join(cls.tmp_dir, "allowed")], max_workers=1)
+        cls.port = cls.server.start_in_thread()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_thread()
+        shutil.rmtree(cls.tmp_dir)
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        payload = response.read()
+        connection.close()
+        return response, payload
+
+    def test_upload_and_fetch(self):
+        html = render_battery_report(periods=4, usage_rows=3).encode("utf-8")
+        response, payload = self.request("POST", "/reports", html, {"Content-Type": "text/html"})
+        self.assertEqual(response.status, 201)
+        report = json.loads(payload)
+        self.assertEqual(report["missing"], [])
+
+        response, payload = self.request("GET", report["links"]["metrics"])
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(payload)["Battery Health"], "84.0%")
+
+        # The ETag is stable and honoured
+        etag = response.getheader("ETag")
+        response, payload = self.request("GET", report["links"]["metrics"], headers={"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(payload, b"")
+
+        response, payload = self.request("GET", report["links"]["capacity"])
+        self.assertEqual(json.loads(payload)["full_charge_capacities"][-1], 42000)
+
+        response, payload = self.request("GET", report["links"]["gauge.png"])
+        self.assertEqual(response.getheader("Content-Type"), "image/png")
+        self.assertTrue(payload.startswith(b"\x89PNG"))
+
+        # Uploading the same content again returns the same id
+        _, payload = self.request("POST", "/reports", html, {"Content-Type": "text/html"})
+        self.assertEqual(json.loads(payload)["id"], report["id"])
+
+    def test_report_by_path(self):
+        allowed = os.path.join(self.tmp_dir, "allowed")
+        os.makedirs(allowed, exist_ok=True)
+        path = write_battery_report(os.path.join(allowed, "report.html"), periods=2, usage_rows=1, seed=7)
+        response, payload = self.request("POST", "/reports", json.dumps({"path": path}),
+                                         {"Content-Type": "application/json"})
+        self.assertEqual(response.status, 201)
+
+        outside = write_battery_report(os.path.join(self.tmp_dir, "outside.html"), periods=2, usage_rows=1)
+        response, _ = self.request("POST", "/reports", json.dumps({"path": outside}),
+                                   {"Content-Type": "application/json"})
+        self.assertEqual(response.status, 403)
+
+    def test_port_in_use(self):
+        # A failed start is reported to the caller instead of blocking it
+        other = BatteryApiServer(storage_dir=os.path.join(self.tmp_dir, "other"), max_workers=1)
+        with self.assertRaises(OSError):
+            other.start_in_thread(port=self.port)
+        other.stop_thread()
+
+    def test_unknown_report(self):
+        response, _ = self.request("GET", "/reports/doesnotexist/metrics")
+        self.assertEqual(response.status, 404)
+
+    def test_unparsable_upload_is_not_kept(self):
+        body = b"\xff\xfe not a report \xff"
+        response, _ = self.request("POST", "/reports", body, {"Content-Type": "text/html"})
+        self.assertEqual(response.status, 422)
+
+        report_id = hashlib.sha256(body).hexdigest()[:20]
+        _, payload = self.request("GET", "/reports")
+        self.assertNotIn(report_id, json.loads(payload)["reports"])
+        response, _ = self.request("GET", f"/reports/{report_id}/metrics")
+        self.assertEqual(response.status, 404)
+        self.assertFalse(os.path.exists(os.path.join(self.server.storage_dir, f"{report_id}.html")))
+
+    def test_malformed_request_line(self):
+        with socket.create_connection(("127.0.0.1", self.port), timeout=60) as sock:
+            sock.sendall(b"NONSENSE\r\n\r\n")
+            response = b""
+            while True:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                response += chunk
+        self.assertTrue(response.startswith(b"HTTP/1.1 400 "))
+        self.assertIn(b"Connection: close", response)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
 from src.battery_repport import parse_battery_report
 
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
 class TestBatteryReportParsing(unittest.TestCase):
     def test_parse_battery_report(self):
         # Sample HTML content for testing
@@ -15,17 +19,32 @@ class TestBatteryReportParsing(unittest.TestCase):
         </body>
         </html>
         """
-        with open("sample_battery_report.html", "w", encoding="utf-8") as f:
+        handle, path = tempfile.mkstemp(suffix=".html")
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
             f.write(sample_html)
+        self.addCleanup(os.remove, path)
         
         expected_metrics = {
             "Design Capacity": "56999 mWh",
             "Full Charge Capacity": "21466 mWh",
-            "Cycle Count": "300"
+            "Cycle Count": "300",
+            "Battery Health": "37.7%"
         }
         
-        parsed_metrics = parse_battery_report("sample_battery_report.html")
+        parsed_metrics, details, usage_history, capacity_data, _ = parse_battery_report(path)
         self.assertEqual(parsed_metrics, expected_metrics)
+        self.assertEqual(details, {})
+        self.assertEqual(usage_history, [])
+
+    def test_dummy_history_uses_localized_capacities(self):
+        # Without a capacity history the lenient parser's dummy periods start
+        # from the report's own capacities, also in a German report
+        path = os.path.join(CORPUS_DIR, "anonymized_no_history_de.html")
+        _, details, _, (periods, full_charges, designs), _ = parse_battery_report(path)
+        self.assertEqual(len(periods), 10)
+        self.assertEqual(full_charges[0], 31480)
+        self.assertEqual(set(designs), {52000})
+        self.assertNotIn("", details)
 
 if __name__ == "__main__":
     unittest.main()
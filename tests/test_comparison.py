@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.comparison import CapacitySeriesCache, load_reports
+from src.visualization import CapacityComparisonPlot
+
+SAMPLE_HTML = """
+<html>
+<body>
+    <table>
+        <tr><td>Design Capacity</td><td>50000 mWh</td></tr>
+        <tr><td>Full Charge Capacity</td><td>45000 mWh</td></tr>
+    </table>
+    <h2>Battery capacity history</h2>
+    <table>
+        <tr><th>PERIOD</th><th>FULL CHARGE CAPACITY</th><th>DESIGN CAPACITY</th></tr>
+        <tr><td>2023-01-01 - 2023-01-08</td><td>48000 mWh</td><td>50000 mWh</td></tr>
+        <tr><td>2023-01-08 - 2023-01-15</td><td>47000 mWh</td><td>50000 mWh</td></tr>
+    </table>
+</body>
+</html>
+"""
+
+class TestCapacityComparison(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for name in ("laptop-a.html", "laptop-b.html"):
+            path = os.path.join(self.tmp_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(SAMPLE_HTML)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_reports_fills_cache(self):
+        cache = CapacitySeriesCache(max_entries=1)
+        series_list, errors = load_reports(self.paths, cache=cache, max_workers=2)
+
+        self.assertEqual(errors, {})
+        self.assertEqual([s.label for s in series_list], ["laptop-a", "laptop-b"])
+        self.assertEqual(series_list[0].full_charge.tolist(), [48000, 47000])
+        self.assertEqual(str(series_list[0].dates[1]), "2023-01-08")
+        self.assertEqual(len(cache), 1)
+
+        # Cached reports are not parsed again, and only the most recent entry is kept
+        cached, _ = load_reports(self.paths[1:], cache=cache)
+        self.assertIs(cache.get(self.paths[1]), cached[0])
+        self.assertIsNone(cache.get(self.paths[0]))
+
+    def test_add_and_remove_series(self):
+        series_list, _ = load_reports(self.paths[:1])
+        series = series_list[0]
+
+        plot = CapacityComparisonPlot()
+        self.assertTrue(plot.add_series("a", series.label, series.dates, series.full_charge, series.design))
+        self.assertTrue(plot.add_series("b", "other", series.dates, series.full_charge, series.design))
+        self.assertEqual(len(plot.ax.lines), 2)
+        self.assertEqual(list(plot.lines["a"].get_ydata()), [96.0, 94.0])
+
+        plot.remove_series("a")
+        self.assertEqual(list(plot.lines), ["b"])
+        self.assertEqual(len(plot.ax.lines), 1)
+
+if __name__ == "__main__":
+    unittest.main()
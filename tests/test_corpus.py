@@ -0,0 +1,186 @@
+"""
+Golden-corpus regression and performance gate for the report parser.
+
+Every report in tests/corpus/ is parsed in worker processes and compared with
+its <name>.expected.json; parse time and peak memory per file are compared
+with tests/corpus/baseline.json. The expected output is the strict parser's:
+sections a report lacks stay empty and are listed in "strict_missing", so
+the dummy data the lenient parser substitutes is never stored. After an intended change, regenerate with:
+
+    python -m tests.test_corpus --update            # expected output and baseline
+    python -m tests.test_corpus --update-baseline   # performance baseline only
+
+Set BATTERY_PERF_GATE=0 to skip the performance checks (e.g. under coverage).
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from bs4 import BeautifulSoup
+
+from src.battery_repport import IncompleteReportError, parse_battery_report
+from src.synthetic_report import write_battery_report
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+BASELINE_PATH = os.path.join(CORPUS_DIR, "baseline.json")
+
+# Synthetic members of the corpus (the anonymized ones are checked in as-is)
+SYNTHETIC_REPORTS = {
+    "synthetic_en_small": dict(periods=8, usage_rows=20),
+    "synthetic_en_medium": dict(periods=104, usage_rows=400, seed=1),
+    "synthetic_en_large": dict(periods=260, usage_rows=1000, seed=2, start_date=date(2019, 1, 7)),
+    "synthetic_en_no_cycle_count": dict(periods=12, usage_rows=30, cycle_count=None, seed=3),
+    "synthetic_de": dict(locale="de", periods=26, usage_rows=60, seed=4),
+    "synthetic_fr": dict(locale="fr", periods=26, usage_rows=60, seed=5),
+    "synthetic_es": dict(locale="es", periods=26, usage_rows=60, seed=6),
+}
+
+# A file may be this much slower / larger than its baseline before the gate
+# fails; TIME_SLACK is in units of the calibration time (see calibrate)
+TIME_TOLERANCE = 1.5
+TIME_SLACK = 0.5
+MEMORY_TOLERANCE = 1.2
+MEMORY_SLACK = 512 * 1024
+
+_CALIBRATION_HTML = "<table>" + "<tr><td>LABEL</td><td>1,000 mWh</td></tr>" * 200 + "</table>"
+
+def calibrate():
+    """
+    Time a fixed BeautifulSoup workload. Parse times are stored relative to
+    it, so baselines carry across machines and tolerate load changes.
+    """
+    return min(timeit.repeat(lambda: BeautifulSoup(_CALIBRATION_HTML, "html.parser"), number=5, repeat=5))
+
+def corpus_files():
+    return sorted(name for name in os.listdir(CORPUS_DIR) if name.endswith(".html"))
+
+def to_json(parsed, missing):
+    metrics, details, usage_history, (periods, full_charge, design), _ = parsed
+    return {
+        "metrics": metrics,
+        "details": details,
+        "usage_history": usage_history,
+        "capacity_history": {"periods": periods, "full_charge": full_charge, "design": design},
+        "strict_missing": missing
+    }
+
+def measure_report(name, repeat=3):
+    """
+    Parse one corpus file (runs in a worker process).
+
+    Returns:
+        dict: Strict parse output (partial for incomplete reports) as
+        JSON-compatible data, best lenient parse time (absolute and relative
+        to calibrate()) and peak traced memory
+    """
+    path = os.path.join(CORPUS_DIR, name)
+    # The lenient parser prints warnings when it falls back to dummy data
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            parsed = parse_battery_report(path, strict=True)
+            missing = []
+        except IncompleteReportError as e:
+            parsed, missing = e.partial, e.missing
+
+        calibration = calibrate()
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse_battery_report(path)
+            seconds.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        parse_battery_report(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"name": name, "output": to_json(parsed, missing), "seconds": min(seconds),
+            "relative_time": min(seconds) / calibration, "peak_bytes": peak}
+
+def measure_corpus(names=None, max_workers=None):
+    names = names or corpus_files()
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(names), os.cpu_count() or 1)) as executor:
+        return {result["name"]: result for result in executor.map(measure_report, names)}
+
+def expected_path(name):
+    return os.path.join(CORPUS_DIR, os.path.splitext(name)[0] + ".expected.json")
+
+class TestGoldenCorpus(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = measure_corpus()
+
+    def test_corpus_is_complete(self):
+        names = corpus_files()
+        for name in SYNTHETIC_REPORTS:
+            self.assertIn(name + ".html", names)
+        for name in names:
+            self.assertTrue(os.path.exists(expected_path(name)), f"No expected output for {name}")
+
+    def test_outputs_match_expected(self):
+        self.maxDiff = None
+        for name, result in self.results.items():
+            with self.subTest(report=name):
+                with open(expected_path(name), encoding="utf-8") as f:
+                    expected = json.load(f)
+                self.assertEqual(result["output"], expected)
+
+    @unittest.skipIf(os.environ.get("BATTERY_PERF_GATE") == "0", "performance gate disabled")
+    def test_performance_within_baseline(self):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        for name, result in self.results.items():
+            with self.subTest(report=name):
+                self.assertIn(name, baseline["files"], f"No performance baseline for {name}")
+                reference = baseline["files"][name]
+                # Limits are in units of the calibration workload's time
+                time_limit = reference["relative_time"] * TIME_TOLERANCE + TIME_SLACK
+                memory_limit = reference["peak_bytes"] * MEMORY_TOLERANCE + MEMORY_SLACK
+                self.assertLessEqual(result["relative_time"], time_limit,
+                                     f"{name} parsed in {result['seconds']:.3f} s "
+                                     f"({result['relative_time']:.2f}x calibration, limit {time_limit:.2f}x)")
+                self.assertLessEqual(result["peak_bytes"], memory_limit,
+                                     f"{name} peaked at {result['peak_bytes']:,} bytes, limit {memory_limit:,.0f}")
+
+def update(expected=True):
+    for name, kwargs in SYNTHETIC_REPORTS.items():
+        path = os.path.join(CORPUS_DIR, name + ".html")
+        if not os.path.exists(path):
+            write_battery_report(path, computer_name=f"SYNTH-{name.upper()}", serial_number=f"SN-{len(name):04d}",
+                                 **kwargs)
+            print(f"Wrote {path}")
+
+    results = measure_corpus()
+    if expected:
+        for name, result in results.items():
+            with open(expected_path(name), "w", encoding="utf-8") as f:
+                json.dump(result["output"], f, indent=1, ensure_ascii=False)
+                f.write("\n")
+        print(f"Wrote expected output for {len(results)} reports")
+
+    baseline = {
+        "files": {name: {"seconds": round(result["seconds"], 5), "relative_time": round(result["relative_time"], 4),
+                         "peak_bytes": result["peak_bytes"]}
+                  for name, result in sorted(results.items())}
+    }
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=1)
+        f.write("\n")
+    print(f"Wrote {BASELINE_PATH}")
+
+if __name__ == "__main__":
+    if "--update" in sys.argv:
+        update()
+    elif "--update-baseline" in sys.argv:
+        update(expected=False)
+    else:
+        unittest.main()
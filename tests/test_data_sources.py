@@ -0,0 +1,105 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from src.battery_repport import IncompleteReportError, generate_battery_report, parse_battery_report
+from src.data_sources import PowercfgDataSource, SavedReportDataSource, SysfsDataSource
+
+FAKE_POWERCFG = [sys.executable, os.path.join(os.path.dirname(__file__), "..", "tools", "fake_powercfg.py")]
+
+class TestDataSources(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fake_powercfg_pipeline(self):
+        # A path with spaces and quotes is passed through without a shell
+        output_path = os.path.join(self.tmp_dir, 'my "battery" report.html')
+        with mock.patch.dict(os.environ, {"FAKE_POWERCFG_PERIODS": "12", "FAKE_POWERCFG_USAGE_ROWS": "5"}):
+            report_path = generate_battery_report(output_path, data_source=PowercfgDataSource(FAKE_POWERCFG))
+
+        self.assertEqual(report_path, os.path.abspath(output_path))
+        metrics, details, usage_history, capacity_data, _ = parse_battery_report(report_path, strict=True)
+        self.assertEqual(metrics["Battery Health"], "84.0%")
+        self.assertEqual(details["COMPUTER NAME"], "SYNTHETIC-PC")
+        self.assertEqual(len(usage_history), 5)
+        self.assertEqual(len(capacity_data[0]), 12)
+        self.assertEqual(capacity_data[1][-1], 42000)
+
+    def test_fake_powercfg_failure(self):
+        with mock.patch.dict(os.environ, {"FAKE_POWERCFG_FAIL": "1"}):
+            with self.assertRaises(subprocess.CalledProcessError):
+                generate_battery_report(os.path.join(self.tmp_dir, "report.html"),
+                                        data_source=PowercfgDataSource(FAKE_POWERCFG))
+
+    def test_sysfs_source(self):
+        battery = os.path.join(self.tmp_dir, "BAT0")
+        os.makedirs(battery)
+        for name, value in {"energy_full_design": "57000000", "energy_full": "45600000",
+                            "cycle_count": "321", "serial_number": "ABC123", "technology": "Li-ion"}.items():
+            with open(os.path.join(battery, name), "w") as f:
+                f.write(value + "\n")
+
+        source = SysfsDataSource(root=self.tmp_dir, dmi_root=os.path.join(self.tmp_dir, "dmi"))
+        self.assertTrue(source.is_available())
+        report_path = source.fetch_report(os.path.join(self.tmp_dir, "report.html"))
+
+        metrics, details, _, capacity_data, _ = parse_battery_report(report_path, strict=True)
+        self.assertEqual(metrics["Battery Health"], "80.0%")
+        self.assertEqual(metrics["Cycle Count"], "321")
+        self.assertEqual(details["SERIAL NUMBER"], "ABC123")
+        self.assertEqual(details["CHEMISTRY"], "Li-ion")
+        self.assertEqual(capacity_data[1:], ([45600], [57000]))
+
+        # Only values sysfs provides: no made-up system rows, names or estimates
+        self.assertFalse({"BIOS", "OS BUILD", "PLATFORM ROLE", "CONNECTED STANDBY", "SYSTEM PRODUCT NAME",
+                          "NAME", "MANUFACTURER"} & set(details))
+        with open(report_path, encoding="utf-8") as f:
+            html = f.read()
+        for made_up in ("Synthetic", "SYNTH-", "LiP", "5:12:00", "01/01/2022", "Battery life estimates"):
+            self.assertNotIn(made_up, html)
+
+    def test_sysfs_source_without_capacities(self):
+        # Capacities sysfs does not provide are left out, not reported as 0 mWh
+        battery = os.path.join(self.tmp_dir, "BAT0")
+        os.makedirs(battery)
+        with open(os.path.join(battery, "serial_number"), "w") as f:
+            f.write("ABC123\n")
+
+        source = SysfsDataSource(root=self.tmp_dir, dmi_root=os.path.join(self.tmp_dir, "dmi"))
+        values = source.read_values()
+        self.assertIsNone(values["design_capacity"])
+        self.assertIsNone(values["full_charge_capacity"])
+        report_path = source.fetch_report(os.path.join(self.tmp_dir, "report.html"))
+
+        with open(report_path, encoding="utf-8") as f:
+            self.assertNotIn("mWh", f.read())
+        with self.assertRaises(IncompleteReportError) as raised:
+            parse_battery_report(report_path, strict=True)
+        self.assertIn("battery capacity history", raised.exception.missing)
+        metrics, details, _, capacity_data, _ = raised.exception.partial
+        self.assertNotIn("Design Capacity", metrics)
+        self.assertNotIn("Full Charge Capacity", metrics)
+        self.assertEqual(capacity_data, ([], [], []))
+        self.assertEqual(details["SERIAL NUMBER"], "ABC123")
+
+    def test_saved_report_source(self):
+        for i, name in enumerate(["battery-report-old.html", "battery-report-new.html"]):
+            path = os.path.join(self.tmp_dir, name)
+            with open(path, "w") as f:
+                f.write("<html></html>")
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+
+        source = SavedReportDataSource(self.tmp_dir)
+        self.assertTrue(source.fetch_report().endswith("battery-report-new.html"))
+        self.assertFalse(SavedReportDataSource(os.path.join(self.tmp_dir, "missing")).is_available())
+
+if __name__ == "__main__":
+    unittest.main()
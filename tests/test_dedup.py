@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+import numpy as np
+
+from src.comparison import CapacitySeries
+from src.dedup import DedupIndex, DeviceKey, load_device_histories, merge_histories, read_device_key
+from src.synthetic_report import write_battery_report
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def make_series(start, values, label):
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + 7 * len(values), 7)
+    return CapacitySeries(label, label, [str(d) for d in dates], dates,
+                          np.array(values), np.full(len(values), 50000), {})
+
+class TestDedup(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    def write(self, name, **kwargs):
+        path = os.path.join(self.folder, name)
+        write_battery_report(path, usage_rows=20, **kwargs)
+        return path
+
+    def test_device_key(self):
+        path = self.write("a.html", computer_name="LAPTOP-7", serial_number="SN-42", locale="fr")
+        device, report_time = read_device_key(path)
+        self.assertEqual(device, DeviceKey("LAPTOP-7", "SN-42"))
+        self.assertTrue(report_time.startswith("2022-12-31"))
+
+    def test_duplicates_collapse_across_batches(self):
+        original = self.write("a.html", computer_name="A", serial_number="S1", periods=10)
+        other = self.write("b.html", computer_name="B", serial_number="S2", periods=12)
+
+        # A unique size is indexed without hashing until a same-size file shows up
+        index = DedupIndex().add_paths([original, other])
+        self.assertTrue(all(f.digest is None for f in index.reports.values()))
+
+        copy = os.path.join(self.folder, "copy of a.html")
+        shutil.copy(original, copy)
+        index.add_paths([copy])
+        self.assertEqual(index.duplicates, {copy: original})
+        self.assertEqual(sorted(index.unique_paths()), [original, other])
+        self.assertEqual(index.stats()["devices"], 2)
+
+    def test_real_format_device_key(self):
+        device, report_time = read_device_key(os.path.join(CORPUS_DIR, "anonymized_en_two_batteries.html"))
+        self.assertEqual(device, DeviceKey("HOST-0042", "ANON-0001"))
+        self.assertTrue(report_time.startswith("2023-10-02"))
+
+        # The legacy report has no installed batteries section, so no serial
+        device, _ = read_device_key(os.path.join(CORPUS_DIR, "anonymized_legacy_title_case.html"))
+        self.assertEqual(device, DeviceKey("HOST-0007", None))
+
+    def test_same_path_is_not_a_duplicate(self):
+        path = os.path.join(CORPUS_DIR, "anonymized_en_two_batteries.html")
+        relative = os.path.join(os.curdir, os.path.relpath(path))
+        index = DedupIndex().add_paths([path, relative])
+        index.add_paths([path])
+        self.assertEqual(index.duplicates, {})
+        self.assertEqual(index.unique_paths(), [path])
+
+        copy = os.path.join(self.folder, "copy.html")
+        shutil.copy(path, copy)
+        index.add_paths([copy, copy])
+        self.assertEqual(index.duplicates, {copy: path})
+
+    def test_merge_overlapping_histories(self):
+        older = make_series("2023-01-01", [100, 99, 98, 97], "old")
+        newer = make_series("2023-01-15", [90, 89, 88], "new")
+        merged = merge_histories([older, newer])
+
+        self.assertEqual(merged.label, "new")
+        self.assertEqual(len(merged.dates), 5)
+        # The newer report wins where the two overlap
+        self.assertEqual(merged.full_charge.tolist(), [100, 99, 90, 89, 88])
+
+    def test_load_device_histories(self):
+        first = self.write("week1.html", computer_name="A", serial_number="S1", periods=8)
+        second = self.write("week5.html", computer_name="A", serial_number="S1", periods=8,
+                            start_date=date(2022, 1, 29))
+        copy = os.path.join(self.folder, "week5 (1).html")
+        shutil.copy(second, copy)
+
+        paths = sorted(os.path.join(self.folder, name) for name in os.listdir(self.folder))
+        histories, index, errors = load_device_histories(paths, max_workers=2)
+        self.assertEqual(errors, {})
+        self.assertEqual(len(index.duplicates), 1)
+        history = histories[DeviceKey("A", "S1")]
+        self.assertEqual(history.label, "A (S1)")
+        self.assertEqual(len(history.dates), 12)
+        self.assertIn(history.path, (os.path.abspath(second), os.path.abspath(copy)))
+        self.assertNotIn(first, index.duplicates)
+
+if __name__ == "__main__":
+    unittest.main()
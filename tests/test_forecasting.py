@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+
+from src.forecasting import fit_degradation, forecast_capacity_history, prepare_series
+
+class TestForecasting(unittest.TestCase):
+    def test_batched_fit(self):
+        rng = np.random.default_rng(1)
+        days = np.arange(60) * 7.0
+        noisy = 100 - 0.02 * days + rng.normal(0, 0.3, len(days))
+        x_series = [days, days[:10], days[:2], np.zeros(5)]
+        health_series = [noisy, 95 - 0.05 * days[:10], [100, 99], np.full(5, 90.0)]
+
+        forecast = fit_degradation(x_series, health_series)
+        self.assertAlmostEqual(forecast.slope[0], -0.02, delta=0.002)
+        self.assertAlmostEqual(forecast.intercept[1], 95)
+        self.assertAlmostEqual(forecast.slope[1], -0.05)
+        # Too few points, or no spread in x, cannot be fitted
+        self.assertTrue(np.isnan(forecast.slope[2:]).all())
+
+        mean, low, high = forecast.predict([0.0, 1000.0])
+        self.assertTrue((low[0] <= mean[0]).all() and (mean[0] <= high[0]).all())
+        self.assertGreater(high[0, 1] - low[0, 1], high[0, 0] - low[0, 0])
+
+        estimate, earliest, latest = forecast.threshold_crossing(70.0, horizon=5000)
+        self.assertAlmostEqual(estimate[1], 500.0)
+        self.assertLessEqual(earliest[0], estimate[0])
+        self.assertGreaterEqual(latest[0], estimate[0])
+
+    def test_small_samples_and_past_crossings(self):
+        # Three points leave one degree of freedom: t is 12.7, not the expansion's 9.7
+        forecast = fit_degradation([[0.0, 7.0, 14.0], np.arange(8) * 7.0],
+                                   [[80, 75, 71], 68 - 0.1 * np.arange(8) * 7.0])
+        self.assertAlmostEqual(forecast.t_value[0], 12.706, places=3)
+        self.assertAlmostEqual(forecast.t_value[1], 2.447, delta=0.01)
+
+        # The second device was below 70% from the start: it crosses at its
+        # last observation, never before
+        estimate, earliest, latest = forecast.threshold_crossing(70.0, horizon=5000)
+        self.assertEqual(estimate[1], 49.0)
+        self.assertEqual(earliest[1], 49.0)
+        self.assertGreaterEqual(latest[1], 49.0)
+        self.assertGreaterEqual(earliest[0], 14.0)
+        self.assertEqual(forecast.crossed(70.0).tolist(), [False, True])
+
+    def test_forecast_capacity_history(self):
+        periods = [f"2023-01-{day:02d} - 2023-01-{day + 7:02d}" for day in (1, 8, 15, 22)]
+        capacity_data = (periods, [50000, 49000, 48000, 47000], [50000] * 4)
+
+        days, health, origin = prepare_series(capacity_data)
+        self.assertEqual(days.tolist(), [0, 7, 14, 21])
+        self.assertEqual(str(origin), "2023-01-01")
+
+        forecast = forecast_capacity_history(capacity_data, horizon_periods=3)
+        self.assertEqual(forecast["periods"], ["2023-01-29", "2023-02-05", "2023-02-12"])
+        self.assertAlmostEqual(forecast["full_charge"][0], 46000)
+        # Health falls 2% per week from 100%, so 70% is reached after 15 weeks
+        self.assertEqual(str(forecast["crossing"]), "2023-04-16")
+        self.assertFalse(forecast["crossed"])
+
+        below = forecast_capacity_history((periods, [34000, 33900, 33800, 33700], [50000] * 4))
+        self.assertTrue(below["crossed"])
+        self.assertEqual(str(below["crossing"]), "2023-01-22")
+
+        self.assertIsNone(forecast_capacity_history((["Period 1"], [1], [2])))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import codecs
+import os
+import tempfile
+import unittest
+
+from src.battery_repport import parse_battery_report
+from src.anomaly import usage_drain_rate
+from src.report_reader import MappedReport, read_battery_usage, read_capacity_history, read_key_metrics
+from src.synthetic_report import render_battery_report, write_battery_report
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+class TestReportReader(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".html")
+        os.close(handle)
+        write_battery_report(self.path, periods=40, usage_rows=500, locale="de")
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_matches_full_parse(self):
+        metrics, _, _, capacity_data, _ = parse_battery_report(self.path)
+        self.assertEqual(read_key_metrics(self.path), metrics)
+        self.assertEqual(read_capacity_history(self.path), capacity_data)
+
+    def test_scan_stops_after_requested_section(self):
+        with MappedReport(self.path) as report:
+            html = report.section_html("installed_batteries")
+            self.assertTrue(html.startswith("<h2>Installierte"))
+            self.assertNotIn("<h2", html[3:])
+            self.assertLess(report.bytes_scanned, os.path.getsize(self.path) / 10)
+            self.assertIsNone(report.section_bytes("not_a_section"))
+            self.assertEqual(report.bytes_scanned, os.path.getsize(self.path))
+
+    def test_utf16_and_empty_files(self):
+        with open(self.path, "wb") as f:
+            f.write(codecs.BOM_UTF16_LE + render_battery_report(periods=5, usage_rows=5).encode("utf-16-le"))
+        self.assertEqual(read_key_metrics(self.path)["Cycle Count"], "300")
+        self.assertEqual(len(read_capacity_history(self.path)[0]), 5)
+
+        open(self.path, "wb").close()
+        self.assertEqual(read_key_metrics(self.path), {})
+        self.assertEqual(read_capacity_history(self.path), ([], [], []))
+
+    def test_real_format_report(self):
+        # The report's <script> contains an "<h2>" string that is not a heading
+        path = os.path.join(CORPUS_DIR, "anonymized_en_two_batteries.html")
+        with MappedReport(path) as report:
+            system_info = report.section_soup("system_info")
+        labels = [td.get_text(strip=True) for td in system_info.find_all("td", class_="label")]
+        self.assertEqual(labels[0], "COMPUTER NAME")
+        self.assertEqual(labels[-1], "REPORT TIME")
+
+        metrics, _, _, capacity_data, _ = parse_battery_report(path, strict=True)
+        self.assertEqual(read_key_metrics(path), metrics)
+        self.assertEqual(read_capacity_history(path), capacity_data)
+
+        # Header cells are <td> in a <thead>; ENERGY DRAINED spans the % and mWh columns
+        usage = read_battery_usage(path)
+        self.assertEqual(len(usage), 2)
+        self.assertEqual(usage[1]["ENERGY DRAINED (%)"], "2 %")
+        self.assertEqual(usage[1]["ENERGY DRAINED (mWh)"], "964 mWh")
+        self.assertAlmostEqual(usage_drain_rate(usage[0]), 36 / (1 + 44 / 60 + 18 / 3600))
+
+if __name__ == "__main__":
+    unittest.main()
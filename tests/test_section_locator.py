@@ -0,0 +1,162 @@
+import os
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+from src.battery_repport import IncompleteReportError, parse_battery_report
+from src.section_locator import SectionLocator, header_labels, match_metric_label, match_section
+
+GERMAN_REPORT = """
+<html>
+<body>
+    <h1>Akkubericht</h1>
+    <table>
+        <tr><td>COMPUTERNAME</td><td>LAPTOP-01</td></tr>
+    </table>
+    <h2>Installierte Akkus</h2>
+    <table>
+        <thead><tr><td></td><td>AKKU 1</td></tr></thead>
+        <tr><td>AUSLEGUNGSKAPAZITÄT</td><td>50.000 mWh</td></tr>
+        <tr><td>KAPAZITÄT BEI VOLLSTÄNDIGER AUFLADUNG</td><td>40.000 mWh</td></tr>
+        <tr><td>ZYKLUSANZAHL</td><td>250</td></tr>
+    </table>
+    <h2>Akkukapazitätsverlauf</h2>
+    <table>
+        <tr><td>ZEITRAUM</td><td>KAPAZITÄT</td><td>AUSLEGUNG</td></tr>
+        <tr><td>2023-01-01 - 2023-01-08</td><td>41000 mWh</td><td>50000 mWh</td></tr>
+    </table>
+</body>
+</html>
+"""
+
+NO_HISTORY_REPORT = """
+<html>
+<body>
+    <h2>Installed batteries</h2>
+    <table>
+        <tr><td>DESIGN CAPACITY</td><td>50000 mWh</td></tr>
+        <tr><td>FULL CHARGE CAPACITY</td><td>45000 mWh</td></tr>
+    </table>
+    <h2>Battery life estimates</h2>
+    <p>No estimates available.</p>
+</body>
+</html>
+"""
+
+class TestSectionLocator(unittest.TestCase):
+    def write_report(self, html):
+        handle, path = tempfile.mkstemp(suffix=".html")
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
+            f.write(html)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_matchers(self):
+        self.assertEqual(match_section("  Battery capacity   history "), "capacity_history")
+        self.assertEqual(match_section("Battery usage"), "battery_usage")
+        self.assertEqual(match_section("Historial de uso"), "usage_history")
+        self.assertIsNone(match_section("Something else"))
+        self.assertEqual(match_metric_label("FULL CHARGE CAPACITY"), "Full Charge Capacity")
+        self.assertEqual(match_metric_label("Nombre de cycles"), "Cycle Count")
+
+    def test_localized_sections(self):
+        locator = SectionLocator(BeautifulSoup(GERMAN_REPORT, "html.parser"))
+        self.assertIn("system_info", locator)
+        self.assertIn("installed_batteries", locator)
+        self.assertIsNone(locator.table("usage_history"))
+        self.assertEqual(locator.missing, {"usage_history"})
+
+        metrics, _, _, capacity_data, _ = parse_battery_report(self.write_report(GERMAN_REPORT), strict=True)
+        self.assertEqual(metrics["Design Capacity"], "50.000 mWh")
+        self.assertEqual(metrics["Cycle Count"], "250")
+        self.assertEqual(capacity_data, (["2023-01-01 - 2023-01-08"], [41000], [50000]))
+
+    def test_cell_table_matches_get_text(self):
+        soup = BeautifulSoup(GERMAN_REPORT.replace("<td>ZEITRAUM</td>", "<th>ZEITRAUM<!-- x --></th>"),
+                             "html.parser")
+        locator = SectionLocator(soup)
+        rows = locator.cells.table_rows(locator.table("installed_batteries"))
+        self.assertEqual(rows[1].cells, ("AUSLEGUNGSKAPAZITÄT", "50.000 mWh"))
+        self.assertEqual(rows[1].label_lower, "auslegungskapazität")
+
+        history = locator.cells.table_rows(locator.table("capacity_history"))
+        self.assertEqual(history[0].headers, ("ZEITRAUM",))
+        self.assertEqual(history[0].cells, ("KAPAZITÄT", "AUSLEGUNG"))
+
+        expected = [tuple(td.get_text(strip=True) for td in tr.find_all("td")) for tr in soup.find_all("tr")]
+        self.assertEqual([row.cells for row in locator.cells.rows], expected)
+        self.assertIn("auslegung", locator.cells.table_text(locator.table("capacity_history")))
+
+    def test_cell_boundaries_and_nested_tables(self):
+        soup = BeautifulSoup("""
+            <table>
+                <tr><td>DESIGN CAPACITY</td> stray <td>50,000 mWh</td> text</tr>
+                <tr><td>NOTES</td><td><table><tr><td>inner</td><td>cell</td></tr></table> after</td></tr>
+                <tr><td>CYCLE COUNT</td><td>250</td></tr>
+            </table>""", "html.parser")
+        cells = SectionLocator(soup).cells
+        outer, inner = soup.find_all("table")
+        # Text between cells belongs to no cell; the nested table's row does not end the outer row
+        self.assertEqual([row.cells for row in cells.table_rows(outer)],
+                         [("DESIGN CAPACITY", "50,000 mWh"), ("NOTES", "innercellafter"), ("CYCLE COUNT", "250")])
+        self.assertEqual([row.cells for row in cells.table_rows(inner)], [("inner", "cell")])
+
+    def test_header_labels(self):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "anonymized_en_two_batteries.html")
+        with open(path, encoding="utf-8") as f:
+            locator = SectionLocator(BeautifulSoup(f.read(), "html.parser"))
+        usage = locator.table("battery_usage")
+        sample = locator.cells.table_rows(usage)[1].cells
+        self.assertEqual(header_labels(usage, sample), ["START TIME", "STATE", "DURATION",
+                                                        "ENERGY DRAINED (%)", "ENERGY DRAINED (mWh)"])
+
+    def test_strict_mode_never_fabricates(self):
+        path = self.write_report(NO_HISTORY_REPORT)
+
+        with self.assertRaises(IncompleteReportError) as context:
+            parse_battery_report(path, strict=True)
+        self.assertEqual(context.exception.missing, ["battery capacity history"])
+        metrics, _, _, capacity_data, _ = context.exception.partial
+        self.assertEqual(metrics["Full Charge Capacity"], "45000 mWh")
+        self.assertEqual(capacity_data, ([], [], []))
+
+        # The lenient default still fills in dummy periods for the GUI
+        _, _, _, (periods, _, _), _ = parse_battery_report(path)
+        self.assertEqual(periods[0], "Period 1")
+
+    def test_history_table_needs_history_header(self):
+        # With two batteries the metrics rows have three cells; they must not be
+        # mistaken for capacity history when the history heading is missing
+        two_batteries = NO_HISTORY_REPORT.replace("<td>50000 mWh</td>", "<td>50000 mWh</td><td>40000 mWh</td>")
+        with self.assertRaises(IncompleteReportError) as context:
+            parse_battery_report(self.write_report(two_batteries), strict=True)
+        self.assertEqual(context.exception.missing, ["battery capacity history"])
+
+        # A table headed Period / Full Charge Capacity / Design Capacity is used without a heading
+        untitled_history = two_batteries.replace("<h2>Battery life estimates</h2>", """
+            <table>
+                <tr><td>Period</td><td>Full Charge Capacity</td><td>Design Capacity</td></tr>
+                <tr><td>2023-01-01 - 2023-01-08</td><td>41,000 mWh</td><td>50,000 mWh</td></tr>
+            </table>""")
+        _, _, _, capacity_data, _ = parse_battery_report(self.write_report(untitled_history), strict=True)
+        self.assertEqual(capacity_data, (["2023-01-01 - 2023-01-08"], [41000], [50000]))
+
+    def test_unreadable_capacity_drops_the_period(self):
+        # A "-" cell must not shift the following values onto earlier periods
+        history = NO_HISTORY_REPORT.replace("<h2>Battery life estimates</h2>", """
+            <h2>Battery capacity history</h2>
+            <table>
+                <tr><td>Period</td><td>Full Charge Capacity</td><td>Design Capacity</td></tr>
+                <tr><td>2023-01-01 - 2023-01-08</td><td>-</td><td>50,000 mWh</td></tr>
+                <tr><td>2023-01-08 - 2023-01-15</td><td>45,000 mWh</td><td>50,000 mWh</td></tr>
+                <tr><td>2023-01-15 - 2023-01-22</td><td>44,800 mWh</td><td>-</td></tr>
+            </table>""")
+        path = self.write_report(history)
+        for strict in (True, False):
+            with self.subTest(strict=strict):
+                _, _, _, capacity_data, _ = parse_battery_report(path, strict=strict)
+                self.assertEqual(capacity_data, (["2023-01-08 - 2023-01-15"], [45000], [50000]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.battery_repport import parse_battery_report
+from src.storage import FleetStore, StorageError, report_rows, scan_file
+from src.synthetic_report import write_battery_report
+
+def make_columns(devices, start="2022-11-01", months=4, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = np.repeat(np.arange(np.datetime64(start, "M"), np.datetime64(start, "M") + months), devices)
+    device = np.tile(np.arange(devices), months)
+    health = rng.uniform(50, 100, len(dates)).astype("<f4")
+    return {
+        "computer_name": np.array([f"PC-{d:03d}" for d in device], dtype=object),
+        "serial_number": np.array([f"SN-{d:03d}" for d in device], dtype=object),
+        "date": dates.astype("datetime64[D]"),
+        "full_charge": (health * 500).astype("<i4"),
+        "design": np.full(len(dates), 50000, dtype="<i4"),
+        "health": health,
+        "cycle_count": ((100 - health) * 10).astype("<i4"),
+    }
+
+class TestFleetStore(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.store = FleetStore(os.path.join(self.folder, "store"), row_group_size=32)
+        self.columns = {"Model A": make_columns(50, seed=1), "Model/B": make_columns(30, seed=2)}
+        for model, columns in self.columns.items():
+            self.store.append(model, columns)
+
+    def test_hive_layout_and_partition_pruning(self):
+        partitions, total = self.store.partitions()
+        self.assertEqual(total, 4)
+        self.assertEqual([(model, year) for model, year, _ in partitions],
+                         [("Model A", 2022), ("Model A", 2023), ("Model/B", 2022), ("Model/B", 2023)])
+        self.assertTrue(partitions[2][2].endswith(os.path.join("model=Model%2FB", "year=2022")))
+
+        data, stats = self.store.scan(["serial_number", "date", "model"], models=["Model/B"],
+                                      start="2023-01-01", max_workers=1)
+        self.assertEqual(stats["partitions_scanned"], 1)
+        self.assertEqual(stats["rows"], 60)
+        self.assertTrue((data["date"] >= np.datetime64("2023-01-01")).all())
+        self.assertEqual(set(data["model"]), {"Model/B"})
+
+    def test_predicate_pushdown_matches_full_scan(self):
+        filters = {"health": (None, 60), "cycle_count": (300, None)}
+        data, stats = self.store.scan(filters=filters, max_workers=2)
+        self.assertGreater(stats["row_groups_skipped"], 0)
+        self.assertLess(stats["rows_scanned"], 320)
+
+        everything, _ = self.store.scan(max_workers=1)
+        expected = (everything["health"] <= 60) & (everything["cycle_count"] >= 300)
+        self.assertEqual(stats["rows"], expected.sum())
+        self.assertEqual(sorted(zip(data["serial_number"], data["date"].tolist())),
+                         sorted(zip(everything["serial_number"][expected], everything["date"][expected].tolist())))
+
+    def test_partition_columns_only(self):
+        data, stats = self.store.scan(["model", "year"], filters={"health": (None, 60)}, max_workers=1)
+        everything, _ = self.store.scan(["health", "model", "year"], max_workers=1)
+        expected = everything["health"] <= 60
+        self.assertEqual(stats["rows"], expected.sum())
+        self.assertEqual(sorted(zip(data["model"], data["year"].tolist())),
+                         sorted(zip(everything["model"][expected], everything["year"][expected].tolist())))
+
+        data, stats = self.store.scan(["model"], models=["Model/B"], max_workers=1)
+        self.assertEqual(stats["rows"], 120)
+        self.assertEqual(set(data["model"]), {"Model/B"})
+
+    def test_round_trip_values(self):
+        data, _ = self.store.scan(models=["Model A"], max_workers=1)
+        original = self.columns["Model A"]
+        order = np.lexsort((data["serial_number"].astype(str), data["date"]))
+        expected = np.lexsort((original["serial_number"].astype(str), original["date"]))
+        for name in original:
+            np.testing.assert_array_equal(data[name][order], np.asarray(original[name])[expected])
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.folder, "not-a-table.bhc")
+        with open(path, "wb") as f:
+            f.write(b"<html></html>")
+        with self.assertRaises(StorageError):
+            scan_file(path, ["health"], {})
+
+    def test_add_reports(self):
+        path = os.path.join(self.folder, "report.html")
+        write_battery_report(path, computer_name="LAPTOP-7", serial_number="SN-42", product_name="Laptop 14",
+                             periods=10, usage_rows=5, locale="de")
+        parsed = parse_battery_report(path, strict=True)
+        model, columns = report_rows(parsed)
+        self.assertEqual(model, "Laptop 14")
+        self.assertEqual(columns["cycle_count"][0], 0)
+        self.assertEqual(columns["cycle_count"][-1], 300)
+
+        self.assertEqual(self.store.add_reports([parsed]), 10)
+        data, _ = self.store.scan(["computer_name", "health"], models=["Laptop 14"], max_workers=1)
+        self.assertEqual(set(data["computer_name"]), {"LAPTOP-7"})
+        self.assertEqual(len(data["health"]), 10)
+
+    def test_report_rows_skip_periods_without_design_capacity(self):
+        metrics = {"Cycle Count": "10"}
+        details = {"COMPUTER NAME": "LAPTOP-7"}
+        capacity = (["2023-01-01 - 2023-01-08", "2023-01-08 - 2023-01-15"], [40000, 0], [50000, 0])
+        _, columns = report_rows((metrics, details, [], capacity))
+        np.testing.assert_array_equal(columns["health"], [80.0])
+        self.assertEqual(len(columns["computer_name"]), 1)
+        self.assertIsNone(report_rows((metrics, details, [], (capacity[0][1:], [0], [0]))))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import io
+import unittest
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+
+from src.visualization import HealthGaugeRenderer, create_battery_health_gauge, gauge_health_percentage
+
+class TestHealthGauge(unittest.TestCase):
+    def test_health_percentage(self):
+        self.assertAlmostEqual(gauge_health_percentage("39000 mWh", "45000 mWh"), 86.666, places=2)
+        self.assertEqual(gauge_health_percentage(60000, 50000), 100)
+        self.assertEqual(gauge_health_percentage("unknown", "50000 mWh"), 0)
+        # Thousands separators as in powercfg reports
+        self.assertAlmostEqual(gauge_health_percentage("41,650 mWh", "50,000 mWh"), 83.3)
+        self.assertAlmostEqual(gauge_health_percentage("9,800", "50.000 mWh"), 19.6)
+
+    def test_renderer_matches_full_figure(self):
+        renderer = HealthGaugeRenderer()
+        for full_charge in (0, 12000, 39000, 50000):
+            with self.subTest(full_charge=full_charge):
+                fig = create_battery_health_gauge(full_charge, 50000)
+                canvas = FigureCanvasAgg(fig)
+                canvas.draw()
+                expected = np.asarray(canvas.buffer_rgba())
+                actual = renderer.render_rgba(gauge_health_percentage(full_charge, 50000))
+                np.testing.assert_array_equal(actual, expected)
+
+    def test_png_cache(self):
+        renderer = HealthGaugeRenderer(max_entries=2)
+        png = renderer.render_report_png("39000 mWh", "45000 mWh")
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertEqual(Image.open(io.BytesIO(png)).size, (600, 400))
+
+        # Values that show the same rounded percentage share one image
+        self.assertIs(renderer.render_png(86.66), png)
+        self.assertEqual((renderer.hits, renderer.misses), (1, 1))
+
+        renderer.render_png(50)
+        renderer.render_png(60)
+        self.assertEqual(len(renderer._entries), 2)
+        self.assertNotIn(png, renderer._entries.values())
+
+    def test_color_from_unrounded_health(self):
+        # 80.04% shows as "80.0%" but is above 80, so its arc is green, not light green
+        renderer = HealthGaugeRenderer()
+        light_green = renderer.render_png(80.0)
+        green = renderer.render_png(80.04)
+        self.assertNotEqual(green, light_green)
+
+        # Compare a pixel well inside the arc with the full figure's
+        canvas = FigureCanvasAgg(create_battery_health_gauge(40020, 50000))
+        canvas.draw()
+        x, y = renderer.ax.transData.transform((np.pi * 0.9, 0.6))
+        row, column = int(renderer.fig.bbox.height - y), int(x)
+        image = np.asarray(Image.open(io.BytesIO(green)).convert("RGBA"))
+        np.testing.assert_array_equal(image[row, column], np.asarray(canvas.buffer_rgba())[row, column])
+        light = np.asarray(Image.open(io.BytesIO(light_green)).convert("RGBA"))
+        self.assertFalse((light[row, column] == image[row, column]).all())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from src.watcher import ReportWatcher
+
+SAMPLE_HTML = """
+<html>
+<body>
+    <table>
+        <tr><td>Design Capacity</td><td>50000 mWh</td></tr>
+        <tr><td>Full Charge Capacity</td><td>40000 mWh</td></tr>
+    </table>
+    <h2>Battery capacity history</h2>
+    <table>
+        <tr><th>PERIOD</th><th>FULL CHARGE CAPACITY</th><th>DESIGN CAPACITY</th></tr>
+        <tr><td>2023-01-01 - 2023-01-08</td><td>41000 mWh</td><td>50000 mWh</td></tr>
+    </table>
+</body>
+</html>
+"""
+
+class TestReportWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_watcher(self, use_inotify):
+        results = []
+        watcher = ReportWatcher(self.tmp_dir, sinks=[lambda path, series: results.append((path, series))],
+                                settle_time=0.2, poll_interval=0.05, max_workers=1, use_inotify=use_inotify)
+        try:
+            # A partially written report must not be parsed
+            path = os.path.join(self.tmp_dir, "battery-report-20240101.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(SAMPLE_HTML[:40])
+            with open(os.path.join(self.tmp_dir, "notes.txt"), "w") as f:
+                f.write("ignored")
+            watcher.poll_once()
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(SAMPLE_HTML[40:])
+
+            deadline = time.monotonic() + 10
+            while not results and time.monotonic() < deadline:
+                watcher.poll_once()
+        finally:
+            watcher.stop()
+        return watcher, results
+
+    def check_results(self, watcher, results):
+        self.assertEqual(len(results), 1)
+        path, series = results[0]
+        self.assertTrue(path.endswith("battery-report-20240101.html"))
+        self.assertEqual(series.full_charge.tolist(), [41000])
+        self.assertEqual(watcher.latency_stats()["count"], 1)
+
+    def test_polling_backend(self):
+        watcher, results = self.run_watcher(use_inotify=False)
+        self.assertFalse(watcher.uses_inotify)
+        self.check_results(watcher, results)
+
+    def test_latency_ignores_old_mtime(self):
+        # A report copied in keeps its old mtime; latency counts from when it was seen
+        path = os.path.join(self.tmp_dir, "battery-report-20200101.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(SAMPLE_HTML)
+        day_ago = time.time() - 86400
+        os.utime(path, (day_ago, day_ago))
+
+        results = []
+        watcher = ReportWatcher(self.tmp_dir, sinks=[lambda path, series: results.append(path)],
+                                settle_time=0.1, poll_interval=0.05, max_workers=1, use_inotify=False)
+        try:
+            deadline = time.monotonic() + 10
+            while not results and time.monotonic() < deadline:
+                watcher.poll_once()
+        finally:
+            watcher.stop()
+        self.assertEqual(len(results), 1)
+        self.assertLess(watcher.latency_stats()["max"], 60)
+
+    @unittest.skipUnless(os.name == "posix" and os.uname().sysname == "Linux", "inotify is Linux only")
+    def test_inotify_backend(self):
+        watcher, results = self.run_watcher(use_inotify=True)
+        self.assertTrue(watcher.uses_inotify)
+        self.check_results(watcher, results)
+
+if __name__ == "__main__":
+    unittest.main()
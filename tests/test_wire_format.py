@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from src.battery_repport import parse_battery_report
+from src.synthetic_report import write_battery_report
+from src.wire_format import WireFormatError, decode_report, encode_report, encode_report_file, zstandard
+
+class TestWireFormat(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".html")
+        os.close(handle)
+        write_battery_report(self.path, periods=30, usage_rows=10, locale="fr")
+        self.parsed = parse_battery_report(self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip(self):
+        codecs = ["none", "zlib"] + (["zstd"] if zstandard else [])
+        for codec in codecs:
+            data = encode_report(self.parsed, compression=codec)
+            report = decode_report(data)
+            self.assertEqual(report.to_parsed(), self.parsed[:4])
+            self.assertLess(len(data), os.path.getsize(self.path) / 4)
+
+    def test_arrays_are_views(self):
+        report = decode_report(encode_report(self.parsed, compression="none"))
+        # Arrays share the payload buffer instead of owning a copy
+        self.assertFalse(report.full_charge_capacities.flags.owndata)
+        self.assertFalse(report.usage_cells.flags.owndata)
+        self.assertEqual(report.full_charge_capacities[-1], 42000)
+        self.assertEqual(report.usage_cells.shape, (len(self.parsed[2]), len(self.parsed[2][0])))
+
+    def test_encode_file_and_corruption(self):
+        data = bytearray(encode_report_file(self.path))
+        self.assertEqual(decode_report(bytes(data)).metrics["Battery Health"], "84.0%")
+
+        data[-1] ^= 0xFF
+        with self.assertRaises(WireFormatError):
+            decode_report(bytes(data))
+        with self.assertRaises(WireFormatError):
+            decode_report(b"<html></html>" * 2)
+
+if __name__ == "__main__":
+    unittest.main()
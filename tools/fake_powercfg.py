@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Stand-in for `powercfg /batteryreport` on machines without Windows.
+
+Accepts the same arguments as the real command:
+
+    python tools/fake_powercfg.py /batteryreport /output battery-report.html
+
+and writes a synthetic report. Size and behaviour are configured through
+environment variables so callers can keep the powercfg argument list:
+
+    FAKE_POWERCFG_PERIODS     capacity history periods (default 52)
+    FAKE_POWERCFG_USAGE_ROWS  rows in each usage table (default 200)
+    FAKE_POWERCFG_LATENCY     seconds to sleep before writing (default 0)
+    FAKE_POWERCFG_LOCALE      en, de, fr or es (default en)
+    FAKE_POWERCFG_SEED        seed for the generated history (default: derived from the output path)
+    FAKE_POWERCFG_FAIL        if set, exit with an error like powercfg does without a battery
+"""
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from synthetic_report import write_battery_report
+
+def main(argv):
+    args = [arg.lower() for arg in argv]
+    if "/batteryreport" not in args and "-batteryreport" not in args:
+        print("Invalid Parameters -- try \"/?\" for help")
+        return 1
+
+    output_path = "battery-report.html"
+    for flag in ("/output", "-output"):
+        if flag in args:
+            index = args.index(flag)
+            if index + 1 >= len(argv):
+                print("Invalid Parameters -- /output requires a file path")
+                return 1
+            output_path = argv[index + 1]
+
+    if os.environ.get("FAKE_POWERCFG_FAIL"):
+        print("Unable to perform operation. An unexpected error (0x10d2) has occurred: The library, drive, or media pool is empty.")
+        return 1
+
+    time.sleep(float(os.environ.get("FAKE_POWERCFG_LATENCY", "0")))
+
+    seed = int(os.environ.get("FAKE_POWERCFG_SEED", zlib.crc32(output_path.encode("utf-8"))))
+    output_path = write_battery_report(
+        output_path,
+        periods=int(os.environ.get("FAKE_POWERCFG_PERIODS", "52")),
+        usage_rows=int(os.environ.get("FAKE_POWERCFG_USAGE_ROWS", "200")),
+        locale=os.environ.get("FAKE_POWERCFG_LOCALE", "en"),
+        seed=seed
+    )
+    print(f"Battery life report saved to file path {output_path}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))